@@ -0,0 +1,147 @@
+"""
+Benchmark del parseo del CSV de cámaras.
+
+Compara el parseo por columnas de DataLoader con el recorrido fila a fila
+con iterrows() que se usaba antes, sobre el dataset oficial y sobre un CSV
+sintético de 100.000 filas (inventarios regionales más grandes).
+
+Uso:
+    python benchmark_data_loader.py [--rows N] [--repeat R] [--offline]
+"""
+
+import argparse
+import logging
+import random
+import time
+from io import StringIO
+from typing import Callable, List
+
+import pandas as pd
+import requests
+
+import config
+from src.models.camera import Camera
+from src.utils.data_loader import DataLoader
+
+
+def legacy_parse(dataframe: pd.DataFrame) -> List[Camera]:
+    """Parseo anterior: iterrows() y un acceso por columna y fila (referencia)."""
+    cols = config.CSV_COLUMNS
+
+    def get_value(row, column, default=None):
+        if column not in row.index:
+            return default
+        value = row[column]
+        return default if pd.isna(value) else value
+
+    cameras = []
+    for idx, row in dataframe.iterrows():
+        cameras.append(Camera(
+            id=idx,
+            nombre=get_value(row, cols["nombre"], f"Cámara {idx}"),
+            direccion=get_value(row, cols["direccion"], "Sin dirección"),
+            url_imagen=get_value(row, cols["url_imagen"], ""),
+            url=get_value(row, cols["url"], ""),
+            geometry_raw=get_value(row, cols["geometry"], None),
+            acceso=get_value(row, cols["acceso"], None),
+            distrito=get_value(row, cols["distrito"], None),
+        ))
+    return cameras
+
+
+def synthetic_csv(rows: int, seed: int = 25830) -> str:
+    """
+    Genera un CSV con las columnas del dataset oficial.
+
+    Args:
+        rows: Número de filas
+        seed: Semilla para que el resultado sea reproducible
+
+    Returns:
+        Texto del CSV
+    """
+    rng = random.Random(seed)
+    cols = config.CSV_COLUMNS
+    calles = ["AVDA. ANDALUCIA", "ALAMEDA PRINCIPAL", "PASEO MARITIMO", "CARRETERA DE CADIZ", "CALLE LARIOS"]
+    data = {
+        cols["nombre"]: [f"TV{n:05d}-A" for n in range(rows)],
+        cols["direccion"]: [f"{rng.choice(calles)} {rng.randint(1, 200)}" for _ in range(rows)],
+        cols["geometry"]: [
+            f"POINT ({rng.uniform(360000, 400000):.3f} {rng.uniform(4050000, 4090000):.3f})"
+            if rng.random() > 0.01 else None
+            for _ in range(rows)
+        ],
+        cols["url_imagen"]: [f"https://movilidad.malaga.eu/camaras/{n}.jpg" for n in range(rows)],
+        cols["url"]: [f"https://movilidad.malaga.eu/camara/{n}" for n in range(rows)],
+        cols["acceso"]: [rng.choice(["SI", "NO", None]) for _ in range(rows)],
+    }
+    return pd.DataFrame(data).to_csv(index=False)
+
+
+def best_of(function: Callable[[], object], repeat: int) -> float:
+    """Mejor tiempo en segundos de varias ejecuciones."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def run_case(name: str, csv_text: str, repeat: int):
+    """Mide ambos parseos sobre un CSV y comprueba que dan el mismo resultado."""
+    loader = DataLoader()
+    dataframe = pd.read_csv(StringIO(csv_text), encoding='utf-8')
+
+    def vectorized():
+        loader.dataframe = dataframe
+        loader._parse_cameras()
+
+    legacy_time = best_of(lambda: legacy_parse(dataframe), repeat)
+    vectorized_time = best_of(vectorized, repeat)
+
+    legacy = legacy_parse(dataframe)
+    same = len(legacy) == len(loader.cameras) and all(
+        (a.id, a.nombre, a.direccion, a.url_imagen, a.coordenadas) ==
+        (b.id, b.nombre, b.direccion, b.url_imagen, b.coordenadas)
+        for a, b in zip(legacy, loader.cameras)
+    )
+
+    print(f"{name}: {len(dataframe)} filas")
+    print(f"  iterrows:       {legacy_time * 1000:9.1f} ms")
+    print(f"  por columnas:   {vectorized_time * 1000:9.1f} ms  (x{legacy_time / vectorized_time:.1f})")
+    print(f"  {'✓' if same else '✗'} Mismas cámaras en ambos parseos")
+    print()
+
+
+def main():
+    """Función principal del benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="Filas del CSV sintético")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por medida")
+    parser.add_argument("--offline", action="store_true", help="No descargar el dataset oficial")
+    args = parser.parse_args()
+
+    # Los logs de depuración del parseo falsearían las medidas
+    logging.disable(logging.WARNING)
+
+    print("=" * 50)
+    print("  Benchmark del parseo del CSV")
+    print("=" * 50)
+    print()
+
+    if not args.offline:
+        try:
+            response = requests.get(config.CSV_URL, timeout=30)
+            response.raise_for_status()
+            response.encoding = 'utf-8'
+            run_case("Dataset oficial", response.text, args.repeat)
+        except requests.RequestException as e:
+            print(f"✗ No se pudo descargar el dataset oficial: {e}")
+            print()
+
+    run_case("CSV sintético", synthetic_csv(args.rows), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
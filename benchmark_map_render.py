@@ -0,0 +1,161 @@
+"""
+Benchmark del renderizado de marcadores del mapa.
+
+Compara el renderizado con un folium.Marker (y su popup HTML) por cámara y
+parada de la EMT con el renderizado por plantilla (un array JSON y una sola
+plantilla de popup), midiendo el tiempo de construcción, el de generación
+del HTML y el tamaño del fichero resultante.
+
+Uso:
+    python benchmark_map_render.py [--cameras N] [--stops N] [--repeat R]
+"""
+
+import argparse
+import logging
+import random
+import time
+from typing import Callable, Dict, List
+
+import folium
+from folium import plugins
+
+import config
+from src.models.camera import Camera
+from src.workers import MapGenerationWorker
+
+
+RENDERERS = ["folium", "template"]
+
+
+def synthetic_cameras(count: int, seed: int = 25830) -> List[Camera]:
+    """
+    Genera cámaras repartidas por el término municipal.
+
+    Args:
+        count: Número de cámaras
+        seed: Semilla para que el resultado sea reproducible
+
+    Returns:
+        Lista de cámaras con coordenadas WGS84
+    """
+    rng = random.Random(seed)
+    calles = ["AVDA. ANDALUCIA", "ALAMEDA PRINCIPAL", "PASEO MARITIMO", "CARRETERA DE CADIZ", "CALLE LARIOS"]
+    distritos = [None] + [str(n) for n in range(1, 12)]
+    return [
+        Camera(
+            id=n,
+            nombre=f"TV{n:05d}-A",
+            direccion=f"{rng.choice(calles)} {rng.randint(1, 200)}",
+            url_imagen=f"https://movilidad.malaga.eu/camaras/{n}.jpg",
+            url=f"https://movilidad.malaga.eu/camara/{n}",
+            acceso=rng.choice(["SI", "NO", None]),
+            distrito=rng.choice(distritos),
+            latlon=(rng.uniform(36.65, 36.78), rng.uniform(-4.55, -4.33)),
+        )
+        for n in range(count)
+    ]
+
+
+def synthetic_emt(stops: int, lines: int = 40, seed: int = 25830) -> List[Dict]:
+    """Genera líneas de la EMT con el formato de lineasyparadas (paradas compartidas entre líneas)."""
+    rng = random.Random(seed)
+    all_stops = [
+        {
+            'codParada': n,
+            'nombreParada': f"Parada {n}",
+            'direccion': f"Calle {n}",
+            'latitud': rng.uniform(36.65, 36.78),
+            'longitud': rng.uniform(-4.55, -4.33),
+        }
+        for n in range(stops)
+    ]
+    return [
+        {
+            'codLinea': float(line),
+            'paradas': [{'parada': stop} for stop in rng.sample(all_stops, min(len(all_stops), 60))],
+        }
+        for line in range(1, lines + 1)
+    ]
+
+
+def best_of(function: Callable[[], object], repeat: int) -> float:
+    """Mejor tiempo en segundos de varias ejecuciones."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def build_map(cameras: List[Camera], emt_data: List[Dict], renderer: str) -> folium.Map:
+    """Construye un mapa con las cámaras y la capa de la EMT, como MapGenerationWorker."""
+    worker = MapGenerationWorker(cameras, show_districts=False, layer_radius=0, renderer=renderer)
+    m = folium.Map(
+        location=[config.MAP_CENTER_LAT, config.MAP_CENTER_LON],
+        zoom_start=config.MAP_DEFAULT_ZOOM,
+        tiles=config.MAP_TILE_LAYER,
+    )
+    marker_cluster = plugins.MarkerCluster(name="Cámaras de Tráfico").add_to(m)
+    worker._add_camera_markers(marker_cluster)
+    if emt_data:
+        worker._build_emt_layer(emt_data).add_to(m)
+    return m
+
+
+def run_case(cameras: List[Camera], emt_data: List[Dict], repeat: int):
+    """Mide ambos renderizados y comprueba que emiten los mismos marcadores."""
+    results = {}
+    for renderer in RENDERERS:
+        build_time = best_of(lambda: build_map(cameras, emt_data, renderer), repeat)
+        m = build_map(cameras, emt_data, renderer)
+        render_time = best_of(lambda: m.get_root().render(), repeat)
+        html = m.get_root().render()
+        results[renderer] = (build_time, render_time, len(html.encode("utf-8")), html)
+
+    folium_html = results["folium"][3]
+    template_html = results["template"][3]
+    folium_markers = folium_html.count("L.marker(")
+    template_markers = sum(template_html.count(f'"{camera.nombre}"') for camera in cameras[:50])
+
+    print(f"{len(cameras)} cámaras, {folium_markers - len(cameras)} paradas EMT")
+    print(f"  {'':10} {'Construcción':>14} {'HTML':>10} {'Tamaño':>12}")
+    for renderer in RENDERERS:
+        build_time, render_time, size, _ = results[renderer]
+        print(
+            f"  {renderer:10} {build_time * 1000:11.1f} ms {render_time * 1000:7.1f} ms "
+            f"{size / 1024:9.1f} KB"
+        )
+    folium_total = results["folium"][0] + results["folium"][1]
+    template_total = results["template"][0] + results["template"][1]
+    print(
+        f"  plantilla: x{folium_total / template_total:.1f} más rápido, "
+        f"{100 * (1 - results['template'][2] / results['folium'][2]):.0f}% menos HTML"
+    )
+    print(f"  {'✓' if template_markers == min(len(cameras), 50) else '✗'} Las cámaras están en el array JSON")
+    print()
+
+
+def main():
+    """Función principal del benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cameras", type=int, default=2_000, help="Cámaras sintéticas")
+    parser.add_argument("--stops", type=int, default=1_000, help="Paradas EMT sintéticas (0 = sin capa EMT)")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por medida")
+    args = parser.parse_args()
+
+    # Los logs de la generación del mapa falsearían las medidas
+    logging.disable(logging.WARNING)
+
+    print("=" * 50)
+    print("  Benchmark del renderizado del mapa")
+    print("=" * 50)
+    print()
+
+    emt_data = synthetic_emt(args.stops) if args.stops else []
+    for count in sorted({min(120, args.cameras), args.cameras}):
+        run_case(synthetic_cameras(count), emt_data, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
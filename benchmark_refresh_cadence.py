@@ -0,0 +1,84 @@
+"""
+Comprobación del refresco adaptativo.
+
+Simula cámaras que publican una imagen nueva cada cierto periodo y una
+vista que las consulta con RefreshCadence cada segundo, y comprueba que el
+intervalo aprendido converge al periodo real (con un error menor que un
+intervalo de consulta) y que no se pierden imágenes.
+
+Uso:
+    python benchmark_refresh_cadence.py [--duration S] [--poll S]
+"""
+
+import argparse
+import random
+import sys
+from typing import Tuple
+
+import config
+from src.utils.refresh_cadence import RefreshCadence
+
+
+def simulate(period: float, duration: float, poll: float, seed: int = 25830) -> Tuple[float, int, int, int]:
+    """
+    Simula una cámara con un periodo de actualización fijo.
+
+    Args:
+        period: Segundos entre imágenes nuevas de la cámara
+        duration: Segundos simulados
+        poll: Intervalo de refresco pedido por la vista
+        seed: Semilla para la fase inicial
+
+    Returns:
+        Tupla (intervalo aprendido, imágenes mostradas, imágenes publicadas, peticiones)
+    """
+    phase = random.Random(seed).uniform(0, period)
+    cadence = RefreshCadence()
+    shown = set()
+    requests = 0
+    last_frame = None
+    now = 0.0
+    while now < duration:
+        if cadence.is_due(1, poll, now):
+            requests += 1
+            frame = int((now + phase) // period)
+            cadence.record(1, changed=frame != last_frame, now=now)
+            last_frame = frame
+            shown.add(frame)
+        now += 1.0
+    published = int((duration + phase) // period) - int(phase // period) + 1
+    return cadence.get_interval(1) or 0.0, len(shown), published, requests
+
+
+def main():
+    """Función principal de la comprobación."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duration", type=float, default=3600, help="Segundos simulados por cámara")
+    parser.add_argument("--poll", type=float, default=config.ADAPTIVE_REFRESH_MIN_INTERVAL,
+                        help="Intervalo de refresco de la vista")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("  Refresco adaptativo")
+    print("=" * 50)
+    print()
+    print(f"  {'Periodo':>8} {'Aprendido':>10} {'Imágenes':>12} {'Peticiones':>11}")
+
+    ok = True
+    for period in (10, 30, 60, 120):
+        learned, shown, published, requests = simulate(period, args.duration, args.poll)
+        converged = abs(learned - period) <= args.poll
+        # Como mucho se pierde la primera imagen (antes de la primera petición)
+        complete = shown >= published - 1
+        ok = ok and converged and complete
+        print(
+            f"  {period:7.0f}s {learned:9.1f}s {shown:5d} de {published:<4d} {requests:11d}  "
+            f"{'✓' if converged and complete else '✗'}"
+        )
+    print()
+    print(f"{'✓' if ok else '✗'} El intervalo aprendido converge al periodo real")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
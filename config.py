@@ -8,6 +8,11 @@ from pathlib import Path
 
 # URL del dataset oficial
 CSV_URL = "https://datosabiertos.malaga.eu/recursos/transporte/trafico/da_camarasTrafico-25830.csv"
+CSV_TIMEOUT = 30  # segundos para descargar el CSV
+
+# Copia local del inventario: arranque inmediato y revalidación en segundo plano
+ENABLE_DATASET_SNAPSHOT = True
+DATASET_SNAPSHOT_FILE_NAME = "dataset.sqlite3"  # Fichero dentro de los datos de la aplicación
 
 # Configuración de la interfaz
 WINDOW_TITLE = "Cámaras de Tráfico - Málaga"
@@ -17,6 +22,30 @@ WINDOW_MIN_HEIGHT = 800
 # Configuración de actualización de imágenes
 IMAGE_REFRESH_INTERVAL = 30  # segundos
 IMAGE_TIMEOUT = 10  # segundos para timeout de descarga
+VISIBILITY_UPDATE_DELAY_MS = 100  # Espera tras scroll/redimensionado antes de recalcular las cámaras visibles
+VISIBILITY_PREFETCH_SCREENS = 1.0  # Pantallas por encima/debajo del área visible que se precargan
+VISIBILITY_LAYOUT_RETRIES = 5  # Recálculos extra mientras haya miniaturas aún sin layout (altura 0)
+SEARCH_DEBOUNCE_MS = 150  # Espera tras la última tecla antes de buscar y reconstruir la vista
+SPATIAL_INDEX_CELL_SIZE = 250  # Lado en metros de las celdas del índice espacial de cámaras
+IMAGE_QUEUE_MAX_SIZE = 64  # Descargas en espera como máximo (se descartan los refrescos más antiguos)
+IMAGE_FRESHNESS_WINDOW_MS = 1500  # Recargas de la misma cámara dentro de esta ventana reutilizan la última imagen
+
+# Refresco adaptativo: cada cámara se pide justo después de su siguiente
+# cambio previsto (aprendido de 304/hash), nunca antes del intervalo elegido
+ADAPTIVE_REFRESH = True
+ADAPTIVE_REFRESH_MIN_INTERVAL = 5  # Segundos mínimos entre peticiones a una misma cámara
+ADAPTIVE_REFRESH_MAX_INTERVAL = 300  # Segundos máximos sin pedir una cámara
+ADAPTIVE_REFRESH_MARGIN = 1.0  # Segundos que se añaden al cambio previsto al programar la siguiente petición
+ADAPTIVE_REFRESH_TICK_MS = 1000  # Frecuencia con la que se revisa qué cámaras toca refrescar
+
+# Cámaras caídas (circuit breaker): tras varios fallos seguidos se dejan de
+# pedir durante una espera que se duplica en cada apertura, y después se prueba
+CAMERA_FAILURE_THRESHOLD = 3  # Fallos seguidos para dar una cámara por caída
+CAMERA_BACKOFF_BASE = 15  # Segundos de espera tras la primera apertura
+CAMERA_BACKOFF_MAX = 600  # Espera máxima entre pruebas de una cámara
+HOST_FAILURE_THRESHOLD = 10  # Fallos de conexión seguidos para dar un servidor por caído
+HOST_BACKOFF_BASE = 10  # Segundos de espera tras la primera apertura de un servidor
+HOST_BACKOFF_MAX = 120  # Espera máxima entre pruebas de un servidor
 
 # Headers HTTP para peticiones de imágenes
 IMAGE_REQUEST_HEADERS = {
@@ -29,6 +58,27 @@ IMAGE_REQUEST_HEADERS = {
     'Sec-Fetch-Site': 'same-origin'
 }
 
+# Pool de conexiones HTTP compartido por todos los descargadores de imágenes
+HTTP_POOL_CONNECTIONS = 10  # Número de hosts distintos con pool propio
+HTTP_POOL_MAXSIZE = 32  # Conexiones keep-alive máximas por host
+HTTP_MAX_RETRIES = 2  # Reintentos ante fallos de conexión o respuestas transitorias
+HTTP_RETRY_BACKOFF = 0.5  # Factor de espera exponencial entre reintentos (segundos)
+HTTP_RETRY_STATUS_CODES = (502, 503, 504)  # Estados que se consideran transitorios
+
+# Motor de descargas: "threads" (requests en el QThreadPool) o "asyncio"
+# (bucle asyncio en un hilo propio; requiere aiohttp, si falta se usa "threads")
+FETCH_ENGINE = "threads"
+ASYNC_FETCH_CONCURRENCY = 64  # Peticiones simultáneas como máximo con el motor asyncio
+ASYNC_FETCH_LIMIT_PER_HOST = 16  # Conexiones simultáneas por host con el motor asyncio
+
+# Presupuesto global de red compartido por imágenes, timelapses y capas del mapa
+# (0 = sin límite). La grabación y la precarga dejan parte del cubo a las vistas en directo
+RATE_LIMIT_REQUESTS_PER_SECOND = 20  # Peticiones por segundo
+RATE_LIMIT_KB_PER_SECOND = 4096  # Kilobytes por segundo
+RATE_LIMIT_BURST_SECONDS = 2.0  # Segundos de presupuesto acumulable para ráfagas
+RATE_LIMIT_RECORDING_RESERVE = 0.25  # Fracción del cubo que la grabación no puede gastar
+RATE_LIMIT_BACKGROUND_RESERVE = 0.5  # Fracción del cubo que la precarga no puede gastar
+
 # Configuración de vista
 DEFAULT_VIEW_MODE = "lista"  # "lista" o "cuadricula"
 GRID_COLUMNS = 3  # Columnas en vista cuadrícula (calculado dinámicamente)
@@ -43,6 +93,11 @@ THUMBNAIL_SIZES = {
     5: (400, 300),   # Muy grande
 }
 DEFAULT_THUMBNAIL_ZOOM = 3  # Nivel de zoom por defecto (1-5)
+LIST_THUMBNAIL_SIZE = (80, 60)  # Miniatura de la vista lista
+
+# Escalado de imágenes en segundo plano
+SCALED_VARIANTS_PER_CAMERA = 4  # Tamaños escalados que se conservan por cámara
+IMAGE_RESCALE_DELAY_MS = 150  # Espera tras redimensionar antes de pedir el escalado fino
 
 # Sistema de favoritos
 MAX_FAVORITES = 25  # Límite de cámaras favoritas (configurable)
@@ -55,7 +110,14 @@ FLOATING_WINDOW_REFRESH_INTERVALS = [1, 3, 5, 10, 15, 30, 60, 120, 300]
 
 # Configuración de caché
 ENABLE_IMAGE_CACHE = True
-CACHE_MAX_SIZE = 100  # Número máximo de imágenes en caché
+IMAGE_CACHE_MAX_MB = 256  # Memoria máxima de píxeles en caché (~200 imágenes 640x480)
+
+# Caché persistente en disco del último fotograma de cada cámara (arranque en caliente)
+ENABLE_SNAPSHOT_CACHE = True
+SNAPSHOT_CACHE_DIR_NAME = "snapshots"  # Subdirectorio dentro de los datos de la aplicación
+SNAPSHOT_CACHE_MAX_MB = 200  # Tamaño máximo en disco
+SNAPSHOT_CACHE_TTL_HOURS = 24  # Los fotogramas más antiguos no se muestran al arrancar
+SNAPSHOT_CACHE_FLUSH_INTERVAL = 5  # Segundos mínimos entre escrituras del índice
 
 # Tema
 DEFAULT_THEME = "azul_profundo"  # Tema principal por defecto
@@ -141,6 +203,23 @@ MAP_DEFAULT_ZOOM = 13
 MAP_TILE_LAYER = "OpenStreetMap"  # Opciones: OpenStreetMap, CartoDB positron, CartoDB dark_matter
 MAP_COORDINATE_SYSTEM = "EPSG:25830"  # Sistema de coordenadas del CSV oficial
 MAP_TARGET_SYSTEM = "EPSG:4326"  # WGS84 (lat/lon) para folium
+MAP_LAYER_RADIUS_M = 0  # Solo se dibujan los elementos de las capas a menos de estos metros de una cámara (0 = todos)
+MAP_LAYERS_DEADLINE = 20  # Segundos para descargar todas las capas (en paralelo); las que no lleguen se omiten
+MAP_RENDERER = "template"  # "template" (marcadores en un array JSON + una plantilla de popup) o "folium" (un objeto por marcador)
+ENABLE_MAP_FRAGMENT_CACHE = True  # Al regenerar el mapa solo se reconstruyen las capas cuyas entradas cambiaron
+MAP_SIMPLIFY_GEOMETRY = True  # Simplificar carriles bici y cortes de tráfico antes de embeberlos
+MAP_SIMPLIFY_ZOOM = 17  # Zoom al que la simplificación no se aprecia
+MAP_SIMPLIFY_PIXELS = 0.5  # Desviación máxima en píxeles a MAP_SIMPLIFY_ZOOM (~0,5 m a zoom 17)
+MAP_COORDINATE_PRECISION = 6  # Decimales de las coordenadas de las capas (6 ≈ 0,1 m; 5 ≈ 1 m)
+MAP_LAYERS_TOPOJSON = False  # Embeber los carriles bici como TopoJSON (requiere MAP_SIMPLIFY_GEOMETRY; más pequeño, pero sin popup)
+MAP_TOPOJSON_QUANTIZATION = 100_000  # Posiciones por eje de la rejilla del TopoJSON
+
+# Caché en disco de las capas GeoJSON del mapa
+ENABLE_MAP_LAYER_CACHE = True
+MAP_LAYER_CACHE_DIR_NAME = "map_layers"  # Subdirectorio dentro de los datos de la aplicación
+MAP_LAYER_CACHE_TTL_HOURS = 24 * 7  # Capas casi estáticas (consulados, fuentes, wifi, desfibriladores...)
+MAP_LAYER_CACHE_TTL_TRAFFIC_HOURS = 1  # Cortes de tráfico: cambian a lo largo del día
+MAP_LAYER_CACHE_TTL_EMT_HOURS = 24  # Líneas y paradas de la EMT
 STREET_VIEW_URL_TEMPLATE = "https://www.google.com/maps/@?api=1&map_action=pano&viewpoint={lat},{lon}"
 
 # Distritos de Málaga (colores para el mapa)
@@ -6,14 +6,18 @@ el modelo de datos y las vistas.
 """
 
 from pathlib import Path
-from typing import List, Optional, Set, Tuple
+from typing import List, Optional, Sequence, Set, Tuple
 
 from PySide6.QtCore import QObject, Signal, QTimer, QThread
 import logging
 
 from src.models.camera import Camera
-from src.utils.data_loader import DataLoader
-from src.utils.image_loader import ImageLoader
+from src.models.camera_store import CameraStore, CameraView
+from src.models.dataset_diff import DatasetDiff
+from src.utils.async_fetcher import shutdown_fetch_engine
+from src.utils.coordinate_converter import get_converter
+from src.utils.image_loader import ImageLoader, PRIORITY_VISIBLE
+from src.controllers.refresh_scheduler import RefreshScheduler
 from src.utils.preferences import FavoritesManager
 from src.timelapse import TimelapseManager, TimelapseSession
 from src.workers import DataLoadWorker
@@ -30,7 +34,8 @@ class CameraController(QObject):
     
     # Señales
     data_loaded = Signal(bool)  # True si carga exitosa
-    cameras_updated = Signal(list)  # Lista de cámaras a mostrar
+    dataset_changed = Signal(object)  # DatasetDiff tras revalidar, solo si el inventario cambió
+    cameras_updated = Signal(object)  # Cámaras a mostrar (CameraView)
     loading_progress = Signal(str)  # Mensaje de progreso
     refresh_progress = Signal(int, int)  # (actual, total) para progreso de actualización
     favorites_updated = Signal(list)  # Lista de IDs favoritas
@@ -47,22 +52,31 @@ class CameraController(QObject):
         """
         super().__init__()
         
-        self.data_loader = DataLoader()
         self.image_loader = ImageLoader()
+        self.refresh_scheduler = RefreshScheduler(self.image_loader)
         try:
             self.favorites_manager: Optional[FavoritesManager] = FavoritesManager()
         except OSError:
             logger.exception("No fue posible inicializar el almacenamiento de favoritos; se usará modo volátil")
             self.favorites_manager = None
         
-        self.all_cameras: List[Camera] = []
-        self.filtered_cameras: List[Camera] = []
+        # Las cámaras viven en un almacén columnar; los filtros son vistas sin copias
+        self.store = CameraStore.from_cameras([])
+        self.all_cameras: CameraView = self.store.all()
+        self.filtered_cameras: CameraView = self.all_cameras
         self.selected_cameras: List[int] = []  # IDs de cámaras seleccionadas
         self.favorite_camera_ids: Set[int] = set()
         
+        # Filtros activos: se combinan por intersección de vistas
+        self.search_query = ""
+        self.zona_filter: Optional[str] = None
+        self.distrito_filter: Optional[str] = None
+        self.favorites_only = False
+        
         # Timer para actualización automática
         self.auto_refresh_timer = QTimer()
         self.auto_refresh_timer.timeout.connect(self._auto_refresh_images)
+        self.refresh_interval = config.IMAGE_REFRESH_INTERVAL
 
         # Timelapse
         self.timelapse_manager = TimelapseManager()
@@ -75,6 +89,7 @@ class CameraController(QObject):
         # Threads
         self.worker_thread = None
         self.worker = None
+        self.has_data = False  # True cuando ya se muestran datos (copia local o descarga)
         
         logger.info("CameraController inicializado")
     
@@ -91,6 +106,7 @@ class CameraController(QObject):
         
         # Conectar señales
         self.worker_thread.started.connect(self.worker.run)
+        self.worker.snapshot_loaded.connect(self._on_snapshot_loaded)
         self.worker.finished.connect(self._on_data_load_finished)
         self.worker.progress.connect(self.loading_progress.emit)
         
@@ -103,15 +119,45 @@ class CameraController(QObject):
         # Iniciar
         self.worker_thread.start()
         
-    def _on_data_load_finished(self, success: bool, cameras: List[Camera]):
+    def _on_snapshot_loaded(self, cameras: Sequence[Camera]):
         """
-        Callback cuando termina la carga de datos.
+        Callback cuando el worker carga la copia local (antes de revalidar con el servidor).
         """
+        self._set_dataset(cameras)
+        self.has_data = True
+        logger.info(f"Datos cargados desde la copia local: {len(self.all_cameras)} cámaras")
+        
+        self.data_loaded.emit(True)
+        self.cameras_updated.emit(self.filtered_cameras)
+        self.favorites_updated.emit(self.get_favorite_ids())
+    
+    def _on_data_load_finished(self, success: bool, cameras: Sequence[Camera], diff: Optional[DatasetDiff] = None):
+        """
+        Callback cuando termina la carga de datos.
+        
+        Args:
+            success: True si la descarga (o revalidación) fue bien
+            cameras: Cámaras descargadas
+            diff: Cámaras añadidas/eliminadas/modificadas, o None si no cambiaron
+        """
+        if self.has_data:
+            # Revalidación de la copia local: solo se notifica si algo cambió
+            if not success:
+                logger.warning("No se pudo revalidar el dataset; se mantienen los datos locales")
+                self.loading_progress.emit("Sin conexión: se muestran los datos guardados")
+            elif diff:
+                self._apply_dataset_diff(cameras, diff)
+            else:
+                if diff is not None:
+                    # Mismos datos con otro orden de filas: basta con cambiar de almacén
+                    self._set_dataset(cameras)
+                logger.info("Dataset sin cambios respecto a la copia local")
+                self.loading_progress.emit("Datos de cámaras al día")
+            return
+        
         if success:
-            self.all_cameras = cameras
-            self.filtered_cameras = self.all_cameras.copy()
-            self._initialize_favorites()
-            
+            self._set_dataset(cameras)
+            self.has_data = True
             logger.info(f"Datos cargados: {len(self.all_cameras)} cámaras")
         else:
             logger.error("Fallo en la carga de datos")
@@ -119,43 +165,84 @@ class CameraController(QObject):
         self.data_loaded.emit(success)
         self.cameras_updated.emit(self.filtered_cameras)
         self.favorites_updated.emit(self.get_favorite_ids())
+    
+    def _apply_dataset_diff(self, cameras: Sequence[Camera], diff: DatasetDiff):
+        """
+        Sustituye el inventario por uno revalidado y propaga solo lo que cambió.
+        
+        Los IDs son estables entre versiones, así que favoritos, selección y
+        grabaciones siguen apuntando a la misma cámara. Las vistas reciben el
+        diff (dataset_changed) en lugar de una lista completa que reconstruir.
+        
+        Args:
+            cameras: Vista del nuevo CameraStore
+            diff: Diferencias respecto al inventario anterior
+        """
+        previous_favorites = set(self.favorite_camera_ids)
+        self._set_dataset(cameras)
+        logger.info(f"Dataset actualizado: {len(self.all_cameras)} cámaras ({diff.summary()})")
+        
+        self.timelapse_manager.update_cameras(list(self.store.select_ids(diff.changed)), diff.removed)
+        self.dataset_changed.emit(diff)
+        if self.favorite_camera_ids != previous_favorites:
+            self.favorites_updated.emit(self.get_favorite_ids())
+    
+    def _set_dataset(self, cameras: Sequence[Camera]):
+        """
+        Sustituye el inventario y vuelve a aplicar los filtros activos.
+        
+        Args:
+            cameras: Vista de un CameraStore o secuencia de objetos Camera
+        """
+        self.store = cameras.store if isinstance(cameras, CameraView) else CameraStore.from_cameras(cameras)
+        self.all_cameras = self.store.all()
+        self._initialize_favorites()
+        self.filtered_cameras = self._compose_filters()
 
     def _on_thread_finished(self):
         """Limpieza referencias al terminar el thread."""
         self.worker_thread = None
         self.worker = None
     
-    def get_all_cameras(self) -> List[Camera]:
+    def get_all_cameras(self) -> CameraView:
         """
         Retorna todas las cámaras cargadas.
         
         Returns:
-            Lista completa de cámaras
+            Vista con todas las cámaras
         """
         return self.all_cameras
     
-    def get_filtered_cameras(self) -> List[Camera]:
+    def get_filtered_cameras(self) -> CameraView:
         """
         Retorna las cámaras actualmente filtradas.
         
         Returns:
-            Lista de cámaras filtradas
+            Vista con las cámaras filtradas
         """
         return self.filtered_cameras
     
+    def get_camera(self, camera_id: int) -> Optional[Camera]:
+        """
+        Obtiene una cámara por su ID.
+        
+        Args:
+            camera_id: ID de la cámara
+            
+        Returns:
+            Objeto Camera o None si no existe
+        """
+        return self.store.get(camera_id)
+    
     def search_cameras(self, query: str):
         """
         Busca cámaras por texto.
         
         Args:
-            query: Texto a buscar en nombre y dirección
+            query: Texto a buscar en nombre, dirección y zona (resultados por relevancia)
         """
-        if not query.strip():
-            self.filtered_cameras = self.all_cameras.copy()
-        else:
-            self.filtered_cameras = self.data_loader.search_cameras(query)
-        
-        self.cameras_updated.emit(self.filtered_cameras)
+        self.search_query = query.strip()
+        self._apply_filters()
         logger.info(f"Búsqueda '{query}': {len(self.filtered_cameras)} resultados")
     
     def filter_by_distrito(self, distrito: Optional[str]):
@@ -163,14 +250,10 @@ class CameraController(QObject):
         Filtra cámaras por distrito.
         
         Args:
-            distrito: ID del distrito o None para mostrar todas
+            distrito: ID del distrito o None para quitar el filtro
         """
-        if distrito is None or distrito == "Todos":
-            self.filtered_cameras = self.all_cameras.copy()
-        else:
-            self.filtered_cameras = self.data_loader.get_cameras_by_distrito(distrito)
-        
-        self.cameras_updated.emit(self.filtered_cameras)
+        self.distrito_filter = None if not distrito or distrito == "Todos" else distrito
+        self._apply_filters()
         logger.info(f"Filtro distrito '{distrito}': {len(self.filtered_cameras)} cámaras")
     
     def filter_by_zona(self, zona: Optional[str]):
@@ -178,18 +261,106 @@ class CameraController(QObject):
         Filtra cámaras por zona extraída de la dirección.
         
         Args:
-            zona: Nombre de la zona o None para mostrar todas
+            zona: Nombre de la zona o None para quitar el filtro
         """
-        if zona is None or zona == "Todas":
-            self.filtered_cameras = self.all_cameras.copy()
-        else:
-            self.filtered_cameras = [
-                cam for cam in self.all_cameras
-                if cam.get_zona_from_direccion() == zona
-            ]
+        self.zona_filter = None if not zona or zona == "Todas" else zona
+        self._apply_filters()
+        logger.info(f"Filtro zona '{zona}': {len(self.filtered_cameras)} cámaras")
+    
+    def filter_favorites(self, enabled: bool):
+        """
+        Limita las cámaras mostradas a las favoritas.
+        
+        Args:
+            enabled: True para mostrar solo favoritas
+        """
+        self.favorites_only = enabled
+        self._apply_filters()
+        logger.info(f"Filtro favoritas {'activo' if enabled else 'inactivo'}: {len(self.filtered_cameras)} cámaras")
+    
+    def clear_filters(self):
+        """
+        Quita todos los filtros (búsqueda, zona, distrito y favoritas).
+        """
+        self.search_query = ""
+        self.zona_filter = None
+        self.distrito_filter = None
+        self.favorites_only = False
+        self._apply_filters()
+    
+    def _compose_filters(self) -> CameraView:
+        """
+        Combina los filtros activos intersecando las vistas precalculadas.
         
+        Returns:
+            Vista resultante (ordenada por relevancia si hay búsqueda)
+        """
+        view = self.store.search(self.search_query) if self.search_query else self.all_cameras
+        if self.zona_filter is not None:
+            view = view & self.store.filter_zona(self.zona_filter)
+        if self.distrito_filter is not None:
+            view = view & self.store.filter_distrito(self.distrito_filter)
+        if self.favorites_only:
+            view = view & self.store.select_ids(self.favorite_camera_ids)
+        return view
+    
+    def _apply_filters(self):
+        """Recalcula las cámaras filtradas y notifica a las vistas."""
+        self.filtered_cameras = self._compose_filters()
+        self.refresh_scheduler.cancel_pending()
         self.cameras_updated.emit(self.filtered_cameras)
-        logger.info(f"Filtro zona '{zona}': {len(self.filtered_cameras)} cámaras")
+    
+    def get_nearest_cameras(self, lat: float, lon: float, k: int = 5) -> CameraView:
+        """
+        Obtiene las cámaras más cercanas a un punto.
+        
+        Args:
+            lat: Latitud WGS84
+            lon: Longitud WGS84
+            k: Número de cámaras
+            
+        Returns:
+            Vista ordenada de más cercana a más lejana
+        """
+        x, y = self._to_utm(lat, lon)
+        return self.store.nearest(x, y, k)
+    
+    def get_cameras_near(self, lat: float, lon: float, radius_m: float) -> CameraView:
+        """
+        Obtiene las cámaras a menos de una distancia de un punto (p. ej. una incidencia).
+        
+        Args:
+            lat: Latitud WGS84
+            lon: Longitud WGS84
+            radius_m: Radio en metros
+            
+        Returns:
+            Vista ordenada de más cercana a más lejana
+        """
+        x, y = self._to_utm(lat, lon)
+        return self.store.within_radius(x, y, radius_m)
+    
+    def get_cameras_in_bbox(self, south: float, west: float, north: float, east: float) -> CameraView:
+        """
+        Obtiene las cámaras dentro de un rectángulo geográfico.
+        
+        Args:
+            south: Latitud mínima
+            west: Longitud mínima
+            north: Latitud máxima
+            east: Longitud máxima
+            
+        Returns:
+            Vista en el orden del dataset
+        """
+        xs, ys = get_converter().reverse_many([west, east, west, east], [south, south, north, north])
+        return self.store.within_bbox(xs.min(), ys.min(), xs.max(), ys.max())
+    
+    @staticmethod
+    def _to_utm(lat: float, lon: float) -> Tuple[float, float]:
+        """Convierte un punto WGS84 a las coordenadas UTM del índice espacial."""
+        xs, ys = get_converter().reverse_many([lon], [lat])
+        return float(xs[0]), float(ys[0])
     
     def get_distritos(self) -> List[str]:
         """
@@ -198,7 +369,7 @@ class CameraController(QObject):
         Returns:
             Lista de IDs de distritos
         """
-        return self.data_loader.get_distritos()
+        return self.store.get_distritos()
     
     def get_zonas(self) -> List[str]:
         """
@@ -207,18 +378,115 @@ class CameraController(QObject):
         Returns:
             Lista de nombres de zonas
         """
-        return self.data_loader.get_zonas()
+        return self.store.get_zonas()
     
-    def load_camera_image(self, camera: Camera, force_reload: bool = False):
+    def get_zona_counts(self) -> dict:
+        """
+        Obtiene el número de cámaras de cada zona.
+        
+        Returns:
+            Diccionario zona -> número de cámaras, ordenado por zona
+        """
+        return self.store.get_zona_counts()
+    
+    def load_camera_image(self, camera: Camera, force_reload: bool = False, priority: int = PRIORITY_VISIBLE):
         """
         Carga la imagen de una cámara.
         
         Args:
             camera: Objeto Camera
             force_reload: Si True, ignora caché y recarga
+            priority: Prioridad de la descarga en el pool
         """
         if camera.url_imagen:
-            self.image_loader.load_image(camera.id, camera.url_imagen, force_reload)
+            self.image_loader.load_image(camera.id, camera.url_imagen, force_reload, priority)
+    
+    def set_visible_cameras(self, visible: List[Camera], nearby: Optional[List[Camera]] = None):
+        """
+        Informa de las cámaras en pantalla para priorizar su carga.
+        
+        Args:
+            visible: Cámaras visibles en la vista actual
+            nearby: Cámaras cercanas al área visible (se precargan con menor prioridad)
+        """
+        self.refresh_scheduler.update_visibility(visible, nearby or [])
+    
+    def get_queue_stats(self) -> dict:
+        """
+        Obtiene las métricas de la cola de descargas de imágenes.
+        
+        Returns:
+            Diccionario con profundidad, descartes, cancelaciones y tiempos de espera
+        """
+        return self.image_loader.get_queue_stats()
+    
+    def get_scheduler_stats(self) -> dict:
+        """
+        Obtiene el estado del planificador de refresco.
+        
+        Returns:
+            Diccionario con cámaras visibles, cercanas, pendientes y canceladas
+        """
+        return self.refresh_scheduler.get_stats()
+    
+    def get_network_stats(self) -> dict:
+        """
+        Obtiene las estadísticas del pool HTTP compartido para monitorización.
+        
+        Returns:
+            Diccionario con peticiones, errores, bytes y estado de cada pool
+        """
+        return self.image_loader.get_network_stats()
+    
+    def get_rate_stats(self) -> dict:
+        """
+        Obtiene el uso del presupuesto global de peticiones y ancho de banda.
+        
+        Returns:
+            Diccionario con límites, ritmo medido, utilización (0-1) y
+            peticiones aplazadas por clase de tráfico
+        """
+        return self.image_loader.get_rate_stats()
+    
+    def get_cadence_stats(self) -> dict:
+        """
+        Obtiene el ritmo de actualización aprendido de las cámaras.
+        
+        Returns:
+            Diccionario con cámaras seguidas, intervalos estimados y refrescos ahorrados
+        """
+        return self.image_loader.get_cadence_stats()
+    
+    def get_camera_health(self, camera: Camera) -> dict:
+        """
+        Obtiene el estado de salud de una cámara (circuit breaker).
+        
+        Args:
+            camera: Cámara a consultar
+            
+        Returns:
+            Diccionario con estado ("closed", "open", "half_open"), fallos
+            seguidos, último error, espera restante y estado del servidor
+        """
+        return self.image_loader.get_camera_health(camera.id, camera.url_imagen)
+    
+    def get_health_stats(self) -> dict:
+        """
+        Obtiene el resumen de cámaras y servidores caídos.
+        
+        Returns:
+            Diccionario con circuitos abiertos, peticiones evitadas y pruebas
+        """
+        return self.image_loader.get_health_stats()
+    
+    def get_cache_stats(self) -> dict:
+        """
+        Obtiene los contadores de la caché de imágenes en memoria.
+        
+        Returns:
+            Diccionario con aciertos, fallos, expulsiones y bytes ocupados
+        """
+        return self.image_loader.get_cache_stats()
     
     def start_auto_refresh(self, interval_seconds: int = None):
         """
@@ -230,7 +498,12 @@ class CameraController(QObject):
         if interval_seconds is None:
             interval_seconds = config.IMAGE_REFRESH_INTERVAL
         
-        self.auto_refresh_timer.start(interval_seconds * 1000)
+        self.refresh_interval = interval_seconds
+        if config.ADAPTIVE_REFRESH:
+            # El timer solo revisa; cada cámara se pide cuando le toca según su ritmo
+            self.auto_refresh_timer.start(config.ADAPTIVE_REFRESH_TICK_MS)
+        else:
+            self.auto_refresh_timer.start(interval_seconds * 1000)
         logger.info(f"Auto-refresco iniciado: cada {interval_seconds}s")
     
     def stop_auto_refresh(self):
@@ -245,23 +518,33 @@ class CameraController(QObject):
         Callback para refrescar imágenes automáticamente.
         """
         logger.debug("Refrescando imágenes automáticamente...")
-        # Recargar imágenes de cámaras visibles
-        for camera in self.filtered_cameras[:10]:  # Limitar a 10 por rendimiento
-            self.load_camera_image(camera, force_reload=True)
+        # Recargar solo las cámaras en pantalla (y las cercanas con menor prioridad)
+        if config.ADAPTIVE_REFRESH:
+            self.refresh_scheduler.refresh_visible(self.refresh_interval)
+        else:
+            self.refresh_scheduler.refresh_visible()
     
     def refresh_all_images(self):
         """
         Refresca todas las imágenes de las cámaras filtradas.
+        
+        Las imágenes en caché se conservan: sus validadores permiten pedirlas
+        de forma condicional y un 304 evita volver a descargarlas.
         """
         total_cameras = len(self.filtered_cameras)
         logger.info(f"Refrescando {total_cameras} imágenes...")
-        self.image_loader.clear_cache()
         
-        for index, camera in enumerate(self.filtered_cameras, start=1):
-            self.load_camera_image(camera, force_reload=True)
-            # Emitir progreso
-            self.refresh_progress.emit(index, total_cameras)
-            logger.debug(f"Actualizando cámara {index}/{total_cameras}")
+        # Las visibles se encolan con más prioridad que el resto
+        self.refresh_scheduler.refresh_cameras(self.filtered_cameras)
+        self.refresh_progress.emit(total_cameras, total_cameras)
+    
+    def shutdown(self):
+        """
+        Detiene el refresco y persiste las cachés antes de salir.
+        """
+        self.stop_auto_refresh()
+        self.image_loader.shutdown()
+        shutdown_fetch_engine()
     
     def select_camera(self, camera_id: int):
         """
@@ -296,10 +579,7 @@ class CameraController(QObject):
         Returns:
             Lista de objetos Camera seleccionados
         """
-        return [
-            cam for cam in self.all_cameras
-            if cam.id in self.selected_cameras
-        ]
+        return list(self.store.select_ids(self.selected_cameras))
 
     # ------------------------------------------------------------------
     # Timelapse
@@ -320,7 +600,7 @@ class CameraController(QObject):
         interval_seconds: Optional[int] = None,
         duration_seconds: Optional[int] = None,
     ) -> List[TimelapseSession]:
-        cameras = [camera for camera in self.all_cameras if camera.id in camera_ids]
+        cameras = list(self.store.select_ids(camera_ids))
         return self.timelapse_manager.start_timelapse(
             cameras,
             interval=interval_seconds,
@@ -350,10 +630,10 @@ class CameraController(QObject):
             except OSError:
                 logger.exception("No fue posible cargar favoritos persistidos")
 
-        available_ids = {camera.id for camera in self.all_cameras}
         self.favorite_camera_ids = {
-            camera_id for camera_id in stored_ids if camera_id in available_ids
+            camera_id for camera_id in stored_ids if camera_id in self.store
         }
+        self._sync_favorite_pins()
 
         if self.favorites_manager and len(self.favorite_camera_ids) != len(stored_ids):
             # Persistimos limpiar IDs que ya no existen
@@ -365,8 +645,7 @@ class CameraController(QObject):
 
     def get_favorite_cameras(self) -> List[Camera]:
         """Obtiene los objetos Camera marcados como favoritos."""
-        favorite_map = {camera.id: camera for camera in self.all_cameras}
-        return [favorite_map[camera_id] for camera_id in self.get_favorite_ids() if camera_id in favorite_map]
+        return list(self.store.select_ids(self.get_favorite_ids()))
 
     def is_favorite(self, camera_id: int) -> bool:
         """Indica si una cámara está marcada como favorita."""
@@ -388,24 +667,30 @@ class CameraController(QObject):
             )
             return False, message
 
-        if not any(camera.id == camera_id for camera in self.all_cameras):
+        if camera_id not in self.store:
             return False, "La cámara seleccionada ya no está disponible."
 
         self.favorite_camera_ids.add(camera_id)
+        self.image_loader.pin_image(camera_id, "favoritos")
         self._persist_favorites()
         self.favorites_updated.emit(self.get_favorite_ids())
         self.favorite_toggled.emit(camera_id, True)
         logger.info("Cámara %s añadida a favoritos", camera_id)
+        if self.favorites_only:
+            self._apply_filters()
         return True, None
 
     def remove_favorite(self, camera_id: int) -> None:
         """Elimina una cámara de la lista de favoritas."""
         if camera_id in self.favorite_camera_ids:
             self.favorite_camera_ids.remove(camera_id)
+            self.image_loader.unpin_image(camera_id, "favoritos")
             self._persist_favorites()
             self.favorites_updated.emit(self.get_favorite_ids())
             self.favorite_toggled.emit(camera_id, False)
             logger.info("Cámara %s eliminada de favoritos", camera_id)
+            if self.favorites_only:
+                self._apply_filters()
 
     def toggle_favorite(self, camera_id: int) -> Tuple[bool, bool, Optional[str]]:
         """Alterna el estado de favorito de una cámara."""
@@ -416,6 +701,12 @@ class CameraController(QObject):
         success, message = self.add_favorite(camera_id)
         return success, success, message
 
+    def _sync_favorite_pins(self) -> None:
+        """Fija en la caché de imágenes exactamente las cámaras favoritas."""
+        self.image_loader.unpin_owner("favoritos")
+        for camera_id in self.favorite_camera_ids:
+            self.image_loader.pin_image(camera_id, "favoritos")
+
     def _persist_favorites(self) -> None:
         """Guarda la lista de favoritos en el almacenamiento persistente."""
         if not self.favorites_manager:
@@ -0,0 +1,168 @@
+"""
+Planificador de carga y refresco de imágenes según visibilidad.
+
+Las vistas informan de qué cámaras están realmente en pantalla y cuáles
+están a punto de entrar al hacer scroll. El planificador pide primero las
+visibles, con menor prioridad las cercanas, y retira de la cola las
+descargas que dejan de ser útiles (scroll, cambio de filtro o de vista).
+"""
+
+from typing import Dict, Iterable, List, Optional, Set
+import logging
+
+from PySide6.QtCore import QObject
+
+from src.models.camera import Camera
+from src.utils.image_loader import (
+    ImageLoader,
+    PRIORITY_VISIBLE,
+    PRIORITY_NEARBY,
+    PRIORITY_BACKGROUND,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshScheduler(QObject):
+    """
+    Decide qué imágenes se cargan y con qué prioridad según su visibilidad.
+    """
+
+    def __init__(self, image_loader: ImageLoader):
+        """
+        Inicializa el planificador.
+
+        Args:
+            image_loader: Cargador de imágenes al que se delegan las descargas
+        """
+        super().__init__()
+        self.image_loader = image_loader
+
+        self.visible_ids: List[int] = []
+        self.nearby_ids: List[int] = []
+        self._cameras: Dict[int, Camera] = {}
+        # Cámaras cuya descarga pidió el planificador y aún puede cancelar
+        self._requested: Set[int] = set()
+        self.cancelled_requests = 0
+
+    def update_visibility(self, visible: Iterable[Camera], nearby: Iterable[Camera] = ()):
+        """
+        Actualiza las cámaras en pantalla y carga las que lo necesiten.
+
+        Las cámaras que salen de pantalla y no están cerca se retiran de la
+        cola si su descarga todavía no había empezado.
+
+        Args:
+            visible: Cámaras visibles, en orden de lectura
+            nearby: Cámaras fuera de pantalla pero cercanas (prefetch)
+        """
+        visible = list(visible)
+        nearby = list(nearby)
+        self._cameras = {camera.id: camera for camera in visible + nearby}
+        self.visible_ids = [camera.id for camera in visible]
+        self.nearby_ids = [camera.id for camera in nearby]
+
+        self._cancel_outside(set(self._cameras))
+
+        for camera in visible:
+            self._request(camera, force_reload=False, priority=PRIORITY_VISIBLE)
+        for camera in nearby:
+            self._request(camera, force_reload=False, priority=PRIORITY_NEARBY)
+
+    def refresh_visible(self, interval: Optional[float] = None):
+        """
+        Fuerza la recarga de las cámaras en pantalla y, después, de las cercanas.
+        
+        Args:
+            interval: Intervalo de auto-refresco en segundos. Si se indica,
+                solo se recargan las cámaras a las que ya les toca según su
+                ritmo de actualización aprendido (refresco adaptativo)
+        """
+        requested = 0
+        for camera_ids, priority in ((self.visible_ids, PRIORITY_VISIBLE), (self.nearby_ids, PRIORITY_NEARBY)):
+            for camera_id in camera_ids:
+                if interval is not None and not self.image_loader.is_refresh_due(camera_id, interval):
+                    continue
+                self._request(self._cameras[camera_id], force_reload=True, priority=priority)
+                requested += 1
+        if requested:
+            logger.debug(
+                f"Refresco programado: {requested} de {len(self.visible_ids)} visibles "
+                f"y {len(self.nearby_ids)} cercanas"
+            )
+
+    def refresh_cameras(self, cameras: Iterable[Camera]):
+        """
+        Fuerza la recarga de un conjunto de cámaras priorizando las visibles.
+
+        Args:
+            cameras: Cámaras a recargar (ej: todas las filtradas)
+        """
+        visible = set(self.visible_ids)
+        nearby = set(self.nearby_ids)
+        for camera in cameras:
+            if camera.id in visible:
+                priority = PRIORITY_VISIBLE
+            elif camera.id in nearby:
+                priority = PRIORITY_NEARBY
+            else:
+                priority = PRIORITY_BACKGROUND
+            self._request(camera, force_reload=True, priority=priority)
+
+    def cancel_pending(self):
+        """
+        Retira de la cola todas las descargas pedidas por el planificador.
+
+        Se usa al cambiar de filtro o de vista, cuando las cámaras en cola
+        ya no se van a mostrar. Abre una nueva generación en el cargador,
+        que descarta de una vez todo lo encolado antes.
+        """
+        self.image_loader.next_generation()
+        self._requested.clear()
+        self.visible_ids = []
+        self.nearby_ids = []
+        self._cameras = {}
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Retorna el estado del planificador.
+
+        Returns:
+            Diccionario con cámaras visibles, cercanas, pendientes y canceladas
+        """
+        return {
+            "visible": len(self.visible_ids),
+            "nearby": len(self.nearby_ids),
+            "pending": sum(1 for camera_id in self._requested if self.image_loader.is_pending(camera_id)),
+            "cancelled": self.cancelled_requests,
+        }
+
+    def _request(self, camera: Camera, force_reload: bool, priority: int):
+        """
+        Pide la imagen de una cámara al cargador.
+
+        Args:
+            camera: Cámara a cargar
+            force_reload: Si True, ignora la caché
+            priority: Prioridad de la descarga
+        """
+        if not camera.url_imagen:
+            return
+        self.image_loader.load_image(camera.id, camera.url_imagen, force_reload, priority)
+        if self.image_loader.is_pending(camera.id):
+            self._requested.add(camera.id)
+
+    def _cancel_outside(self, keep: Set[int]):
+        """
+        Cancela las descargas en cola de cámaras que ya no interesan.
+
+        Args:
+            keep: IDs de cámaras cuya descarga se mantiene
+        """
+        for camera_id in list(self._requested):
+            if camera_id in keep:
+                continue
+            self._requested.discard(camera_id)
+            if self.image_loader.cancel(camera_id):
+                self.cancelled_requests += 1
@@ -10,6 +10,47 @@ from typing import Optional, Tuple
 import re
 
 
+# Patrones comunes de zonas (fragmento de la dirección -> zona)
+ZONAS_CONOCIDAS = {
+    "ALAMEDA": "Centro - Alameda",
+    "LARIOS": "Centro",
+    "MALAGUETA": "Malagueta",
+    "PEDREGALEJOS": "Pedregalejo",
+    "CARRETERA DE CADIZ": "Carretera de Cádiz",
+    "PASEO MARITIMO": "Paseo Marítimo",
+    "TEATINOS": "Teatinos",
+    "CRUZ DE HUMILLADERO": "Cruz de Humilladero",
+    "CAMPANILLAS": "Campanillas",
+    "PUERTO": "Puerto",
+    "CENTRO": "Centro",
+    "ANDALUCIA": "Zona Andalucía",
+}
+
+
+def zona_from_direccion(direccion: str) -> str:
+    """
+    Extrae una zona/barrio aproximado desde una dirección.
+    
+    Args:
+        direccion: Dirección de la cámara
+        
+    Returns:
+        String con la zona extraída
+    """
+    if not direccion:
+        return "Sin zona"
+    
+    # Buscar nombres de calles/avenidas principales
+    direccion_upper = direccion.upper()
+    for patron, zona in ZONAS_CONOCIDAS.items():
+        if patron in direccion_upper:
+            return zona
+    
+    # Si no coincide, retornar primeras palabras de la dirección
+    palabras = direccion.split()[:3]
+    return " ".join(palabras) if palabras else "Otra zona"
+
+
 @dataclass
 class Camera:
     """
@@ -21,10 +62,11 @@ class Camera:
         direccion: Descripción de la ubicación
         url_imagen: URL de la imagen en tiempo real
         url: URL de la web oficial de la cámara
-        coordenadas: Tupla (x, y) con las coordenadas
+        coordenadas: Tupla (x, y) con las coordenadas UTM (EPSG:25830)
         geometry_raw: String original del campo ukb_geometry
         acceso: Información de accesibilidad (PMR, etc)
         distrito: ID del distrito (si está disponible)
+        latlon: Tupla (lat, lon) en WGS84, calculada una vez al cargar los datos
     """
     
     id: int
@@ -36,6 +78,7 @@ class Camera:
     geometry_raw: Optional[str] = None
     acceso: Optional[str] = None
     distrito: Optional[str] = None
+    latlon: Optional[Tuple[float, float]] = None
     
     def __post_init__(self):
         """Procesa los datos después de la inicialización."""
@@ -90,35 +133,7 @@ class Camera:
         Returns:
             String con la zona extraída
         """
-        if not self.direccion:
-            return "Sin zona"
-        
-        # Buscar nombres de calles/avenidas principales
-        direccion_upper = self.direccion.upper()
-        
-        # Patrones comunes de zonas
-        zonas_conocidas = {
-            "ALAMEDA": "Centro - Alameda",
-            "LARIOS": "Centro",
-            "MALAGUETA": "Malagueta",
-            "PEDREGALEJOS": "Pedregalejo",
-            "CARRETERA DE CADIZ": "Carretera de Cádiz",
-            "PASEO MARITIMO": "Paseo Marítimo",
-            "TEATINOS": "Teatinos",
-            "CRUZ DE HUMILLADERO": "Cruz de Humilladero",
-            "CAMPANILLAS": "Campanillas",
-            "PUERTO": "Puerto",
-            "CENTRO": "Centro",
-            "ANDALUCIA": "Zona Andalucía",
-        }
-        
-        for patron, zona in zonas_conocidas.items():
-            if patron in direccion_upper:
-                return zona
-        
-        # Si no coincide, retornar primeras palabras de la dirección
-        palabras = self.direccion.split()[:3]
-        return " ".join(palabras) if palabras else "Otra zona"
+        return zona_from_direccion(self.direccion)
     
     def __str__(self) -> str:
         """Representación en string de la cámara."""
@@ -0,0 +1,471 @@
+"""
+Almacén columnar de cámaras de tráfico.
+
+En lugar de una lista de objetos Camera, los datos se guardan por columnas:
+IDs y coordenadas en arrays de NumPy, textos internados y distrito/zona
+como códigos de categoría. Los filtros devuelven vistas (CameraView) que
+solo guardan un array de posiciones, sin copiar cámaras. Los objetos Camera
+se crean bajo demanda cuando una vista los recorre y se comparten mientras
+alguien los use.
+"""
+
+from collections.abc import Sequence
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple, Union
+import hashlib
+import sys
+import weakref
+
+import numpy as np
+
+from src.models.camera import Camera, zona_from_direccion
+from src.models.dataset_diff import camera_keys
+from src.models.search_index import SearchIndex
+from src.utils.spatial_index import SpatialIndex
+
+
+def _intern(value):
+    """Interna las cadenas para que los valores repetidos compartan memoria."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _categorize(values: Iterable[Hashable]) -> Tuple[np.ndarray, List]:
+    """
+    Codifica una columna como categorías.
+
+    Args:
+        values: Valores de la columna (None = sin valor)
+
+    Returns:
+        Tupla (códigos, categorías): código -1 para None
+    """
+    categories: List = []
+    index: Dict[Hashable, int] = {}
+    codes = []
+    for value in values:
+        if value is None:
+            codes.append(-1)
+            continue
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(categories)
+            categories.append(value)
+        codes.append(code)
+    return np.asarray(codes, dtype=np.int32), categories
+
+
+def _group_positions(codes: np.ndarray, categories: List) -> Dict[Hashable, np.ndarray]:
+    """
+    Índice categoría -> posiciones (ordenadas) a partir de una columna codificada.
+
+    Args:
+        codes: Códigos de categoría por posición (-1 = sin valor)
+        categories: Valor de cada código
+
+    Returns:
+        Diccionario con las posiciones de cada categoría
+    """
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(categories) + 1))
+    return {
+        value: order[bounds[code]:bounds[code + 1]]
+        for code, value in enumerate(categories)
+    }
+
+
+class CameraStore:
+    """
+    Cámaras guardadas por columnas con acceso por posición o por ID.
+    """
+
+    def __init__(
+        self,
+        ids: Sequence,
+        nombres: List[str],
+        direcciones: List[str],
+        urls_imagen: List[str],
+        urls: List[str],
+        x: Sequence,
+        y: Sequence,
+        lat: Sequence,
+        lon: Sequence,
+        geometries: List[Optional[str]],
+        accesos: List[Optional[str]],
+        distritos: List[Optional[str]]
+    ):
+        """
+        Inicializa el almacén a partir de columnas alineadas (una fila por cámara).
+
+        Args:
+            ids: Identificadores de las cámaras
+            nombres: Nombres técnicos
+            direcciones: Direcciones
+            urls_imagen: URLs de la imagen en tiempo real
+            urls: URLs de la web oficial
+            x: Coordenada X UTM (NaN si no hay)
+            y: Coordenada Y UTM (NaN si no hay)
+            lat: Latitud WGS84 (NaN si no hay)
+            lon: Longitud WGS84 (NaN si no hay)
+            geometries: Texto original de la geometría
+            accesos: Información de accesibilidad
+            distritos: ID del distrito (None si no hay)
+        """
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+
+        self.nombres = [_intern(value) for value in nombres]
+        self.direcciones = [_intern(value) for value in direcciones]
+        self.urls_imagen = urls_imagen
+        self.urls = urls
+        self.geometries = geometries
+        self.accesos = [_intern(value) for value in accesos]
+        self.distrito_codes, self.distrito_values = _categorize(distritos)
+        self.zona_codes, self.zona_values = _categorize(
+            zona_from_direccion(direccion) for direccion in self.direcciones
+        )
+
+        # Posiciones de cada distrito y zona, calculadas una vez por dataset
+        self._distrito_index = _group_positions(self.distrito_codes, self.distrito_values)
+        self._zona_index = _group_positions(self.zona_codes, self.zona_values)
+
+        # Índice de búsqueda: se construye una vez, la primera vez que se pide
+        self._search_index: Optional[SearchIndex] = None
+        self._spatial_index: Optional[SpatialIndex] = None
+        self._keys: Optional[List[str]] = None
+        self._positions: Dict[int, int] = {
+            camera_id: position for position, camera_id in enumerate(self.ids.tolist())
+        }
+        self._cameras: "weakref.WeakValueDictionary[int, Camera]" = weakref.WeakValueDictionary()
+        self._all = CameraView(self, np.arange(len(self.ids)))
+
+    @classmethod
+    def from_cameras(cls, cameras: Iterable[Camera]) -> "CameraStore":
+        """
+        Construye el almacén a partir de objetos Camera.
+
+        Args:
+            cameras: Cámaras a guardar
+
+        Returns:
+            Almacén con los datos de las cámaras
+        """
+        cameras = list(cameras)
+        nan = float("nan")
+        return cls(
+            ids=[camera.id for camera in cameras],
+            nombres=[camera.nombre for camera in cameras],
+            direcciones=[camera.direccion for camera in cameras],
+            urls_imagen=[camera.url_imagen for camera in cameras],
+            urls=[camera.url for camera in cameras],
+            x=[camera.coordenadas[0] if camera.coordenadas else nan for camera in cameras],
+            y=[camera.coordenadas[1] if camera.coordenadas else nan for camera in cameras],
+            lat=[camera.latlon[0] if camera.latlon else nan for camera in cameras],
+            lon=[camera.latlon[1] if camera.latlon else nan for camera in cameras],
+            geometries=[camera.geometry_raw for camera in cameras],
+            accesos=[camera.acceso for camera in cameras],
+            distritos=[camera.distrito for camera in cameras],
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, camera_id: int) -> bool:
+        return camera_id in self._positions
+
+    def camera(self, position: int) -> Camera:
+        """
+        Obtiene el objeto Camera de una posición, creándolo si hace falta.
+
+        Args:
+            position: Posición de la cámara en el almacén
+
+        Returns:
+            Objeto Camera (el mismo mientras alguna vista lo mantenga vivo)
+        """
+        camera = self._cameras.get(position)
+        if camera is not None:
+            return camera
+
+        x, y = self.x[position], self.y[position]
+        lat, lon = self.lat[position], self.lon[position]
+        distrito_code = self.distrito_codes[position]
+        camera = Camera(
+            id=int(self.ids[position]),
+            nombre=self.nombres[position],
+            direccion=self.direcciones[position],
+            url_imagen=self.urls_imagen[position],
+            url=self.urls[position],
+            coordenadas=None if np.isnan(x) or np.isnan(y) else (float(x), float(y)),
+            geometry_raw=self.geometries[position],
+            acceso=self.accesos[position],
+            distrito=None if distrito_code < 0 else self.distrito_values[distrito_code],
+            latlon=None if np.isnan(lat) or np.isnan(lon) else (float(lat), float(lon)),
+        )
+        self._cameras[position] = camera
+        return camera
+
+    def position_of(self, camera_id: int) -> Optional[int]:
+        """
+        Retorna la posición de una cámara por su ID.
+
+        Args:
+            camera_id: ID de la cámara
+        """
+        return self._positions.get(camera_id)
+
+    def get(self, camera_id: int) -> Optional[Camera]:
+        """
+        Obtiene una cámara por su ID.
+
+        Args:
+            camera_id: ID de la cámara
+
+        Returns:
+            Objeto Camera o None si no existe
+        """
+        position = self._positions.get(camera_id)
+        return None if position is None else self.camera(position)
+
+    def all(self) -> "CameraView":
+        """Vista con todas las cámaras en el orden del dataset."""
+        return self._all
+
+    def view(self, positions) -> "CameraView":
+        """
+        Crea una vista sobre unas posiciones del almacén.
+
+        Args:
+            positions: Array o secuencia de posiciones
+        """
+        return CameraView(self, np.asarray(positions, dtype=np.intp))
+
+    def select_ids(self, camera_ids: Iterable[int]) -> "CameraView":
+        """
+        Vista con las cámaras de unos IDs, en el orden del dataset.
+
+        Args:
+            camera_ids: IDs a incluir (los que no existen se ignoran)
+        """
+        positions = [self._positions[camera_id] for camera_id in camera_ids if camera_id in self._positions]
+        return self.view(np.unique(np.asarray(positions, dtype=np.intp)))
+
+    def filter_distrito(self, distrito) -> "CameraView":
+        """
+        Vista con las cámaras de un distrito.
+
+        Args:
+            distrito: ID del distrito
+        """
+        return self._filter_category(self._distrito_index, distrito)
+
+    def filter_zona(self, zona: str) -> "CameraView":
+        """
+        Vista con las cámaras de una zona extraída de la dirección.
+
+        Args:
+            zona: Nombre de la zona
+        """
+        return self._filter_category(self._zona_index, zona)
+
+    def search(self, query: str) -> "CameraView":
+        """
+        Vista con las cámaras cuyo nombre, dirección o zona contienen los términos buscados.
+
+        Args:
+            query: Texto a buscar (sin distinguir mayúsculas ni tildes)
+
+        Returns:
+            Vista ordenada por relevancia
+        """
+        return self.view(self.build_search_index().search(query))
+
+    def build_search_index(self) -> SearchIndex:
+        """
+        Retorna el índice de búsqueda, construyéndolo la primera vez.
+
+        El almacén no cambia tras crearse, así que el índice solo se rehace
+        cuando se carga un dataset nuevo (otro CameraStore).
+
+        Returns:
+            Índice de trigramas del almacén
+        """
+        if self._search_index is None:
+            zonas = [self.zona_values[code] for code in self.zona_codes.tolist()]
+            self._search_index = SearchIndex(self.nombres, self.direcciones, zonas)
+        return self._search_index
+
+    def build_spatial_index(self) -> SpatialIndex:
+        """
+        Retorna el índice espacial sobre las coordenadas UTM, construyéndolo la primera vez.
+
+        Returns:
+            Índice de rejilla del almacén
+        """
+        if self._spatial_index is None:
+            self._spatial_index = SpatialIndex(self.x, self.y)
+        return self._spatial_index
+
+    def nearest(self, x: float, y: float, k: int = 1) -> "CameraView":
+        """
+        Vista con las k cámaras más cercanas a un punto UTM.
+
+        Args:
+            x: Coordenada X (EPSG:25830)
+            y: Coordenada Y (EPSG:25830)
+            k: Número de cámaras
+
+        Returns:
+            Vista ordenada de más cercana a más lejana
+        """
+        positions, _ = self.build_spatial_index().nearest(x, y, k)
+        return CameraView(self, positions)
+
+    def within_radius(self, x: float, y: float, radius: float) -> "CameraView":
+        """
+        Vista con las cámaras a menos de un radio de un punto UTM.
+
+        Args:
+            x: Coordenada X (EPSG:25830)
+            y: Coordenada Y (EPSG:25830)
+            radius: Radio en metros
+
+        Returns:
+            Vista ordenada de más cercana a más lejana
+        """
+        positions, _ = self.build_spatial_index().within_radius(x, y, radius)
+        return CameraView(self, positions)
+
+    def within_bbox(self, min_x: float, min_y: float, max_x: float, max_y: float) -> "CameraView":
+        """
+        Vista con las cámaras dentro de un rectángulo UTM.
+
+        Args:
+            min_x: X mínima
+            min_y: Y mínima
+            max_x: X máxima
+            max_y: Y máxima
+
+        Returns:
+            Vista en el orden del dataset
+        """
+        return CameraView(self, self.build_spatial_index().within_bbox(min_x, min_y, max_x, max_y))
+
+    @property
+    def keys(self) -> List[str]:
+        """Clave estable de cada cámara (nombre o URL de imagen), para conservar IDs entre recargas."""
+        if self._keys is None:
+            self._keys = camera_keys(self.nombres, self.urls_imagen)
+        return self._keys
+
+    def fingerprint(self) -> str:
+        """
+        Huella del contenido del almacén (cambia si cambia cualquier dato de una cámara).
+
+        Returns:
+            Hash SHA-1 en hexadecimal
+        """
+        digest = hashlib.sha1()
+        for array in (self.ids, self.x, self.y):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        distritos = [
+            None if code < 0 else self.distrito_values[code] for code in self.distrito_codes.tolist()
+        ]
+        for column in (self.nombres, self.direcciones, self.urls_imagen, self.urls, self.accesos, distritos):
+            digest.update("\x1f".join(map(str, column)).encode("utf-8", "surrogatepass"))
+            digest.update(b"\x1e")
+        return digest.hexdigest()
+
+    def get_distritos(self) -> List:
+        """Lista ordenada de distritos con al menos una cámara."""
+        return sorted(value for value in self.distrito_values if value)
+
+    def get_zonas(self) -> List[str]:
+        """Lista ordenada de zonas con al menos una cámara."""
+        return sorted(self.zona_values)
+
+    def get_distrito_counts(self) -> Dict:
+        """Número de cámaras de cada distrito, en el orden de get_distritos()."""
+        return {value: len(self._distrito_index[value]) for value in self.get_distritos()}
+
+    def get_zona_counts(self) -> Dict[str, int]:
+        """Número de cámaras de cada zona, en el orden de get_zonas()."""
+        return {value: len(self._zona_index[value]) for value in self.get_zonas()}
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Retorna el tamaño del almacén.
+
+        Returns:
+            Diccionario con cámaras, objetos Camera vivos y bytes de las columnas numéricas
+        """
+        arrays = (self.ids, self.x, self.y, self.lat, self.lon, self.distrito_codes, self.zona_codes)
+        return {
+            "cameras": len(self),
+            "materialized": len(self._cameras),
+            "distritos": len(self.distrito_values),
+            "zonas": len(self.zona_values),
+            "array_bytes": sum(array.nbytes for array in arrays),
+        }
+
+    def _filter_category(self, index: Dict[Hashable, np.ndarray], value) -> "CameraView":
+        """Vista con las posiciones precalculadas de una categoría."""
+        positions = index.get(value)
+        return self.view([]) if positions is None else CameraView(self, positions)
+
+
+class CameraView(Sequence):
+    """
+    Secuencia inmutable de cámaras de un CameraStore (solo guarda posiciones).
+
+    Se comporta como una lista de solo lectura: admite len(), iteración,
+    índices y slices. Los objetos Camera se crean al accederlos.
+    """
+
+    __slots__ = ("store", "positions")
+
+    def __init__(self, store: CameraStore, positions: np.ndarray):
+        """
+        Inicializa la vista.
+
+        Args:
+            store: Almacén de origen
+            positions: Array de posiciones en el almacén
+        """
+        self.store = store
+        self.positions = positions
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return CameraView(self.store, self.positions[index])
+        return self.store.camera(int(self.positions[index]))
+
+    def __iter__(self) -> Iterator[Camera]:
+        camera = self.store.camera
+        for position in self.positions.tolist():
+            yield camera(position)
+
+    def __repr__(self) -> str:
+        return f"CameraView({len(self)} cámaras)"
+
+    def copy(self) -> "CameraView":
+        """Las vistas son inmutables: la copia es la propia vista."""
+        return self
+
+    def ids(self) -> np.ndarray:
+        """IDs de las cámaras de la vista."""
+        return self.store.ids[self.positions]
+
+    def __and__(self, other: "CameraView") -> "CameraView":
+        """
+        Intersección de dos vistas del mismo almacén.
+
+        Conserva el orden de la vista izquierda (p. ej. la relevancia de una búsqueda).
+        """
+        if other.store is not self.store:
+            return NotImplemented
+        return CameraView(self.store, self.positions[np.isin(self.positions, other.positions)])
@@ -0,0 +1,173 @@
+"""
+Comparación entre dos versiones del inventario de cámaras.
+
+Cada cámara se identifica por una clave estable (su nombre técnico o, si no
+lo tiene, la URL de su imagen) y no por la fila del CSV. Al recargar los
+datos, las cámaras conservan el ID que tenían aunque cambie el orden de las
+filas, y las diferencias se resumen en cámaras añadidas, eliminadas y
+modificadas para que las vistas se actualicen sin reconstruirse.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence
+
+# Prefijo del nombre que reciben las cámaras sin NOMBRE en el CSV ("Cámara <ID>")
+DEFAULT_NAME_PREFIX = "Cámara "
+
+
+@dataclass
+class DatasetDiff:
+    """
+    Diferencias entre dos inventarios, por ID de cámara.
+
+    Atributos:
+        added: IDs de cámaras nuevas
+        removed: IDs de cámaras que ya no están
+        changed: IDs de cámaras con algún dato distinto
+    """
+
+    added: List[int] = field(default_factory=list)
+    removed: List[int] = field(default_factory=list)
+    changed: List[int] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def summary(self) -> str:
+        """Texto corto con el número de cámaras de cada tipo de cambio."""
+        return f"{len(self.added)} nuevas, {len(self.removed)} eliminadas, {len(self.changed)} modificadas"
+
+
+def default_camera_name(camera_id: int) -> str:
+    """
+    Nombre que se muestra para una cámara sin NOMBRE en el CSV.
+
+    Args:
+        camera_id: ID (estable) de la cámara
+
+    Returns:
+        Nombre generado
+    """
+    return f"{DEFAULT_NAME_PREFIX}{camera_id}"
+
+
+def is_default_name(nombre) -> bool:
+    """
+    Indica si un nombre es el generado por default_camera_name().
+
+    Args:
+        nombre: Nombre de la cámara
+    """
+    return (
+        isinstance(nombre, str)
+        and nombre.startswith(DEFAULT_NAME_PREFIX)
+        and nombre[len(DEFAULT_NAME_PREFIX):].isdigit()
+    )
+
+
+def camera_keys(nombres: Sequence, urls_imagen: Sequence) -> List[str]:
+    """
+    Calcula la clave estable de cada cámara.
+
+    Los nombres generados para cámaras sin NOMBRE dependen de su ID, así que
+    no sirven de clave: esas cámaras se identifican por la URL de su imagen.
+
+    Args:
+        nombres: Nombres técnicos de las cámaras
+        urls_imagen: URLs de imagen (se usan si falta el nombre)
+
+    Returns:
+        Lista de claves; las repetidas se distinguen por su número de aparición
+    """
+    keys = []
+    seen: Dict[str, int] = {}
+    for nombre, url_imagen in zip(nombres, urls_imagen):
+        if nombre and not is_default_name(nombre):
+            key = str(nombre).strip()
+        else:
+            key = str(url_imagen or "")
+        count = seen.get(key, 0)
+        seen[key] = count + 1
+        keys.append(key if not count else f"{key}#{count + 1}")
+    return keys
+
+
+def assign_stable_ids(keys: Sequence[str], default_ids: Sequence[int], previous) -> List[int]:
+    """
+    Asigna IDs conservando los de las cámaras que ya existían.
+
+    Las cámaras nuevas usan su ID por defecto (la fila) salvo que ya lo haya
+    usado alguna cámara anterior, incluidas las eliminadas, para que un
+    favorito antiguo nunca apunte a otra cámara.
+
+    Args:
+        keys: Claves estables de las cámaras nuevas
+        default_ids: ID por defecto de cada cámara nueva
+        previous: CameraStore anterior (o None)
+
+    Returns:
+        Lista de IDs, uno por cámara
+    """
+    if previous is None or not len(previous):
+        return list(default_ids)
+
+    previous_ids = previous.ids.tolist()
+    id_by_key = dict(zip(previous.keys, previous_ids))
+    used = set(previous_ids)
+    next_id = max(max(previous_ids), max(default_ids, default=-1)) + 1
+
+    ids = []
+    for key, default_id in zip(keys, default_ids):
+        camera_id = id_by_key.get(key)
+        if camera_id is None:
+            if default_id in used:
+                camera_id = next_id
+                next_id += 1
+            else:
+                camera_id = default_id
+            used.add(camera_id)
+        ids.append(camera_id)
+    return ids
+
+
+def diff_stores(old, new) -> DatasetDiff:
+    """
+    Compara dos CameraStore con IDs estables.
+
+    Args:
+        old: Inventario anterior (o None)
+        new: Inventario nuevo
+
+    Returns:
+        Diferencias por ID de cámara
+    """
+    if old is None:
+        return DatasetDiff(added=new.ids.tolist())
+
+    old_rows = {row[0]: row for row in _rows(old)}
+    diff = DatasetDiff()
+    seen = set()
+    for row in _rows(new):
+        camera_id = row[0]
+        seen.add(camera_id)
+        old_row = old_rows.get(camera_id)
+        if old_row is None:
+            diff.added.append(camera_id)
+        elif old_row != row:
+            diff.changed.append(camera_id)
+    diff.removed = [camera_id for camera_id in old_rows if camera_id not in seen]
+    return diff
+
+
+def _rows(store):
+    """Tuplas comparables con los datos de cada cámara (los NaN pasan a None)."""
+    def clean(values):
+        return [None if value != value else value for value in values.tolist()]
+
+    distritos = [
+        None if code < 0 else store.distrito_values[code] for code in store.distrito_codes.tolist()
+    ]
+    return zip(
+        store.ids.tolist(), store.nombres, store.direcciones, store.urls_imagen, store.urls,
+        clean(store.x), clean(store.y), store.accesos, distritos,
+    )
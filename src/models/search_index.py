@@ -0,0 +1,198 @@
+"""
+Índice de búsqueda por trigramas para las cámaras.
+
+Se construye una vez por dataset sobre nombre, dirección y zona, con el
+texto normalizado (minúsculas y sin tildes). Cada término de la consulta
+reduce los candidatos cruzando las listas de posiciones de sus trigramas;
+después se comprueba la coincidencia exacta y se ordena por relevancia.
+Mientras el usuario sigue escribiendo, la búsqueda parte de los resultados
+de la consulta anterior en lugar de todo el dataset.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import unicodedata
+
+import numpy as np
+
+
+# Peso de cada campo al puntuar una coincidencia (mayor = más relevante)
+FIELD_WEIGHTS = (3, 1, 2)  # nombre, dirección, zona
+WORD_START_BONUS = 1  # Coincidencia al inicio de una palabra
+FIELD_START_BONUS = 1  # Coincidencia al inicio del campo
+
+
+def normalize_text(text) -> str:
+    """
+    Normaliza un texto para buscar: minúsculas, sin tildes y espacios simples.
+
+    Args:
+        text: Texto a normalizar (None se trata como vacío)
+
+    Returns:
+        Texto normalizado
+    """
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", str(text).lower())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.split())
+
+
+def trigrams(text: str) -> set:
+    """
+    Trigramas de un texto ya normalizado.
+
+    Args:
+        text: Texto normalizado
+
+    Returns:
+        Conjunto de subcadenas de tres caracteres
+    """
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """
+    Índice invertido de trigramas sobre nombre, dirección y zona.
+    """
+
+    def __init__(self, nombres: Sequence, direcciones: Sequence, zonas: Sequence):
+        """
+        Construye el índice a partir de columnas alineadas (una fila por cámara).
+
+        Args:
+            nombres: Nombres de las cámaras
+            direcciones: Direcciones
+            zonas: Zonas extraídas de la dirección
+        """
+        self._fields: List[Tuple[str, str, str]] = [
+            (normalize_text(nombre), normalize_text(direccion), normalize_text(zona))
+            for nombre, direccion, zona in zip(nombres, direcciones, zonas)
+        ]
+
+        postings: Dict[str, List[int]] = {}
+        for position, fields in enumerate(self._fields):
+            grams = set()
+            for field in fields:
+                grams |= trigrams(field)
+            for gram in grams:
+                postings.setdefault(gram, []).append(position)
+        # Las posiciones se añaden en orden, así que cada lista ya está ordenada
+        self._postings: Dict[str, np.ndarray] = {
+            gram: np.asarray(positions, dtype=np.intp) for gram, positions in postings.items()
+        }
+
+        # Última consulta y sus coincidencias (en orden del dataset) para refinar
+        self._last_query: Optional[str] = None
+        self._last_matches: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def search(self, query: str) -> np.ndarray:
+        """
+        Busca las cámaras que contienen todos los términos de la consulta.
+
+        Cada término puede aparecer en cualquier campo y en cualquier orden.
+
+        Args:
+            query: Texto a buscar (sin distinguir mayúsculas ni tildes)
+
+        Returns:
+            Array de posiciones ordenado por relevancia (empates en orden del dataset)
+        """
+        normalized = normalize_text(query)
+        terms = normalized.split()
+        if not terms:
+            return np.arange(len(self._fields), dtype=np.intp)
+
+        if self._last_query is not None and normalized.startswith(self._last_query):
+            # Añadir texto al final solo puede quitar resultados
+            candidates = self._last_matches
+        else:
+            candidates = self._candidates(terms)
+
+        # Comprobación exacta y puntuación en una sola pasada
+        fields = self._fields
+        score = self._score
+        matches = []
+        scored = []
+        for position in candidates.tolist():
+            points = score(fields[position], terms)
+            if points:
+                matches.append(position)
+                scored.append((-points, position))
+        self._last_query = normalized
+        self._last_matches = np.asarray(matches, dtype=np.intp)
+
+        scored.sort()
+        return np.asarray([position for _, position in scored], dtype=np.intp)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Retorna el tamaño del índice.
+
+        Returns:
+            Diccionario con documentos, trigramas y entradas de las listas de posiciones
+        """
+        return {
+            "documents": len(self._fields),
+            "trigrams": len(self._postings),
+            "postings": sum(len(positions) for positions in self._postings.values()),
+        }
+
+    def _candidates(self, terms: Iterable[str]) -> np.ndarray:
+        """
+        Posiciones que contienen todos los trigramas de los términos.
+
+        Los términos de menos de tres caracteres no tienen trigramas y se
+        comprueban después sobre el texto.
+        """
+        grams = set()
+        for term in terms:
+            grams |= trigrams(term)
+        if not grams:
+            return np.arange(len(self._fields), dtype=np.intp)
+
+        lists = []
+        for gram in grams:
+            positions = self._postings.get(gram)
+            if positions is None:
+                return np.empty(0, dtype=np.intp)
+            lists.append(positions)
+
+        # Se cruza empezando por la lista más corta
+        lists.sort(key=len)
+        candidates = lists[0]
+        for positions in lists[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, positions, assume_unique=True)
+        return candidates
+
+    @staticmethod
+    def _score(fields: Tuple[str, ...], terms: List[str]) -> int:
+        """
+        Puntuación de una cámara: suma de la mejor coincidencia de cada término.
+
+        Returns:
+            Puntuación, o 0 si algún término no aparece en ningún campo
+        """
+        score = 0
+        for term in terms:
+            best = 0
+            for field, weight in zip(fields, FIELD_WEIGHTS):
+                index = field.find(term)
+                if index < 0:
+                    continue
+                points = weight * 10
+                if index == 0:
+                    points += FIELD_START_BONUS + WORD_START_BONUS
+                elif field[index - 1] == " ":
+                    points += WORD_START_BONUS
+                if points > best:
+                    best = points
+            if not best:
+                return 0
+            score += best
+        return score
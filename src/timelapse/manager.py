@@ -141,6 +141,35 @@ class TimelapseManager(QObject):
         self._persist_index()
         self._emit_sessions_changed()
 
+    def update_cameras(self, cameras: Sequence[Camera], removed_ids: Sequence[int]) -> None:
+        """Aplica un cambio del inventario a las grabaciones en curso.
+
+        Las sesiones de cámaras modificadas pasan a capturar la nueva URL de
+        imagen; las de cámaras eliminadas se detienen.
+        """
+        by_id = {camera.id: camera for camera in cameras}
+        removed = set(removed_ids)
+        updated = False
+        for recorder in list(self.recorders.values()):
+            if not recorder.is_running():
+                continue
+            session = recorder.session
+            if session.camera_id in removed:
+                recorder.stop()
+                continue
+            camera = by_id.get(session.camera_id)
+            if camera is None or not camera.url_imagen:
+                continue
+            current = (camera.nombre, camera.direccion, camera.url_imagen)
+            if current != (session.camera_name, session.camera_address, session.image_url):
+                session.camera_name, session.camera_address, session.image_url = current
+                self._persist_session(session)
+                updated = True
+
+        if updated:
+            self._persist_index()
+            self._emit_sessions_changed()
+
     def _active_recorders(self) -> List[TimelapseRecorder]:
         return [recorder for recorder in self.recorders.values() if recorder.is_running()]
 
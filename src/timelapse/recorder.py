@@ -7,10 +7,12 @@ from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
-import requests
 from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal
 
 import config
+from src.utils.async_fetcher import FetchResult, get_fetch_engine
+from src.utils.http_client import get_http_client
+from src.utils.rate_governor import TRAFFIC_RECORDING, get_rate_governor
 from .models import TimelapseSession
 
 
@@ -20,32 +22,42 @@ class FrameCaptureSignals(QObject):
 
 
 class FrameCaptureTask(QRunnable):
-    def __init__(self, session_id: str, image_url: str, output_path: Path):
+    def __init__(
+        self,
+        session_id: str,
+        image_url: str,
+        output_path: Path,
+        prefetched: Optional[FetchResult] = None,
+    ):
         super().__init__()
         self.session_id = session_id
         self.image_url = image_url
         self.output_path = output_path
+        # Con el motor asíncrono la descarga ya está hecha y la tarea solo escribe
+        self.prefetched = prefetched
         self.signals = FrameCaptureSignals()
 
     def run(self) -> None:
         try:
-            headers = config.IMAGE_REQUEST_HEADERS
-            response = requests.get(
-                self.image_url,
-                timeout=config.IMAGE_TIMEOUT,
-                headers=headers,
-                stream=True,
-            )
-            response.raise_for_status()
-            content_type = response.headers.get("content-type", "")
+            if self.prefetched is not None:
+                self.prefetched.raise_for_status()
+                content_type = self.prefetched.headers.get("content-type", "")
+                content = self.prefetched.content
+            else:
+                response = get_http_client().get(
+                    self.image_url,
+                    headers=config.IMAGE_REQUEST_HEADERS,
+                    timeout=config.IMAGE_TIMEOUT,
+                )
+                response.raise_for_status()
+                content_type = response.headers.get("content-type", "")
+                content = response.content
             if "image" not in content_type:
                 raise RuntimeError(f"Respuesta no es una imagen ({content_type})")
 
             self.output_path.parent.mkdir(parents=True, exist_ok=True)
             with open(self.output_path, "wb") as handle:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        handle.write(chunk)
+                handle.write(content)
 
             timestamp = datetime.utcnow().isoformat(timespec="seconds")
             self.signals.success.emit(
@@ -61,6 +73,8 @@ class TimelapseRecorder(QObject):
     session_updated = Signal(object)
     session_finished = Signal(object)
     recorder_error = Signal(str, str)
+    # Interna: descarga asíncrona terminada (ruta de salida, FetchResult)
+    _fetch_done = Signal(object, object)
 
     def __init__(
         self,
@@ -73,11 +87,18 @@ class TimelapseRecorder(QObject):
         self.timer = QTimer()
         self.timer.setSingleShot(False)
         self.timer.timeout.connect(self._schedule_capture)
+        # Reintento de la captura aplazada por el presupuesto global de red
+        self.retry_timer = QTimer()
+        self.retry_timer.setSingleShot(True)
+        self.retry_timer.timeout.connect(self._schedule_capture)
+        self.governor = get_rate_governor()
         self._running = False
         self._sequence = 0
         self._lock = threading.Lock()
         self._capture_inflight = False
         self._start_epoch = datetime.utcnow()
+        self.fetch_engine = get_fetch_engine()
+        self._fetch_done.connect(self._on_fetch_done)
 
     def start(self) -> None:
         if self._running:
@@ -92,6 +113,7 @@ class TimelapseRecorder(QObject):
         if not self._running:
             return
         self.timer.stop()
+        self.retry_timer.stop()
         self._running = False
         self.session.mark_finished()
         self.session_finished.emit(self.session)
@@ -111,17 +133,38 @@ class TimelapseRecorder(QObject):
         with self._lock:
             if self._capture_inflight:
                 return
+            if not self.governor.try_acquire(TRAFFIC_RECORDING):
+                wait = self.governor.wait_time(TRAFFIC_RECORDING)
+                self.retry_timer.start(max(1, int(wait * 1000)))
+                return
             self._capture_inflight = True
             self._sequence += 1
             filename = f"frame_{self._sequence:05d}.{config.TIMELAPSE_FRAME_FORMAT}"
-            task = FrameCaptureTask(
-                session_id=self.session.session_id,
-                image_url=self.session.image_url,
-                output_path=self.session.frames_dir / filename,
-            )
-            task.signals.success.connect(self._on_frame_captured)
-            task.signals.error.connect(self._on_capture_error)
-            self.thread_pool.start(task)
+            output_path = self.session.frames_dir / filename
+            if self.fetch_engine:
+                self.fetch_engine.submit(
+                    self.session.image_url,
+                    headers=config.IMAGE_REQUEST_HEADERS,
+                    timeout=config.IMAGE_TIMEOUT,
+                    callback=lambda result, path=output_path: self._fetch_done.emit(path, result),
+                )
+            else:
+                self._start_capture_task(output_path)
+
+    def _start_capture_task(self, output_path: Path, prefetched: Optional[FetchResult] = None) -> None:
+        task = FrameCaptureTask(
+            session_id=self.session.session_id,
+            image_url=self.session.image_url,
+            output_path=output_path,
+            prefetched=prefetched,
+        )
+        task.signals.success.connect(self._on_frame_captured)
+        task.signals.error.connect(self._on_capture_error)
+        self.thread_pool.start(task)
+
+    def _on_fetch_done(self, output_path: Path, result: FetchResult) -> None:
+        # La escritura a disco sigue en el pool para no bloquear la interfaz
+        self._start_capture_task(output_path, prefetched=result)
 
     def _on_frame_captured(self, session_id: str, filename: str, captured_at: str) -> None:
         with self._lock:
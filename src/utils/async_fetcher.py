@@ -0,0 +1,320 @@
+"""
+Motor de descargas asíncrono basado en asyncio.
+
+Las descargas de imágenes y capas son E/S pura: con el motor de hilos cada
+petición ocupa un hilo del QThreadPool durante todo su timeout. Este módulo
+ejecuta un bucle asyncio en un único hilo dedicado que mantiene cientos de
+peticiones en vuelo con un límite de concurrencia; los resultados se
+entregan mediante callbacks (que los consumidores Qt reenvían con señales).
+
+El motor se elige con config.FETCH_ENGINE ("threads" o "asyncio") y
+requiere aiohttp, que es una dependencia opcional: si no está instalado se
+usa el motor de hilos.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from requests.structures import CaseInsensitiveDict
+
+import config
+from src.utils.http_client import get_http_client
+from src.utils.rate_governor import TRAFFIC_BACKGROUND, get_rate_governor
+
+
+logger = logging.getLogger(__name__)
+
+
+class FetchError(Exception):
+    """Error de red o respuesta HTTP no válida en una descarga."""
+
+
+@dataclass
+class FetchResult:
+    """
+    Resultado de una descarga, independiente del motor que la realizó.
+
+    Atributos:
+        url: URL solicitada
+        status: Código HTTP (0 si no hubo respuesta)
+        headers: Cabeceras de la respuesta (sin distinguir mayúsculas)
+        content: Cuerpo completo
+        error: Descripción del error de red, si lo hubo
+        timed_out: True si la petición agotó el timeout
+        elapsed: Segundos desde el envío hasta tener el cuerpo completo
+    """
+
+    url: str
+    status: int = 0
+    headers: CaseInsensitiveDict = field(default_factory=CaseInsensitiveDict)
+    content: bytes = b""
+    error: Optional[str] = None
+    timed_out: bool = False
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """True si hubo respuesta y su código no es de error."""
+        return self.error is None and 0 < self.status < 400
+
+    def raise_for_status(self):
+        """
+        Lanza FetchError si la descarga falló.
+
+        Raises:
+            FetchError: Si hubo error de red o código HTTP de error
+        """
+        if self.error is not None:
+            raise FetchError(self.error)
+        if self.status >= 400:
+            raise FetchError(f"HTTP {self.status} para {self.url}")
+
+    def json(self) -> Any:
+        """Decodifica el cuerpo como JSON."""
+        return json.loads(self.content)
+
+
+class AsyncFetchEngine:
+    """
+    Bucle asyncio en un hilo propio con una sesión aiohttp compartida.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None, limit_per_host: Optional[int] = None):
+        """
+        Arranca el hilo del bucle y crea la sesión.
+
+        Args:
+            concurrency: Peticiones simultáneas como máximo
+            limit_per_host: Conexiones simultáneas por host
+
+        Raises:
+            ImportError: Si aiohttp no está instalado
+        """
+        import aiohttp  # Dependencia opcional: solo se necesita con FETCH_ENGINE = "asyncio"
+
+        self._aiohttp = aiohttp
+        self.concurrency = concurrency or config.ASYNC_FETCH_CONCURRENCY
+        self.limit_per_host = limit_per_host or config.ASYNC_FETCH_LIMIT_PER_HOST
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="AsyncFetchEngine", daemon=True)
+        self._thread.start()
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._max_in_flight = 0
+        self._completed = 0
+        self._errors = 0
+        self._bytes_received = 0
+
+        asyncio.run_coroutine_threadsafe(self._create_session(), self._loop).result()
+        logger.info(
+            f"AsyncFetchEngine inicializado: {self.concurrency} peticiones simultáneas, "
+            f"{self.limit_per_host} por host"
+        )
+
+    def submit(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        callback: Optional[Callable[[FetchResult], None]] = None,
+    ) -> concurrent.futures.Future:
+        """
+        Encola una descarga sin bloquear.
+
+        Args:
+            url: URL a descargar
+            headers: Cabeceras HTTP
+            timeout: Timeout total en segundos (IMAGE_TIMEOUT si es None)
+            callback: Función que recibe el FetchResult; se ejecuta en el hilo
+                del bucle, por lo que debe limitarse a emitir una señal
+
+        Returns:
+            Future con el FetchResult
+        """
+        future = asyncio.run_coroutine_threadsafe(self._fetch(url, headers, timeout), self._loop)
+        if callback is not None:
+            future.add_done_callback(lambda done: callback(done.result()))
+        return future
+
+    def fetch(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None) -> FetchResult:
+        """
+        Descarga una URL bloqueando el hilo que llama (no usar desde el bucle).
+
+        Args:
+            url: URL a descargar
+            headers: Cabeceras HTTP
+            timeout: Timeout total en segundos
+
+        Returns:
+            FetchResult de la descarga
+        """
+        return self.submit(url, headers, timeout).result()
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Retorna los contadores del motor.
+
+        Returns:
+            Diccionario con peticiones en vuelo, máximo alcanzado, completadas y errores
+        """
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "max_in_flight": self._max_in_flight,
+                "completed": self._completed,
+                "errors": self._errors,
+                "bytes_received": self._bytes_received,
+                "concurrency": self.concurrency,
+            }
+
+    def close(self):
+        """
+        Cierra la sesión y detiene el hilo del bucle.
+        """
+        if not self._loop.is_running():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result(timeout=5)
+        except Exception as e:
+            logger.warning(f"Error cerrando la sesión asíncrona: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        logger.info("AsyncFetchEngine cerrado")
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    async def _create_session(self):
+        connector = self._aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=self.limit_per_host,
+        )
+        self._session = self._aiohttp.ClientSession(connector=connector)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def _fetch(self, url: str, headers: Optional[Dict[str, str]], timeout: Optional[float]) -> FetchResult:
+        result = FetchResult(url=url)
+        timeout = timeout if timeout is not None else config.IMAGE_TIMEOUT
+
+        async with self._semaphore:
+            with self._lock:
+                self._in_flight += 1
+                self._max_in_flight = max(self._max_in_flight, self._in_flight)
+            started = time.monotonic()
+            try:
+                async with self._session.get(
+                    url,
+                    headers=headers,
+                    timeout=self._aiohttp.ClientTimeout(total=timeout),
+                ) as response:
+                    result.status = response.status
+                    result.headers = CaseInsensitiveDict(response.headers)
+                    result.content = await response.read()
+            except asyncio.TimeoutError:
+                result.timed_out = True
+                result.error = f"Timeout ({timeout}s)"
+            except self._aiohttp.ClientError as e:
+                result.error = str(e) or e.__class__.__name__
+            except Exception as e:  # noqa: BLE001 - cualquier fallo se devuelve como resultado
+                logger.error(f"Error inesperado descargando {url}: {e}", exc_info=True)
+                result.error = str(e)
+            finally:
+                result.elapsed = time.monotonic() - started
+                with self._lock:
+                    self._in_flight -= 1
+                    self._completed += 1
+                    self._bytes_received += len(result.content)
+                    if result.error is not None:
+                        self._errors += 1
+                get_rate_governor().record_bytes(len(result.content))
+
+        return result
+
+
+def fetch_url(url: str, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None) -> FetchResult:
+    """
+    Descarga bloqueante con el motor configurado.
+
+    Pensada para hilos de trabajo (ej: generación del mapa): espera su turno
+    en el presupuesto global como tráfico de fondo. Nunca lanza por errores
+    de red: se informan en el resultado.
+
+    Args:
+        url: URL a descargar
+        headers: Cabeceras HTTP
+        timeout: Timeout en segundos
+
+    Returns:
+        FetchResult de la descarga
+    """
+    get_rate_governor().acquire(TRAFFIC_BACKGROUND)
+    engine = get_fetch_engine()
+    if engine is not None:
+        return engine.fetch(url, headers, timeout)
+
+    import requests
+
+    result = FetchResult(url=url)
+    started = time.monotonic()
+    try:
+        response = get_http_client().get(url, headers=headers, timeout=timeout)
+        result.status = response.status_code
+        result.headers = CaseInsensitiveDict(response.headers)
+        result.content = response.content
+    except requests.Timeout:
+        result.timed_out = True
+        result.error = f"Timeout ({timeout if timeout is not None else config.IMAGE_TIMEOUT}s)"
+    except requests.RequestException as e:
+        result.error = str(e)
+    result.elapsed = time.monotonic() - started
+    return result
+
+
+# Instancia global del motor
+_engine: Optional[AsyncFetchEngine] = None
+_engine_lock = threading.Lock()
+_engine_unavailable = False
+
+
+def get_fetch_engine() -> Optional[AsyncFetchEngine]:
+    """
+    Obtiene el motor asíncrono si está seleccionado en la configuración.
+
+    Returns:
+        Instancia compartida de AsyncFetchEngine, o None si se usa el motor
+        de hilos (por configuración o porque aiohttp no está disponible)
+    """
+    global _engine, _engine_unavailable
+    if config.FETCH_ENGINE != "asyncio" or _engine_unavailable:
+        return None
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None and not _engine_unavailable:
+                try:
+                    _engine = AsyncFetchEngine()
+                except ImportError:
+                    _engine_unavailable = True
+                    logger.warning("FETCH_ENGINE='asyncio' requiere aiohttp; se usa el motor de hilos")
+    return _engine
+
+
+def shutdown_fetch_engine():
+    """
+    Detiene el motor asíncrono si se llegó a crear.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.close()
+            _engine = None
@@ -0,0 +1,326 @@
+"""
+Seguimiento de la salud de cámaras y servidores (circuit breaker).
+
+Una cámara caída consumía un hilo del pool durante todo el timeout en cada
+tick de refresco. Este módulo cuenta los fallos seguidos de cada cámara y
+de cada servidor: al superar un umbral el circuito se abre y las peticiones
+se responden al momento con el último error conocido. Pasado un tiempo de
+espera que crece exponencialmente con cada apertura, se deja pasar una
+petición de prueba (semiabierto); si funciona el circuito se cierra y si
+falla vuelve a abrirse con una espera mayor.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import urlparse
+import logging
+import time
+
+import config
+
+
+logger = logging.getLogger(__name__)
+
+# Estados del circuito
+STATE_CLOSED = "closed"  # Funciona con normalidad
+STATE_OPEN = "open"  # Caída: no se piden imágenes hasta retry_at
+STATE_HALF_OPEN = "half_open"  # Hay una petición de prueba en curso
+
+
+@dataclass
+class HealthRecord:
+    """
+    Estado de salud de una cámara o de un servidor.
+
+    Atributos:
+        state: Estado del circuito (STATE_*)
+        failures: Fallos seguidos desde el último éxito
+        opens: Aperturas seguidas del circuito (exponente de la espera)
+        retry_at: Instante (monotonic) a partir del cual se permite una prueba
+        last_error: Último mensaje de error recibido
+        last_success: Instante del último éxito, o None si nunca lo hubo
+        probe_owner: Cámara cuya petición es la prueba en curso (semiabierto)
+    """
+
+    state: str = STATE_CLOSED
+    failures: int = 0
+    opens: int = 0
+    retry_at: float = 0.0
+    last_error: str = ""
+    last_success: Optional[float] = None
+    probe_owner: Optional[int] = None
+
+
+class HealthTracker:
+    """
+    Circuit breaker por cámara y por servidor con espera exponencial.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+        host_failure_threshold: Optional[int] = None,
+        host_backoff_base: Optional[float] = None,
+        host_backoff_max: Optional[float] = None,
+        probe_timeout: Optional[float] = None
+    ):
+        """
+        Inicializa el seguimiento.
+
+        Args:
+            failure_threshold: Fallos seguidos que abren el circuito de una cámara
+            backoff_base: Espera tras la primera apertura de una cámara (segundos)
+            backoff_max: Espera máxima de una cámara (segundos)
+            host_failure_threshold: Fallos de conexión seguidos que abren un servidor
+            host_backoff_base: Espera tras la primera apertura de un servidor (segundos)
+            host_backoff_max: Espera máxima de un servidor (segundos)
+            probe_timeout: Segundos tras los que una prueba sin respuesta se da por perdida
+        """
+        self.failure_threshold = failure_threshold or config.CAMERA_FAILURE_THRESHOLD
+        self.backoff_base = backoff_base or config.CAMERA_BACKOFF_BASE
+        self.backoff_max = backoff_max or config.CAMERA_BACKOFF_MAX
+        self.host_failure_threshold = host_failure_threshold or config.HOST_FAILURE_THRESHOLD
+        self.host_backoff_base = host_backoff_base or config.HOST_BACKOFF_BASE
+        self.host_backoff_max = host_backoff_max or config.HOST_BACKOFF_MAX
+        self.probe_timeout = probe_timeout or config.IMAGE_TIMEOUT * (config.HTTP_MAX_RETRIES + 1)
+        self._cameras: Dict[int, HealthRecord] = {}
+        self._hosts: Dict[str, HealthRecord] = {}
+        self.short_circuited = 0
+        self.probes = 0
+
+    def allow(self, camera_id: int, url: str, now: Optional[float] = None) -> bool:
+        """
+        Indica si se puede pedir la imagen de una cámara.
+
+        Si el circuito de la cámara o de su servidor está abierto y ya venció
+        la espera, la petición se deja pasar como prueba (semiabierto).
+
+        Args:
+            camera_id: ID de la cámara
+            url: URL de la imagen (determina el servidor)
+            now: Instante actual (monotonic); por defecto, ahora
+
+        Returns:
+            False si la petición debe responderse con el estado sin conexión
+        """
+        now = time.monotonic() if now is None else now
+        camera = self._cameras.get(camera_id)
+        host = self._hosts.get(host_of(url))
+
+        # Comprobar ambos antes de consumir ninguna prueba
+        if not (self._ready(camera, now) and self._ready(host, now)):
+            self.short_circuited += 1
+            return False
+
+        for record in (camera, host):
+            if record is not None and record.state != STATE_CLOSED:
+                record.state = STATE_HALF_OPEN
+                record.retry_at = now + self.probe_timeout
+                record.probe_owner = camera_id
+                self.probes += 1
+        return True
+
+    def release_probe(self, camera_id: int, url: str, now: Optional[float] = None):
+        """
+        Devuelve la prueba de una petición que no llegó a hacerse.
+
+        Si la tarea de prueba se cancela o se descarta de la cola antes de
+        ejecutarse, el circuito vuelve a abierto con la espera ya vencida, de
+        modo que la siguiente petición hace la prueba sin esperar a
+        probe_timeout. Solo se liberan las pruebas que consumió esta cámara.
+
+        Args:
+            camera_id: ID de la cámara
+            url: URL de la imagen
+            now: Instante actual (monotonic); por defecto, ahora
+        """
+        now = time.monotonic() if now is None else now
+        for record in (self._cameras.get(camera_id), self._hosts.get(host_of(url))):
+            if record is not None and record.state == STATE_HALF_OPEN and record.probe_owner == camera_id:
+                record.state = STATE_OPEN
+                record.retry_at = now
+                record.probe_owner = None
+
+    def record_success(self, camera_id: int, url: str, now: Optional[float] = None):
+        """
+        Registra una respuesta válida (imagen nueva o sin cambios).
+
+        Args:
+            camera_id: ID de la cámara
+            url: URL de la imagen
+            now: Instante de la respuesta (monotonic); por defecto, ahora
+        """
+        now = time.monotonic() if now is None else now
+        for key, records in ((camera_id, self._cameras), (host_of(url), self._hosts)):
+            record = records.get(key)
+            if record is None:
+                continue
+            if record.state != STATE_CLOSED:
+                logger.info(f"{self._label(key)} recuperado tras {record.failures} fallos")
+            # Sin fallos pendientes no hace falta seguir guardando el estado
+            del records[key]
+
+    def record_failure(
+        self,
+        camera_id: int,
+        url: str,
+        error: str,
+        connection_error: bool = True,
+        now: Optional[float] = None
+    ):
+        """
+        Registra un fallo y abre el circuito si se supera el umbral.
+
+        Args:
+            camera_id: ID de la cámara
+            url: URL de la imagen
+            error: Mensaje de error
+            connection_error: True si el fallo es de red (timeout, conexión);
+                solo estos cuentan para el servidor
+            now: Instante del fallo (monotonic); por defecto, ahora
+        """
+        now = time.monotonic() if now is None else now
+        camera = self._cameras.setdefault(camera_id, HealthRecord())
+        self._fail(camera, camera_id, error, self.failure_threshold, self.backoff_base, self.backoff_max, now)
+
+        if connection_error:
+            host = host_of(url)
+            record = self._hosts.setdefault(host, HealthRecord())
+            self._fail(
+                record, host, error, self.host_failure_threshold,
+                self.host_backoff_base, self.host_backoff_max, now
+            )
+
+    def retry_in(self, camera_id: int, url: str, now: Optional[float] = None) -> float:
+        """
+        Segundos que faltan para volver a probar una cámara.
+
+        Args:
+            camera_id: ID de la cámara
+            url: URL de la imagen
+            now: Instante actual (monotonic); por defecto, ahora
+
+        Returns:
+            0 si la cámara se puede pedir ya
+        """
+        now = time.monotonic() if now is None else now
+        waits = [
+            record.retry_at - now
+            for record in (self._cameras.get(camera_id), self._hosts.get(host_of(url)))
+            if record is not None and record.state != STATE_CLOSED
+        ]
+        return max([0.0] + waits)
+
+    def get_last_error(self, camera_id: int) -> str:
+        """
+        Retorna el último error conocido de una cámara.
+
+        Args:
+            camera_id: ID de la cámara
+        """
+        record = self._cameras.get(camera_id)
+        return record.last_error if record else ""
+
+    def get_camera_health(self, camera_id: int, url: str = "") -> dict:
+        """
+        Retorna el estado de salud de una cámara.
+
+        Args:
+            camera_id: ID de la cámara
+            url: URL de la imagen, para incluir el estado del servidor
+
+        Returns:
+            Diccionario con estado, fallos seguidos, último error y espera restante
+        """
+        record = self._cameras.get(camera_id) or HealthRecord()
+        host = self._hosts.get(host_of(url)) if url else None
+        return {
+            "state": record.state,
+            "failures": record.failures,
+            "last_error": record.last_error,
+            "retry_in_s": self.retry_in(camera_id, url) if url else max(0.0, record.retry_at - time.monotonic()),
+            "host_state": host.state if host else STATE_CLOSED,
+        }
+
+    def get_stats(self) -> dict:
+        """
+        Retorna el resumen de salud.
+
+        Returns:
+            Diccionario con cámaras con fallos, circuitos abiertos, servidores
+            caídos, peticiones evitadas y pruebas realizadas
+        """
+        return {
+            "failing_cameras": len(self._cameras),
+            "open_cameras": sorted(
+                camera_id for camera_id, record in self._cameras.items() if record.state != STATE_CLOSED
+            ),
+            "open_hosts": sorted(host for host, record in self._hosts.items() if record.state != STATE_CLOSED),
+            "short_circuited": self.short_circuited,
+            "probes": self.probes,
+        }
+
+    def _ready(self, record: Optional[HealthRecord], now: float) -> bool:
+        """Indica si un registro admite una petición (cerrado o con la espera vencida)."""
+        return record is None or record.state == STATE_CLOSED or now >= record.retry_at
+
+    def _fail(
+        self,
+        record: HealthRecord,
+        key,
+        error: str,
+        threshold: int,
+        base: float,
+        maximum: float,
+        now: float
+    ):
+        """
+        Aplica un fallo a un registro y, si procede, abre su circuito.
+
+        Args:
+            record: Registro de la cámara o del servidor
+            key: ID de la cámara o nombre del servidor (para el log)
+            error: Mensaje de error
+            threshold: Fallos seguidos que abren el circuito
+            base: Espera de la primera apertura (segundos)
+            maximum: Espera máxima (segundos)
+            now: Instante del fallo
+        """
+        record.failures += 1
+        record.last_error = error
+        record.probe_owner = None
+        if record.state == STATE_OPEN:
+            # Petición lanzada antes de abrirse el circuito: no alarga la espera
+            return
+        # Una prueba fallida reabre de inmediato; si no, hace falta llegar al umbral
+        if record.state == STATE_CLOSED and record.failures < threshold:
+            return
+
+        wait = min(base * (2 ** record.opens), maximum)
+        record.opens += 1
+        record.state = STATE_OPEN
+        record.retry_at = now + wait
+        logger.warning(f"{self._label(key)} sin respuesta ({error}); siguiente intento en {wait:.0f}s")
+
+    @staticmethod
+    def _label(key) -> str:
+        """Nombre legible de una cámara o servidor para el log."""
+        return f"Cámara {key}" if isinstance(key, int) else f"Servidor {key}"
+
+
+def host_of(url: str) -> str:
+    """
+    Extrae el servidor de una URL.
+
+    Args:
+        url: URL de la imagen
+
+    Returns:
+        Nombre del servidor (con puerto si lo lleva), o cadena vacía
+    """
+    try:
+        return urlparse(url).netloc.lower()
+    except ValueError:
+        return ""
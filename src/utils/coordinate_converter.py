@@ -5,10 +5,12 @@ Este módulo maneja la conversión entre sistemas de coordenadas,
 específicamente de EPSG:25830 (UTM zona 30N) a EPSG:4326 (WGS84 lat/lon).
 """
 
-from typing import Optional, Tuple
+from typing import Iterable, Optional, Tuple
 from pyproj import Transformer
 import logging
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 
@@ -36,10 +38,16 @@ class CoordinateConverter:
                 target_crs, 
                 always_xy=True
             )
+            self.inverse_transformer = Transformer.from_crs(
+                target_crs,
+                source_crs,
+                always_xy=True
+            )
             logger.info(f"Conversor inicializado: {source_crs} → {target_crs}")
         except Exception as e:
             logger.error(f"Error inicializando conversor: {e}")
             self.transformer = None
+            self.inverse_transformer = None
     
     def convert(self, x: float, y: float) -> Optional[Tuple[float, float]]:
         """
@@ -65,6 +73,71 @@ class CoordinateConverter:
             logger.error(f"Error convirtiendo coordenadas ({x}, {y}): {e}")
             return None
     
+    def convert_many(self, xs, ys) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Convierte arrays de coordenadas en una sola llamada a pyproj.
+        
+        Args:
+            xs: Coordenadas X en el sistema origen (array o secuencia)
+            ys: Coordenadas Y en el sistema origen (array o secuencia)
+            
+        Returns:
+            Arrays (lon, lat) en WGS84, con NaN donde la conversión no es posible
+        """
+        xs = np.asarray(xs, dtype=float)
+        ys = np.asarray(ys, dtype=float)
+        if self.transformer is None:
+            logger.error("Transformer no inicializado")
+            nan = np.full(xs.shape, np.nan)
+            return nan, nan.copy()
+        
+        try:
+            lon, lat = self.transformer.transform(xs, ys)
+        except Exception as e:
+            logger.error(f"Error convirtiendo {xs.size} coordenadas: {e}")
+            nan = np.full(xs.shape, np.nan)
+            return nan, nan.copy()
+        
+        lon = np.asarray(lon, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+        # pyproj devuelve inf en los puntos que no puede transformar
+        invalid = ~(np.isfinite(lon) & np.isfinite(lat))
+        lon[invalid] = np.nan
+        lat[invalid] = np.nan
+        return lon, lat
+    
+    def reverse_many(self, lons, lats) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Convierte arrays de coordenadas del sistema destino al origen (WGS84 → UTM).
+        
+        Args:
+            lons: Longitudes (array o secuencia)
+            lats: Latitudes (array o secuencia)
+            
+        Returns:
+            Arrays (x, y) en el sistema origen, con NaN donde la conversión no es posible
+        """
+        lons = np.asarray(lons, dtype=float)
+        lats = np.asarray(lats, dtype=float)
+        if self.inverse_transformer is None:
+            logger.error("Transformer no inicializado")
+            nan = np.full(lons.shape, np.nan)
+            return nan, nan.copy()
+        
+        try:
+            xs, ys = self.inverse_transformer.transform(lons, lats)
+        except Exception as e:
+            logger.error(f"Error convirtiendo {lons.size} coordenadas: {e}")
+            nan = np.full(lons.shape, np.nan)
+            return nan, nan.copy()
+        
+        xs = np.asarray(xs, dtype=float)
+        ys = np.asarray(ys, dtype=float)
+        invalid = ~(np.isfinite(xs) & np.isfinite(ys))
+        xs[invalid] = np.nan
+        ys[invalid] = np.nan
+        return xs, ys
+    
     def utm_to_latlon(self, x: float, y: float) -> Optional[Tuple[float, float]]:
         """
         Convierte coordenadas UTM (EPSG:25830) a lat/lon (EPSG:4326).
@@ -99,6 +172,30 @@ class CoordinateConverter:
         return True
 
 
+def assign_latlon(cameras: Iterable) -> int:
+    """
+    Calcula en bloque las coordenadas WGS84 de las cámaras que aún no las tienen.
+    
+    Args:
+        cameras: Cámaras con coordenadas UTM en 'coordenadas' y destino en 'latlon'
+        
+    Returns:
+        Número de cámaras a las que se asignó latlon
+    """
+    pending = [camera for camera in cameras if camera.latlon is None and camera.coordenadas]
+    if not pending:
+        return 0
+    
+    xs, ys = zip(*(camera.coordenadas for camera in pending))
+    lon, lat = get_converter().convert_many(xs, ys)
+    assigned = 0
+    for camera, cam_lon, cam_lat in zip(pending, lon.tolist(), lat.tolist()):
+        if cam_lon == cam_lon and cam_lat == cam_lat:  # Descarta NaN
+            camera.latlon = (cam_lat, cam_lon)
+            assigned += 1
+    return assigned
+
+
 # Instancia global del conversor
 _converter = None
 
@@ -5,18 +5,29 @@ Este módulo se encarga de descargar, parsear y convertir los datos
 del CSV oficial en objetos Camera.
 """
 
+import numpy as np
 import pandas as pd
 import requests
-from typing import List, Optional
+from typing import List, Optional, Sequence, Tuple
 import logging
+import re
 from io import StringIO
 
 from src.models.camera import Camera
+from src.models.camera_store import CameraStore
+from src.models.dataset_diff import (
+    DatasetDiff, assign_stable_ids, camera_keys, default_camera_name, diff_stores,
+)
+from src.utils.coordinate_converter import get_converter
+from src.utils.dataset_snapshot import DatasetSnapshot
 import config
 
 
 logger = logging.getLogger(__name__)
 
+# Coordenadas de "POINT (x y)" (misma expresión que Camera._parse_geometry)
+POINT_PATTERN = r'POINT\s*\(\s*([-\d.]+)\s+([-\d.]+)\s*\)'
+
 
 class DataLoader:
     """
@@ -32,12 +43,46 @@ class DataLoader:
         """
         self.csv_url = csv_url
         self.dataframe: Optional[pd.DataFrame] = None
-        self.cameras: List[Camera] = []
+        self.store = CameraStore.from_cameras([])
+        self.cameras: Sequence[Camera] = self.store.all()
+        
+        # Copia local y validadores HTTP de la última descarga
+        self.snapshot: Optional[DatasetSnapshot] = DatasetSnapshot() if config.ENABLE_DATASET_SNAPSHOT else None
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.fingerprint: Optional[str] = None
+        self.changed = False  # True si la última carga trajo datos distintos
+        self.diff = DatasetDiff()  # Cámaras añadidas/eliminadas/modificadas en la última carga
+    
+    def load_snapshot(self) -> bool:
+        """
+        Carga el inventario desde la copia local, si existe.
+        
+        Returns:
+            True si se cargó la copia
+        """
+        if self.snapshot is None:
+            return False
+        
+        loaded = self.snapshot.load()
+        if loaded is None or not len(loaded[0]):
+            return False
+        
+        self.store, meta = loaded
+        self.cameras = self.store.all()
+        self.etag = meta.get("etag")
+        self.last_modified = meta.get("last_modified")
+        self.fingerprint = meta.get("fingerprint")
+        return True
     
     def load_data(self) -> bool:
         """
         Descarga y carga los datos del CSV.
         
+        Si hay datos previos (copia local) la petición es condicional: con
+        304 se conservan y changed queda en False. Tras parsear, changed
+        indica si el contenido difiere del anterior y la copia se actualiza.
+        
         Returns:
             True si la carga fue exitosa, False en caso contrario
         """
@@ -47,12 +92,24 @@ class DataLoader:
             logger.info(f"URL: {self.csv_url}")
             logger.info("=" * 80)
             
+            headers = {}
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+            
             # Descargar CSV
             logger.debug("Realizando petición HTTP GET...")
-            response = requests.get(self.csv_url, timeout=30)
+            response = requests.get(self.csv_url, headers=headers, timeout=config.CSV_TIMEOUT)
             logger.debug(f"Status Code: {response.status_code}")
             logger.debug(f"Headers: {dict(response.headers)}")
             
+            if response.status_code == 304:
+                logger.info("✓ CSV sin cambios desde la última descarga (304)")
+                self.changed = False
+                self.diff = DatasetDiff()
+                return True
+            
             response.raise_for_status()
             response.encoding = 'utf-8'
             
@@ -71,8 +128,13 @@ class DataLoader:
                 logger.debug("Primera fila del CSV:")
                 logger.debug(f"{self.dataframe.iloc[0].to_dict()}")
             
-            # Convertir a objetos Camera
-            self._parse_cameras()
+            # Convertir a objetos Camera, conservando los IDs de las cámaras ya conocidas
+            previous = self.store if len(self.store) else None
+            self._parse_cameras(previous)
+            self._update_snapshot(response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            self.diff = diff_stores(previous, self.store) if self.changed else DatasetDiff()
+            if previous is not None and self.diff:
+                logger.info(f"✓ Cambios en el inventario: {self.diff.summary()}")
             
             logger.info("=" * 80)
             return True
@@ -87,106 +149,187 @@ class DataLoader:
             logger.error(f"✗ Error inesperado cargando datos: {e}", exc_info=True)
             return False
     
-    def _parse_cameras(self):
+    def _parse_cameras(self, previous: Optional[CameraStore] = None):
         """
-        Convierte el DataFrame en lista de objetos Camera.
+        Convierte el DataFrame en un CameraStore.
+        
+        El parseo se hace por columnas: los NaN se sustituyen de una vez, las
+        coordenadas se extraen con un único str.extract sobre SDOGEOMETRIA y se
+        convierten a WGS84 en una sola llamada a pyproj (columnas 'lat' y 'lon'
+        del DataFrame). Las columnas pasan tal cual al almacén, sin crear un
+        objeto Camera por fila.
+        
+        Args:
+            previous: Almacén anterior; si se indica, cada cámara conserva el ID
+                que tenía (por nombre o URL de imagen) en lugar del de su fila
         """
         if self.dataframe is None:
             logger.warning("DataFrame es None, no se pueden parsear cámaras")
             return
         
-        self.cameras = []
+        df = self.dataframe
         cols = config.CSV_COLUMNS
         
-        logger.info(f"Iniciando parseo de {len(self.dataframe)} filas...")
+        logger.info(f"Iniciando parseo de {len(df)} filas...")
         logger.debug(f"Configuración de columnas: {cols}")
         
-        cameras_con_imagen = 0
-        cameras_sin_imagen = 0
-        
-        for idx, row in self.dataframe.iterrows():
-            try:
-                # Obtener valores con valores por defecto si no existen
-                nombre = self._get_value(row, cols["nombre"], f"Cámara {idx}")
-                direccion = self._get_value(row, cols["direccion"], "Sin dirección")
-                url_imagen = self._get_value(row, cols["url_imagen"], "")
-                url = self._get_value(row, cols["url"], "")
-                geometry = self._get_value(row, cols["geometry"], None)
-                acceso = self._get_value(row, cols["acceso"], None)
-                distrito = self._get_value(row, cols["distrito"], None)
-                
-                # Log detallado de las primeras 3 cámaras
-                if idx < 3:
-                    logger.debug(f"\n--- Cámara {idx} ---")
-                    logger.debug(f"  Nombre: {nombre}")
-                    logger.debug(f"  Dirección: {direccion}")
-                    logger.debug(f"  URL Imagen: {url_imagen}")
-                    logger.debug(f"  URL Web: {url}")
-                    logger.debug(f"  Geometry: {geometry}")
-                
-                # Verificar URL de imagen
-                if url_imagen and url_imagen.strip():
-                    cameras_con_imagen += 1
-                else:
-                    cameras_sin_imagen += 1
-                    logger.warning(f"Cámara {idx} ({nombre}) NO tiene URL de imagen")
-                
-                # Crear objeto Camera
-                camera = Camera(
-                    id=idx,
-                    nombre=nombre,
-                    direccion=direccion,
-                    url_imagen=url_imagen,
-                    url=url,
-                    geometry_raw=geometry,
-                    acceso=acceso,
-                    distrito=distrito
-                )
-                
-                self.cameras.append(camera)
-                
-            except Exception as e:
-                logger.error(f"Error procesando fila {idx}: {e}", exc_info=True)
-                continue
+        ids = df.index.tolist()
+        nombres = self._column_values(df, cols["nombre"], None)
+        direcciones = self._column_values(df, cols["direccion"], "Sin dirección")
+        urls_imagen = self._column_values(df, cols["url_imagen"], "")
+        urls = self._column_values(df, cols["url"], "")
+        geometries = self._column_values(df, cols["geometry"], None)
+        accesos = self._column_values(df, cols["acceso"], None)
+        distritos = self._column_values(df, cols["distrito"], None)
+        x, y, lat, lon = self._parse_points(df, cols["geometry"])
+        if previous is not None:
+            ids = assign_stable_ids(camera_keys(nombres, urls_imagen), ids, previous)
+        # Las cámaras sin nombre reciben uno a partir de su ID ya estable
+        for position, nombre in enumerate(nombres):
+            if nombre is None:
+                nombres[position] = default_camera_name(ids[position])
+        
+        # Log detallado de las primeras 3 cámaras
+        for position in range(min(3, len(df))):
+            logger.debug(f"\n--- Cámara {ids[position]} ---")
+            logger.debug(f"  Nombre: {nombres[position]}")
+            logger.debug(f"  Dirección: {direcciones[position]}")
+            logger.debug(f"  URL Imagen: {urls_imagen[position]}")
+            logger.debug(f"  URL Web: {urls[position]}")
+            logger.debug(f"  Geometry: {geometries[position]}")
+        
+        # Verificar URL de imagen
+        sin_imagen = [
+            position for position, url_imagen in enumerate(urls_imagen)
+            if not (isinstance(url_imagen, str) and url_imagen.strip())
+        ]
+        for position in sin_imagen:
+            logger.warning(f"Cámara {ids[position]} ({nombres[position]}) NO tiene URL de imagen")
+        
+        self.store = CameraStore(
+            ids=ids,
+            nombres=nombres,
+            direcciones=direcciones,
+            urls_imagen=urls_imagen,
+            urls=urls,
+            x=x,
+            y=y,
+            lat=lat,
+            lon=lon,
+            geometries=geometries,
+            accesos=accesos,
+            distritos=distritos,
+        )
+        self.cameras = self.store.all()
         
         logger.info(f"✓ Procesadas {len(self.cameras)} cámaras correctamente")
-        logger.info(f"  - Con imagen: {cameras_con_imagen}")
-        logger.info(f"  - Sin imagen: {cameras_sin_imagen}")
+        logger.info(f"  - Con imagen: {len(self.cameras) - len(sin_imagen)}")
+        logger.info(f"  - Sin imagen: {len(sin_imagen)}")
+    
+    def _update_snapshot(self, etag: Optional[str], last_modified: Optional[str]):
+        """
+        Compara los datos recién parseados con los anteriores y actualiza la copia local.
+        
+        Args:
+            etag: Cabecera ETag de la respuesta
+            last_modified: Cabecera Last-Modified de la respuesta
+        """
+        fingerprint = self.store.fingerprint()
+        self.changed = fingerprint != self.fingerprint
+        validators_changed = (etag, last_modified) != (self.etag, self.last_modified)
+        self.fingerprint = fingerprint
+        self.etag = etag
+        self.last_modified = last_modified
+        
+        if not self.changed:
+            logger.info("✓ El CSV descargado coincide con los datos locales")
+        if self.snapshot is not None and (self.changed or validators_changed):
+            self.snapshot.save(self.store, {
+                "etag": etag,
+                "last_modified": last_modified,
+                "fingerprint": fingerprint,
+                "source_url": self.csv_url,
+            })
+    
+    @staticmethod
+    def _column_values(df: pd.DataFrame, column: Optional[str], default=None) -> list:
+        """
+        Obtiene los valores de una columna sustituyendo los NaN por un valor por defecto.
+        
+        Args:
+            df: DataFrame con los datos
+            column: Nombre de la columna (None si no existe en el CSV)
+            default: Valor para las celdas vacías o si la columna no existe
+            
+        Returns:
+            Lista de valores Python, uno por fila
+        """
+        if not column or column not in df.columns:
+            return [default] * len(df)
+        
+        series = df[column]
+        values = series.to_numpy(dtype=object, copy=True)
+        values[series.isna().to_numpy()] = default
+        return values.tolist()
     
     @staticmethod
-    def _get_value(row: pd.Series, column: str, default=None):
+    def _parse_points(df: pd.DataFrame, column: Optional[str]) -> Tuple[np.ndarray, ...]:
         """
-        Obtiene un valor de una fila del DataFrame de forma segura.
+        Extrae las coordenadas de una columna "POINT (x y)" y las pasa a WGS84.
+        
+        Añade al DataFrame las columnas 'lat' y 'lon' (NaN si no hay geometría).
         
         Args:
-            row: Fila del DataFrame
-            column: Nombre de la columna
-            default: Valor por defecto si no existe o es NaN
+            df: DataFrame con los datos
+            column: Nombre de la columna de geometría
             
         Returns:
-            Valor de la columna o valor por defecto
+            Tupla de arrays (x, y, lat, lon), con NaN donde la geometría no es válida
         """
-        if column not in row.index:
-            return default
+        lon = np.full(len(df), np.nan)
+        lat = np.full(len(df), np.nan)
+        if not column or column not in df.columns:
+            df["lat"] = lat
+            df["lon"] = lon
+            return lon.copy(), lat.copy(), lat, lon
         
-        value = row[column]
+        points = df[column].astype("string").str.extract(POINT_PATTERN, flags=re.IGNORECASE)
+        x = pd.to_numeric(points[0], errors="coerce").to_numpy(dtype=float)
+        y = pd.to_numeric(points[1], errors="coerce").to_numpy(dtype=float)
+        valid = ~(np.isnan(x) | np.isnan(y))
+        x[~valid] = np.nan
+        y[~valid] = np.nan
         
-        # Manejar valores NaN
-        if pd.isna(value):
-            return default
+        if valid.any():
+            lon[valid], lat[valid] = get_converter().convert_many(x[valid], y[valid])
+        df["lat"] = lat
+        df["lon"] = lon
+        return x, y, lat, lon
+    
+    def parse_csv(self, csv_text: str) -> Sequence[Camera]:
+        """
+        Parsea el contenido de un CSV con el formato del dataset oficial.
         
-        return value
+        Args:
+            csv_text: Texto del CSV
+            
+        Returns:
+            Vista con todas las cámaras
+        """
+        self.dataframe = pd.read_csv(StringIO(csv_text), encoding='utf-8')
+        self._parse_cameras()
+        return self.cameras
     
-    def get_cameras(self) -> List[Camera]:
+    def get_cameras(self) -> Sequence[Camera]:
         """
-        Retorna la lista de cámaras cargadas.
+        Retorna las cámaras cargadas.
         
         Returns:
-            Lista de objetos Camera
+            Vista (secuencia de solo lectura) con todas las cámaras
         """
         return self.cameras
     
-    def get_cameras_by_distrito(self, distrito: str) -> List[Camera]:
+    def get_cameras_by_distrito(self, distrito: str) -> Sequence[Camera]:
         """
         Filtra cámaras por distrito.
         
@@ -194,9 +337,9 @@ class DataLoader:
             distrito: ID del distrito a filtrar
             
         Returns:
-            Lista de cámaras del distrito especificado
+            Vista con las cámaras del distrito especificado
         """
-        return [cam for cam in self.cameras if cam.distrito == distrito]
+        return self.store.filter_distrito(distrito)
     
     def get_distritos(self) -> List[str]:
         """
@@ -205,11 +348,7 @@ class DataLoader:
         Returns:
             Lista de IDs de distritos únicos
         """
-        distritos = set()
-        for cam in self.cameras:
-            if cam.distrito:
-                distritos.add(cam.distrito)
-        return sorted(list(distritos))
+        return self.store.get_distritos()
     
     def get_zonas(self) -> List[str]:
         """
@@ -219,25 +358,16 @@ class DataLoader:
         Returns:
             Lista de zonas únicas
         """
-        zonas = set()
-        for cam in self.cameras:
-            zona = cam.get_zona_from_direccion()
-            zonas.add(zona)
-        return sorted(list(zonas))
+        return self.store.get_zonas()
     
-    def search_cameras(self, query: str) -> List[Camera]:
+    def search_cameras(self, query: str) -> Sequence[Camera]:
         """
-        Busca cámaras por nombre o dirección.
+        Busca cámaras por nombre, dirección o zona.
         
         Args:
             query: Texto a buscar
             
         Returns:
-            Lista de cámaras que coinciden con la búsqueda
+            Vista con las cámaras que coinciden, ordenadas por relevancia
         """
-        query_lower = query.lower()
-        return [
-            cam for cam in self.cameras
-            if query_lower in cam.nombre.lower() or 
-               query_lower in cam.direccion.lower()
-        ]
+        return self.store.search(query)
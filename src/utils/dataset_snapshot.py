@@ -0,0 +1,142 @@
+"""Copia local del inventario de cámaras para arrancar sin esperar a la red.
+
+Guarda las columnas ya parseadas de un CameraStore en una base SQLite con
+una fila por cámara, junto con los validadores HTTP del CSV (ETag y
+Last-Modified) y una huella del contenido. Al arrancar se lee la copia en
+milisegundos y la descarga pasa a ser una revalidación condicional en
+segundo plano. Solo usa biblioteca estándar.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import logging
+import os
+import sqlite3
+import time
+
+import config
+from src.models.camera_store import CameraStore
+from src.utils.preferences import app_data_dir
+
+
+logger = logging.getLogger(__name__)
+
+# Versión del formato: una copia con otra versión se ignora
+SCHEMA_VERSION = "1"
+
+COLUMNS = (
+    "id", "nombre", "direccion", "url_imagen", "url",
+    "x", "y", "lat", "lon", "geometry", "acceso", "distrito",
+)
+
+
+class DatasetSnapshot:
+    """Copia en SQLite del último inventario descargado y sus validadores HTTP."""
+
+    def __init__(self, path: Path | None = None) -> None:
+        self._path = path or (app_data_dir() / config.DATASET_SNAPSHOT_FILE_NAME)
+
+    @property
+    def path(self) -> Path:
+        """Ruta del fichero de la copia."""
+        return self._path
+
+    def load(self) -> Optional[Tuple[CameraStore, Dict[str, str]]]:
+        """Lee la copia guardada.
+
+        Returns:
+            Tupla (almacén, metadatos) o None si no existe o no se puede leer
+        """
+        if not self._path.exists():
+            return None
+
+        started = time.perf_counter()
+        try:
+            connection = sqlite3.connect(f"file:{self._path}?mode=ro", uri=True)
+            try:
+                meta = dict(connection.execute("SELECT key, value FROM meta"))
+                if meta.get("schema") != SCHEMA_VERSION:
+                    logger.info("Copia local del dataset con formato antiguo, se ignora")
+                    return None
+                rows = connection.execute(
+                    f"SELECT {', '.join(COLUMNS)} FROM cameras ORDER BY position"
+                ).fetchall()
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            logger.warning(f"No se pudo leer la copia local del dataset: {e}")
+            return None
+
+        columns = dict(zip(COLUMNS, zip(*rows))) if rows else {name: () for name in COLUMNS}
+        # SQLite guarda los NaN como NULL; al convertir a float vuelven a ser NaN
+        store = CameraStore(
+            ids=columns["id"],
+            nombres=list(columns["nombre"]),
+            direcciones=list(columns["direccion"]),
+            urls_imagen=list(columns["url_imagen"]),
+            urls=list(columns["url"]),
+            x=[float("nan") if value is None else value for value in columns["x"]],
+            y=[float("nan") if value is None else value for value in columns["y"]],
+            lat=[float("nan") if value is None else value for value in columns["lat"]],
+            lon=[float("nan") if value is None else value for value in columns["lon"]],
+            geometries=list(columns["geometry"]),
+            accesos=list(columns["acceso"]),
+            distritos=list(columns["distrito"]),
+        )
+        logger.info(
+            f"Copia local del dataset cargada: {len(store)} cámaras "
+            f"en {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        return store, meta
+
+    def save(self, store: CameraStore, meta: Dict[str, Optional[str]]) -> bool:
+        """Guarda el almacén y sus metadatos, reemplazando la copia anterior de forma atómica.
+
+        Args:
+            store: Almacén a guardar
+            meta: Metadatos (etag, last_modified, fingerprint...); los None se omiten
+
+        Returns:
+            True si se guardó
+        """
+        distritos = [
+            None if code < 0 else store.distrito_values[code]
+            for code in store.distrito_codes.tolist()
+        ]
+        rows = zip(
+            range(len(store)), store.ids.tolist(), store.nombres, store.direcciones,
+            store.urls_imagen, store.urls, store.x.tolist(), store.y.tolist(),
+            store.lat.tolist(), store.lon.tolist(), store.geometries, store.accesos, distritos,
+        )
+        entries = {key: str(value) for key, value in meta.items() if value is not None}
+        entries["schema"] = SCHEMA_VERSION
+        entries["saved_at"] = str(time.time())
+
+        tmp_path = self._path.with_suffix(".tmp")
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            if tmp_path.exists():
+                tmp_path.unlink()
+            connection = sqlite3.connect(tmp_path)
+            try:
+                # Columnas sin tipo declarado: SQLite conserva el tipo de cada valor
+                connection.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+                connection.execute(
+                    f"CREATE TABLE cameras (position INTEGER PRIMARY KEY, {', '.join(COLUMNS)})"
+                )
+                connection.executemany("INSERT INTO meta VALUES (?, ?)", entries.items())
+                connection.executemany(
+                    f"INSERT INTO cameras VALUES ({', '.join('?' * (len(COLUMNS) + 1))})", rows
+                )
+                connection.commit()
+            finally:
+                connection.close()
+            os.replace(tmp_path, self._path)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"No se pudo guardar la copia local del dataset: {e}")
+            return False
+
+        logger.info(f"Copia local del dataset guardada: {len(store)} cámaras en {self._path}")
+        return True
@@ -0,0 +1,378 @@
+"""
+Simplificación de geometrías de las capas del mapa.
+
+Los carriles bici y los cortes de tráfico llegan con todos sus vértices y
+coordenadas con 15 decimales; embebidos tal cual en la página hinchan el
+HTML y ralentizan el dibujo en el navegador. Aquí se simplifican las líneas
+y polígonos (Douglas-Peucker con una tolerancia ligada al nivel de zoom), se
+cuantizan las coordenadas a una precisión fija y, opcionalmente, se
+convierten a TopoJSON (arcos compartidos, enteros y codificación delta).
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+import json
+import math
+
+import numpy as np
+
+import config
+
+
+# Metros por píxel en el ecuador a zoom 0 (teselas de 256 px, Web Mercator)
+METERS_PER_PIXEL_Z0 = 156543.03392
+METERS_PER_DEGREE_LAT = 111320.0
+
+LINE_TYPES = ('LineString', 'MultiLineString')
+POLYGON_TYPES = ('Polygon', 'MultiPolygon')
+
+
+@dataclass
+class SimplifyReport:
+    """
+    Resultado de la simplificación de una capa.
+
+    Atributos:
+        vertices_before: Vértices de entrada
+        vertices_after: Vértices tras simplificar y cuantizar
+        size_before: Bytes del GeoJSON de entrada
+        size_after: Bytes del GeoJSON simplificado
+        topojson_size: Bytes del TopoJSON (0 si no se generó)
+    """
+
+    vertices_before: int = 0
+    vertices_after: int = 0
+    size_before: int = 0
+    size_after: int = 0
+    topojson_size: int = 0
+
+    @property
+    def output_size(self) -> int:
+        """Bytes de lo que se embebe en la página."""
+        return self.topojson_size or self.size_after
+
+    @property
+    def reduction(self) -> float:
+        """Fracción de bytes ahorrada (0-1)."""
+        if not self.size_before:
+            return 0.0
+        return 1 - self.output_size / self.size_before
+
+    def summary(self) -> str:
+        """
+        Resumen legible de la reducción.
+
+        Returns:
+            Texto del tipo "-72% (412→115 KB, 9800→2650 vértices, TopoJSON)"
+        """
+        return (
+            f"-{self.reduction * 100:.0f}% ({self.size_before / 1024:.0f}→{self.output_size / 1024:.0f} KB, "
+            f"{self.vertices_before}→{self.vertices_after} vértices"
+            f"{', TopoJSON' if self.topojson_size else ''})"
+        )
+
+
+def tolerance_for_zoom(
+    zoom: float,
+    pixels: float = config.MAP_SIMPLIFY_PIXELS,
+    latitude: float = config.MAP_CENTER_LAT,
+) -> float:
+    """
+    Tolerancia de simplificación equivalente a unos píxeles a un nivel de zoom.
+
+    Args:
+        zoom: Nivel de zoom de Leaflet
+        pixels: Desviación máxima admitida en píxeles
+        latitude: Latitud de referencia (escala de Mercator)
+
+    Returns:
+        Tolerancia en grados de latitud
+    """
+    meters_per_pixel = METERS_PER_PIXEL_Z0 * math.cos(math.radians(latitude)) / (2 ** zoom)
+    return pixels * meters_per_pixel / METERS_PER_DEGREE_LAT
+
+
+def _douglas_peucker(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Índices de los vértices que conserva Douglas-Peucker.
+
+    Args:
+        points: Array (n, 2) en un plano donde la tolerancia es una distancia
+        tolerance: Desviación máxima
+
+    Returns:
+        Array booleano con los vértices a conservar
+    """
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, end = points[first], points[last]
+        segment = points[first + 1:last]
+        dx, dy = end - start
+        length = math.hypot(dx, dy)
+        if length == 0:
+            distances = np.hypot(segment[:, 0] - start[0], segment[:, 1] - start[1])
+        else:
+            distances = np.abs(dx * (segment[:, 1] - start[1]) - dy * (segment[:, 0] - start[0])) / length
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return keep
+
+
+def simplify_line(
+    coords: Sequence[Sequence[float]],
+    tolerance: float,
+    precision: int,
+    ring: bool = False,
+) -> List[List[float]]:
+    """
+    Simplifica una línea o anillo y redondea sus coordenadas.
+
+    Las longitudes se escalan por cos(latitud) para que la tolerancia sea
+    la misma distancia en ambos ejes. Un anillo nunca baja de 4 vértices.
+
+    Args:
+        coords: Lista de [lon, lat]
+        tolerance: Tolerancia en grados de latitud (0 = solo cuantizar)
+        precision: Decimales de las coordenadas
+        ring: Si es el anillo de un polígono (cerrado)
+
+    Returns:
+        Lista de [lon, lat] simplificada
+    """
+    points = np.asarray([point[:2] for point in coords], dtype=float)
+    if len(points) > 2 and tolerance > 0:
+        scale = math.cos(math.radians(float(points[:, 1].mean())))
+        keep = _douglas_peucker(points * (scale, 1.0), tolerance)
+        if not ring or keep.sum() >= 4:
+            points = points[keep]
+
+    points = np.round(points, precision)
+    # Vértices consecutivos que el redondeo ha fundido en uno
+    if len(points) > 1:
+        distinct = np.ones(len(points), dtype=bool)
+        distinct[1:] = np.any(points[1:] != points[:-1], axis=1)
+        if not ring or distinct.sum() >= 4:
+            points = points[distinct]
+    return points.tolist()
+
+
+def _simplify_geometry(geometry: Optional[Dict], tolerance: float, precision: int) -> Optional[Dict]:
+    if not geometry:
+        return geometry
+    kind = geometry.get('type')
+    coords = geometry.get('coordinates')
+    if kind == 'GeometryCollection':
+        return {**geometry, 'geometries': [
+            _simplify_geometry(child, tolerance, precision) for child in geometry.get('geometries', [])
+        ]}
+    if not coords:
+        return geometry
+    if kind == 'Point':
+        return {**geometry, 'coordinates': [round(value, precision) for value in coords[:2]]}
+    if kind == 'MultiPoint':
+        return {**geometry, 'coordinates': [[round(value, precision) for value in point[:2]] for point in coords]}
+    if kind == 'LineString':
+        return {**geometry, 'coordinates': simplify_line(coords, tolerance, precision)}
+    if kind == 'MultiLineString':
+        return {**geometry, 'coordinates': [simplify_line(line, tolerance, precision) for line in coords]}
+    if kind == 'Polygon':
+        return {**geometry, 'coordinates': [simplify_line(ring, tolerance, precision, ring=True) for ring in coords]}
+    if kind == 'MultiPolygon':
+        return {**geometry, 'coordinates': [
+            [simplify_line(ring, tolerance, precision, ring=True) for ring in polygon] for polygon in coords
+        ]}
+    return geometry
+
+
+def _count_vertices(geometry: Optional[Dict]) -> int:
+    if not geometry:
+        return 0
+    if geometry.get('type') == 'GeometryCollection':
+        return sum(_count_vertices(child) for child in geometry.get('geometries', []))
+    count = 0
+    stack = [geometry.get('coordinates')]
+    while stack:
+        coords = stack.pop()
+        if not isinstance(coords, (list, tuple)) or not coords:
+            continue
+        if isinstance(coords[0], (int, float)):
+            count += 1
+        else:
+            stack.extend(coords)
+    return count
+
+
+def _json_size(data) -> int:
+    return len(json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+
+def simplify_geojson(data: Dict, tolerance: float, precision: int) -> Tuple[Dict, SimplifyReport]:
+    """
+    Simplifica y cuantiza las geometrías de una FeatureCollection.
+
+    No modifica data: devuelve una copia con las geometrías nuevas.
+
+    Args:
+        data: FeatureCollection
+        tolerance: Tolerancia en grados de latitud (ver tolerance_for_zoom)
+        precision: Decimales de las coordenadas
+
+    Returns:
+        Tupla (FeatureCollection simplificada, SimplifyReport)
+    """
+    features = data.get('features') or []
+    simplified = {**data, 'features': [
+        {**feature, 'geometry': _simplify_geometry(feature.get('geometry'), tolerance, precision)}
+        for feature in features if feature
+    ]}
+    report = SimplifyReport(
+        vertices_before=sum(_count_vertices(feature.get('geometry')) for feature in features if feature),
+        vertices_after=sum(_count_vertices(feature.get('geometry')) for feature in simplified['features']),
+        size_before=_json_size(data),
+        size_after=_json_size(simplified),
+    )
+    return simplified, report
+
+
+def has_only_lines_or_polygons(data: Dict) -> bool:
+    """
+    Indica si todas las geometrías de una FeatureCollection son líneas o polígonos.
+
+    Args:
+        data: FeatureCollection
+
+    Returns:
+        True si puede representarse como TopoJSON sin perder marcadores
+    """
+    features = data.get('features') or []
+    return bool(features) and all(
+        (feature.get('geometry') or {}).get('type') in LINE_TYPES + POLYGON_TYPES
+        for feature in features if feature
+    )
+
+
+def to_topojson(
+    data: Dict,
+    object_name: str = "layer",
+    quantization: int = config.MAP_TOPOJSON_QUANTIZATION,
+) -> Dict:
+    """
+    Convierte una FeatureCollection de líneas y polígonos a TopoJSON.
+
+    Cada línea o anillo es un arco con coordenadas enteras (cuantizadas a
+    una rejilla de quantization x quantization sobre la extensión de la
+    capa) codificadas como diferencias; los arcos idénticos (también en
+    sentido inverso, como los bordes entre polígonos vecinos) se guardan
+    una sola vez.
+
+    Args:
+        data: FeatureCollection (ver has_only_lines_or_polygons)
+        object_name: Nombre del objeto en "objects"
+        quantization: Número de posiciones de la rejilla por eje
+
+    Returns:
+        Topology con un GeometryCollection en objects[object_name]
+    """
+    features = [feature for feature in data.get('features') or [] if feature and feature.get('geometry')]
+    all_points = [
+        point[:2]
+        for feature in features
+        for line in _iter_lines(feature['geometry'])
+        for point in line
+    ]
+    if all_points:
+        points = np.asarray(all_points, dtype=float)
+        x0, y0 = points.min(axis=0)
+        x1, y1 = points.max(axis=0)
+    else:
+        x0 = y0 = 0.0
+        x1 = y1 = 1.0
+    kx = (x1 - x0) / (quantization - 1) or 1.0
+    ky = (y1 - y0) / (quantization - 1) or 1.0
+
+    arcs: List[List[List[int]]] = []
+    arc_index: Dict[Tuple, int] = {}
+
+    def add_arc(line) -> int:
+        quantized = [
+            (int(round((point[0] - x0) / kx)), int(round((point[1] - y0) / ky))) for point in line
+        ]
+        # Puntos repetidos tras cuantizar
+        quantized = [point for i, point in enumerate(quantized) if i == 0 or point != quantized[i - 1]]
+        if len(quantized) < 2:
+            quantized = quantized * 2
+        key = tuple(quantized)
+        if key in arc_index:
+            return arc_index[key]
+        if key[::-1] in arc_index:
+            return ~arc_index[key[::-1]]
+        arc_index[key] = len(arcs)
+        previous = (0, 0)
+        encoded = []
+        for x, y in quantized:
+            encoded.append([x - previous[0], y - previous[1]])
+            previous = (x, y)
+        arcs.append(encoded)
+        return arc_index[key]
+
+    geometries = []
+    for feature in features:
+        geometry = feature['geometry']
+        kind = geometry['type']
+        coords = geometry.get('coordinates') or []
+        if kind == 'LineString':
+            topo_arcs = [add_arc(coords)]
+        elif kind == 'MultiLineString':
+            topo_arcs = [[add_arc(line)] for line in coords]
+        elif kind == 'Polygon':
+            topo_arcs = [[add_arc(ring)] for ring in coords]
+        elif kind == 'MultiPolygon':
+            topo_arcs = [[[add_arc(ring)] for ring in polygon] for polygon in coords]
+        else:
+            continue
+        topo_geometry = {'type': kind, 'arcs': topo_arcs, 'properties': feature.get('properties') or {}}
+        if 'id' in feature:
+            topo_geometry['id'] = feature['id']
+        geometries.append(topo_geometry)
+
+    return {
+        'type': 'Topology',
+        'transform': {'scale': [kx, ky], 'translate': [x0, y0]},
+        'objects': {object_name: {'type': 'GeometryCollection', 'geometries': geometries}},
+        'arcs': arcs,
+    }
+
+
+def _iter_lines(geometry: Dict):
+    """Recorre las líneas y anillos de una geometría de líneas o polígonos."""
+    kind = geometry.get('type')
+    coords = geometry.get('coordinates') or []
+    if kind == 'LineString':
+        yield coords
+    elif kind in ('MultiLineString', 'Polygon'):
+        yield from coords
+    elif kind == 'MultiPolygon':
+        for polygon in coords:
+            yield from polygon
+
+
+def topojson_size(topology: Dict) -> int:
+    """
+    Bytes de un TopoJSON serializado de forma compacta.
+
+    Args:
+        topology: Topology
+
+    Returns:
+        Tamaño en bytes
+    """
+    return _json_size(topology)
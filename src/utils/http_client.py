@@ -0,0 +1,200 @@
+"""
+Cliente HTTP compartido con pool de conexiones persistentes.
+
+Este módulo centraliza las descargas de imágenes de la aplicación en una
+única sesión de requests, de forma que las peticiones al mismo host
+reutilizan conexiones TCP/TLS abiertas (keep-alive) en lugar de negociar
+un handshake nuevo por cada fotograma.
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import config
+from src.utils.rate_governor import get_rate_governor
+
+
+logger = logging.getLogger(__name__)
+
+
+class HttpClient:
+    """
+    Transporte HTTP con pool de conexiones por host y política de reintentos.
+    """
+
+    def __init__(
+        self,
+        pool_connections: Optional[int] = None,
+        pool_maxsize: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_factor: Optional[float] = None,
+    ):
+        """
+        Inicializa la sesión y monta el adaptador con pool.
+
+        Args:
+            pool_connections: Número de hosts distintos con pool propio
+            pool_maxsize: Conexiones keep-alive máximas por host
+            max_retries: Reintentos ante errores de conexión o estados transitorios
+            backoff_factor: Factor de espera exponencial entre reintentos
+        """
+        self.pool_connections = pool_connections or config.HTTP_POOL_CONNECTIONS
+        self.pool_maxsize = pool_maxsize or config.HTTP_POOL_MAXSIZE
+        self.max_retries = config.HTTP_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_factor = config.HTTP_RETRY_BACKOFF if backoff_factor is None else backoff_factor
+
+        # Solo se reintentan fallos de conexión y respuestas transitorias del servidor:
+        # reintentar lecturas multiplicaría el timeout de las cámaras caídas.
+        retry = Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=0,
+            status=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=config.HTTP_RETRY_STATUS_CODES,
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            raise_on_status=False,
+            respect_retry_after_header=True,
+        )
+        self.adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=retry,
+            pool_block=False,
+        )
+
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+        self._bytes_received = 0
+        self._host_requests: Dict[str, int] = {}
+
+        logger.info(
+            f"HttpClient inicializado: {self.pool_connections} hosts, "
+            f"{self.pool_maxsize} conexiones/host, {self.max_retries} reintentos"
+        )
+
+    def get(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """
+        Realiza una petición GET reutilizando las conexiones del pool.
+
+        El cuerpo se lee completo antes de retornar para que la conexión
+        vuelva al pool inmediatamente.
+
+        Args:
+            url: URL a descargar
+            headers: Cabeceras HTTP de la petición
+            timeout: Timeout en segundos (usa IMAGE_TIMEOUT si es None)
+
+        Returns:
+            Respuesta de requests con el contenido ya descargado
+
+        Raises:
+            requests.RequestException: Si la petición falla
+        """
+        host = urlsplit(url).netloc
+        with self._lock:
+            self._requests += 1
+            self._host_requests[host] = self._host_requests.get(host, 0) + 1
+
+        try:
+            response = self.session.get(
+                url,
+                headers=headers,
+                timeout=timeout if timeout is not None else config.IMAGE_TIMEOUT,
+                allow_redirects=kwargs.pop("allow_redirects", True),
+                **kwargs,
+            )
+            content = response.content
+        except requests.RequestException:
+            with self._lock:
+                self._errors += 1
+            raise
+
+        with self._lock:
+            self._bytes_received += len(content)
+        get_rate_governor().record_bytes(len(content))
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Retorna estadísticas de uso del transporte y de cada pool por host.
+
+        Returns:
+            Diccionario con contadores globales y un apartado 'pools' por host
+        """
+        pools: Dict[str, Dict[str, int]] = {}
+        manager = self.adapter.poolmanager
+        if manager is not None:
+            for key in list(manager.pools.keys()):
+                pool = manager.pools.get(key)
+                if pool is None:
+                    continue
+                origin = f"{pool.scheme}://{pool.host}:{pool.port}"
+                # La cola del pool se rellena con None hasta maxsize; solo cuentan las conexiones reales
+                idle = sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool is not None else 0
+                pools[origin] = {
+                    "requests": pool.num_requests,
+                    "connections_created": pool.num_connections,
+                    "idle_connections": idle,
+                    "max_connections": self.pool_maxsize,
+                }
+
+        # Conexiones y peticiones salen de los mismos pools: los reintentos y
+        # redirecciones cuentan en ambos y un pool descartado sale de los dos
+        pool_requests = sum(p["requests"] for p in pools.values())
+        created = sum(p["connections_created"] for p in pools.values())
+        reuse_ratio = min(max(1 - created / pool_requests, 0.0), 1.0) if pool_requests else 0.0
+
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "errors": self._errors,
+                "bytes_received": self._bytes_received,
+                "connection_reuse_ratio": reuse_ratio,
+                "requests_by_host": dict(self._host_requests),
+                "pools": pools,
+            }
+
+    def close(self):
+        """
+        Cierra la sesión y todas las conexiones abiertas del pool.
+        """
+        self.session.close()
+        logger.info("HttpClient cerrado")
+
+
+# Instancia global del cliente
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """
+    Obtiene la instancia global del cliente HTTP.
+
+    Returns:
+        Instancia de HttpClient compartida por todos los descargadores
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
@@ -0,0 +1,272 @@
+"""
+Caché LRU de imágenes limitada por memoria.
+
+Este módulo implementa la caché en memoria de las imágenes de las cámaras.
+El límite se expresa en bytes de píxeles (no en número de entradas), las
+entradas menos usadas recientemente se expulsan primero y las vistas pueden
+fijar cámaras (favoritas, ventanas flotantes) para que nunca se expulsen.
+Cada entrada puede guardar además variantes ya escaladas a los tamaños que
+piden las vistas; ocupan presupuesto y se descartan junto a la imagen.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+import logging
+
+from PySide6.QtGui import QPixmap
+
+import config
+
+
+logger = logging.getLogger(__name__)
+
+
+class ImageCache:
+    """
+    Caché LRU de QPixmap por cámara con presupuesto de memoria y fijado.
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Inicializa la caché.
+
+        Args:
+            max_bytes: Presupuesto máximo de memoria en bytes (0 desactiva la caché)
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[int, QPixmap]" = OrderedDict()
+        self._sizes: Dict[int, int] = {}
+        self._scaled: Dict[int, "OrderedDict[Tuple[int, int], QPixmap]"] = {}
+        self._pins: Dict[int, Set[str]] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def pixmap_bytes(pixmap: QPixmap) -> int:
+        """
+        Estima la memoria ocupada por un QPixmap.
+
+        Args:
+            pixmap: Imagen a medir
+
+        Returns:
+            Bytes aproximados de los píxeles
+        """
+        depth = max(pixmap.depth(), 8)
+        return pixmap.width() * pixmap.height() * depth // 8
+
+    def __contains__(self, camera_id: int) -> bool:
+        return camera_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, camera_id: int) -> Optional[QPixmap]:
+        """
+        Obtiene una imagen y la marca como usada recientemente.
+
+        Args:
+            camera_id: ID de la cámara
+
+        Returns:
+            QPixmap en caché o None si no existe
+        """
+        pixmap = self._entries.get(camera_id)
+        if pixmap is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(camera_id)
+        return pixmap
+
+    def peek(self, camera_id: int) -> Optional[QPixmap]:
+        """
+        Obtiene una imagen sin alterar el orden LRU ni los contadores.
+
+        Args:
+            camera_id: ID de la cámara
+
+        Returns:
+            QPixmap en caché o None si no existe
+        """
+        return self._entries.get(camera_id)
+
+    def get_scaled(self, camera_id: int, size: Tuple[int, int]) -> Optional[QPixmap]:
+        """
+        Obtiene la variante escalada de una imagen para un tamaño de vista.
+
+        Args:
+            camera_id: ID de la cámara
+            size: Tupla (ancho, alto) del área donde se muestra
+
+        Returns:
+            QPixmap escalado o None si no se ha generado todavía
+        """
+        variants = self._scaled.get(camera_id)
+        if not variants or size not in variants:
+            return None
+
+        variants.move_to_end(size)
+        self._entries.move_to_end(camera_id)
+        return variants[size]
+
+    def put_scaled(self, camera_id: int, size: Tuple[int, int], pixmap: QPixmap):
+        """
+        Guarda una variante escalada de la imagen actual de una cámara.
+
+        Solo se aceptan variantes de imágenes presentes en la caché; cada
+        cámara conserva como mucho SCALED_VARIANTS_PER_CAMERA tamaños.
+
+        Args:
+            camera_id: ID de la cámara
+            size: Tupla (ancho, alto) del área donde se muestra
+            pixmap: Imagen ya escalada
+        """
+        if camera_id not in self._entries:
+            return
+
+        variants = self._scaled.setdefault(camera_id, OrderedDict())
+        previous = variants.pop(size, None)
+        if previous is not None:
+            self._resize_entry(camera_id, -self.pixmap_bytes(previous))
+
+        variants[size] = pixmap
+        self._resize_entry(camera_id, self.pixmap_bytes(pixmap))
+
+        while len(variants) > config.SCALED_VARIANTS_PER_CAMERA:
+            _, dropped = variants.popitem(last=False)
+            self._resize_entry(camera_id, -self.pixmap_bytes(dropped))
+
+        self._evict(keep=camera_id)
+
+    def put(self, camera_id: int, pixmap: QPixmap):
+        """
+        Inserta o reemplaza la imagen de una cámara y aplica el presupuesto.
+
+        Args:
+            camera_id: ID de la cámara
+            pixmap: Imagen a guardar
+        """
+        if self.max_bytes <= 0:
+            return
+
+        size = self.pixmap_bytes(pixmap)
+        if size > self.max_bytes and not self.is_pinned(camera_id):
+            logger.debug(f"Imagen {camera_id} ({size} bytes) excede el presupuesto de caché, no se guarda")
+            self.remove(camera_id)
+            return
+
+        self.remove(camera_id)
+        self._entries[camera_id] = pixmap
+        self._sizes[camera_id] = size
+        self.current_bytes += size
+        self._evict(keep=camera_id)
+
+    def remove(self, camera_id: int):
+        """
+        Elimina la imagen de una cámara (los pines se conservan).
+
+        Args:
+            camera_id: ID de la cámara
+        """
+        if camera_id in self._entries:
+            del self._entries[camera_id]
+            self._scaled.pop(camera_id, None)
+            self.current_bytes -= self._sizes.pop(camera_id, 0)
+
+    def clear(self):
+        """
+        Vacía la caché. Los pines se conservan para las próximas imágenes.
+        """
+        self._entries.clear()
+        self._sizes.clear()
+        self._scaled.clear()
+        self.current_bytes = 0
+
+    def pin(self, camera_id: int, owner: str):
+        """
+        Fija una cámara para que no se expulse mientras alguna vista la use.
+
+        Args:
+            camera_id: ID de la cámara
+            owner: Identificador de la vista que fija la cámara (ej: "favoritos")
+        """
+        self._pins.setdefault(camera_id, set()).add(owner)
+
+    def unpin(self, camera_id: int, owner: str):
+        """
+        Libera el pin de una vista sobre una cámara.
+
+        Args:
+            camera_id: ID de la cámara
+            owner: Identificador de la vista
+        """
+        owners = self._pins.get(camera_id)
+        if not owners:
+            return
+        owners.discard(owner)
+        if not owners:
+            del self._pins[camera_id]
+            self._evict()
+
+    def unpin_owner(self, owner: str):
+        """
+        Libera todos los pines de una vista.
+
+        Args:
+            owner: Identificador de la vista
+        """
+        for camera_id in list(self._pins.keys()):
+            self.unpin(camera_id, owner)
+
+    def is_pinned(self, camera_id: int) -> bool:
+        """Indica si alguna vista mantiene fijada la cámara."""
+        return bool(self._pins.get(camera_id))
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Retorna los contadores de uso de la caché.
+
+        Returns:
+            Diccionario con aciertos, fallos, expulsiones y ocupación
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "scaled_variants": sum(len(variants) for variants in self._scaled.values()),
+            "pinned": sum(1 for camera_id in self._entries if self.is_pinned(camera_id)),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _resize_entry(self, camera_id: int, delta: int):
+        """Ajusta la memoria contabilizada de una entrada."""
+        self._sizes[camera_id] = self._sizes.get(camera_id, 0) + delta
+        self.current_bytes += delta
+
+    def _evict(self, keep: Optional[int] = None):
+        """
+        Expulsa las entradas menos usadas hasta respetar el presupuesto.
+
+        Args:
+            keep: Cámara recién insertada que no debe expulsarse
+        """
+        if self.current_bytes <= self.max_bytes:
+            return
+
+        for camera_id in list(self._entries.keys()):
+            if self.current_bytes <= self.max_bytes:
+                break
+            if camera_id == keep or self.is_pinned(camera_id):
+                continue
+            self.remove(camera_id)
+            self.evictions += 1
+            logger.debug(f"Imagen {camera_id} expulsada de la caché (LRU)")
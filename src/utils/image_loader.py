@@ -2,28 +2,260 @@
 Módulo para cargar imágenes de las cámaras de forma asíncrona.
 
 Este módulo gestiona la descarga y caché de imágenes de las cámaras
-sin bloquear la interfaz gráfica.
+sin bloquear la interfaz gráfica. La decodificación y el escalado a los
+tamaños que muestran las vistas se hacen en los hilos de trabajo; el hilo
+de la interfaz solo convierte los QImage resultantes a QPixmap.
 """
 
 import requests
-from PySide6.QtCore import QObject, QRunnable, Signal, QThreadPool
+from PySide6.QtCore import QObject, QRunnable, Signal, QThreadPool, QSize, Qt, QTimer
 from PySide6.QtGui import QPixmap, QImage
-from typing import Optional, Dict
+from dataclasses import dataclass
+from typing import Optional, Dict, Set, Tuple, Iterable
+import hashlib
 import logging
+import time
 from io import BytesIO
 
 import config
+from src.utils.http_client import get_http_client
+from src.utils.async_fetcher import FetchError, FetchResult, get_fetch_engine
+from src.utils.camera_health import HealthTracker
+from src.utils.image_cache import ImageCache
+from src.utils.rate_governor import TRAFFIC_BACKGROUND, TRAFFIC_LIVE, get_rate_governor
+from src.utils.refresh_cadence import RefreshCadence
+from src.utils.snapshot_cache import SnapshotDiskCache
+from src.utils.task_queue import ImageTaskQueue
 
 
 logger = logging.getLogger(__name__)
 
+# Tamaño (ancho, alto) del área donde una vista muestra la imagen
+DisplaySize = Tuple[int, int]
+
+# Prioridades de descarga en el pool (mayor se atiende antes)
+PRIORITY_LIVE = 30  # Vista de detalle y ventanas flotantes
+PRIORITY_VISIBLE = 20  # Cámaras en pantalla en las vistas lista/cuadrícula
+PRIORITY_NEARBY = 10  # Cámaras a punto de entrar en pantalla al hacer scroll
+PRIORITY_BACKGROUND = 0  # Resto (refresco completo)
+
+
+@dataclass
+class ImageValidators:
+    """
+    Validadores HTTP de la última imagen recibida de una cámara.
+    
+    Atributos:
+        etag: Cabecera ETag devuelta por el servidor
+        last_modified: Cabecera Last-Modified devuelta por el servidor
+        content_length: Tamaño en bytes del cuerpo recibido
+        content_hash: Hash del cuerpo, para servidores sin validadores
+    """
+    
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_length: Optional[int] = None
+    content_hash: Optional[str] = None
+    
+    @classmethod
+    def from_response(cls, headers, content: bytes) -> "ImageValidators":
+        """
+        Construye los validadores a partir de una respuesta completa.
+        
+        Args:
+            headers: Cabeceras de la respuesta HTTP
+            content: Cuerpo descargado
+            
+        Returns:
+            Validadores de la respuesta
+        """
+        return cls(
+            etag=headers.get('ETag'),
+            last_modified=headers.get('Last-Modified'),
+            content_length=len(content),
+            content_hash=hash_content(content),
+        )
+    
+    def conditional_headers(self) -> Dict[str, str]:
+        """
+        Cabeceras para una petición condicional basada en estos validadores.
+        
+        Returns:
+            Diccionario con If-None-Match y/o If-Modified-Since
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+    
+    def matches_content(self, content: bytes, content_hash: str) -> bool:
+        """
+        Indica si un cuerpo descargado es idéntico al ya conocido.
+        
+        Args:
+            content: Cuerpo descargado
+            content_hash: Hash precalculado del cuerpo
+            
+        Returns:
+            True si tamaño y hash coinciden
+        """
+        return self.content_length == len(content) and self.content_hash == content_hash
+
+
+def hash_content(content: bytes) -> str:
+    """
+    Calcula el hash rápido usado para detectar imágenes repetidas.
+    
+    Args:
+        content: Bytes de la imagen
+        
+    Returns:
+        Hash hexadecimal del contenido
+    """
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def scale_image(qimage: QImage, size: DisplaySize) -> QImage:
+    """
+    Escala una imagen para que quepa en un área manteniendo la proporción.
+    
+    Args:
+        qimage: Imagen a resolución completa
+        size: Tupla (ancho, alto) del área de destino
+        
+    Returns:
+        Imagen escalada con suavizado
+    """
+    width, height = size
+    return qimage.scaled(QSize(width, height), Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+
+def scale_variants(qimage: QImage, sizes: Iterable[DisplaySize]) -> Dict[DisplaySize, QImage]:
+    """
+    Genera las variantes escaladas de una imagen para varios tamaños.
+    
+    Args:
+        qimage: Imagen a resolución completa
+        sizes: Tamaños de destino
+        
+    Returns:
+        Diccionario tamaño -> imagen escalada
+    """
+    return {size: scale_image(qimage, size) for size in sizes if size[0] > 0 and size[1] > 0}
+
 
 class ImageLoaderSignals(QObject):
     """
     Señales para comunicar resultados de carga de imágenes.
     """
-    finished = Signal(int, QPixmap)  # camera_id, imagen
-    error = Signal(int, str)  # camera_id, mensaje de error
+    finished = Signal(int, QImage, object, object)  # camera_id, imagen, variantes escaladas, validadores
+    unchanged = Signal(int, object)  # camera_id, validadores
+    error = Signal(int, str, bool)  # camera_id, mensaje de error, fallo de conexión (cuenta para el servidor)
+
+
+class SnapshotSignals(QObject):
+    """
+    Señales para comunicar fotogramas recuperados de la caché en disco.
+    """
+    loaded = Signal(int, QImage, object, object)  # camera_id, imagen, variantes escaladas, validadores
+
+
+class ScaleSignals(QObject):
+    """
+    Señales para comunicar variantes escaladas bajo demanda.
+    """
+    finished = Signal(int, int, object, QImage)  # camera_id, fotograma, tamaño, imagen escalada
+
+
+class ScaleTask(QRunnable):
+    """
+    Tarea para escalar en segundo plano una imagen ya descargada.
+    """
+    
+    def __init__(self, camera_id: int, frame: int, qimage: QImage, size: DisplaySize):
+        """
+        Inicializa la tarea de escalado.
+        
+        Args:
+            camera_id: ID de la cámara
+            frame: Número de fotograma de la imagen origen (descarta resultados obsoletos)
+            qimage: Imagen a resolución completa
+            size: Tamaño de destino
+        """
+        super().__init__()
+        self.camera_id = camera_id
+        self.frame = frame
+        self.qimage = qimage
+        self.size = size
+        self.signals = ScaleSignals()
+    
+    def run(self):
+        """
+        Escala la imagen fuera del hilo de la interfaz.
+        """
+        try:
+            scaled = scale_image(self.qimage, self.size)
+            self.signals.finished.emit(self.camera_id, self.frame, self.size, scaled)
+        except Exception as e:
+            logger.warning(f"[Cámara {self.camera_id}] Error escalando imagen a {self.size}: {e}")
+
+
+class SnapshotLoadTask(QRunnable):
+    """
+    Tarea para leer y decodificar el último fotograma guardado en disco.
+    """
+    
+    def __init__(
+        self,
+        camera_id: int,
+        image_url: str,
+        disk_cache: SnapshotDiskCache,
+        target_sizes: Iterable[DisplaySize] = ()
+    ):
+        """
+        Inicializa la tarea de lectura.
+        
+        Args:
+            camera_id: ID de la cámara
+            image_url: URL de la imagen (clave en la caché de disco)
+            disk_cache: Caché persistente de fotogramas
+            target_sizes: Tamaños a los que escalar el fotograma recuperado
+        """
+        super().__init__()
+        self.camera_id = camera_id
+        self.image_url = image_url
+        self.disk_cache = disk_cache
+        self.target_sizes = tuple(target_sizes)
+        self.signals = SnapshotSignals()
+    
+    def run(self):
+        """
+        Lee el fotograma guardado y lo decodifica fuera del hilo de la interfaz.
+        """
+        try:
+            cached = self.disk_cache.get(self.image_url)
+            if cached is None:
+                return
+            
+            content, entry = cached
+            qimage = QImage()
+            if not qimage.loadFromData(content):
+                logger.debug(f"[Cámara {self.camera_id}] Snapshot en disco ilegible, se ignora")
+                return
+            
+            validators = ImageValidators(
+                etag=entry.get('etag'),
+                last_modified=entry.get('last_modified'),
+                content_length=len(content),
+                content_hash=entry.get('hash'),
+            )
+            logger.debug(f"[Cámara {self.camera_id}] Fotograma recuperado de disco")
+            scaled = scale_variants(qimage, self.target_sizes)
+            self.signals.loaded.emit(self.camera_id, qimage, scaled, validators)
+        except Exception as e:
+            logger.warning(f"[Cámara {self.camera_id}] Error leyendo snapshot de disco: {e}")
 
 
 class ImageLoadTask(QRunnable):
@@ -31,19 +263,60 @@ class ImageLoadTask(QRunnable):
     Tarea para cargar una imagen en un hilo separado.
     """
     
-    def __init__(self, camera_id: int, image_url: str):
+    def __init__(
+        self,
+        camera_id: int,
+        image_url: str,
+        validators: Optional[ImageValidators] = None,
+        disk_cache: Optional[SnapshotDiskCache] = None,
+        target_sizes: Iterable[DisplaySize] = (),
+        force_reload: bool = False
+    ):
         """
         Inicializa la tarea de carga.
         
         Args:
             camera_id: ID de la cámara
             image_url: URL de la imagen a cargar
+            validators: Validadores de la imagen en caché para hacer una petición condicional
+            disk_cache: Caché en disco donde persistir el fotograma descargado
+            target_sizes: Tamaños a los que escalar la imagen para las vistas
+            force_reload: Si la tarea es un refresco (descartable si la cola se llena)
+        
+        Con el motor asíncrono la descarga la hace AsyncFetchEngine y el
+        resultado se asigna a prefetched antes de pasar la tarea al pool,
+        que entonces solo decodifica y escala.
         """
         super().__init__()
         self.camera_id = camera_id
         self.image_url = image_url
+        self.validators = validators
+        self.disk_cache = disk_cache
+        self.target_sizes = tuple(target_sizes)
+        self.force_reload = force_reload
+        self.priority = PRIORITY_BACKGROUND
+        self.generation = 0
+        self.enqueued_at = 0.0
+        self.prefetched: Optional[FetchResult] = None
         self.signals = ImageLoaderSignals()
     
+    def request_headers(self) -> Dict[str, str]:
+        """
+        Cabeceras de la petición, incluidas las condicionales si hay validadores.
+        
+        Returns:
+            Diccionario de cabeceras HTTP
+        """
+        # Headers completos para simular navegador
+        headers = config.IMAGE_REQUEST_HEADERS if hasattr(config, 'IMAGE_REQUEST_HEADERS') else {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
+            'Accept': 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8',
+            'Referer': 'https://movilidad.malaga.eu/'
+        }
+        if self.validators:
+            headers = {**headers, **self.validators.conditional_headers()}
+        return headers
+    
     def run(self):
         """
         Ejecuta la descarga de la imagen.
@@ -56,37 +329,38 @@ class ImageLoadTask(QRunnable):
             if not self.image_url or not self.image_url.strip():
                 error_msg = "URL de imagen vacía"
                 logger.error(f"[Cámara {self.camera_id}] {error_msg}")
-                self.signals.error.emit(self.camera_id, error_msg)
+                self.signals.error.emit(self.camera_id, error_msg, False)
                 return
             
-            # Descargar imagen
-            logger.debug(f"[Cámara {self.camera_id}] Realizando petición HTTP...")
-            
-            # Headers completos para simular navegador
-            headers = config.IMAGE_REQUEST_HEADERS if hasattr(config, 'IMAGE_REQUEST_HEADERS') else {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-                'Accept': 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8',
-                'Referer': 'https://movilidad.malaga.eu/'
-            }
-            
-            response = requests.get(
-                self.image_url, 
-                timeout=config.IMAGE_TIMEOUT,
-                stream=True,
-                headers=headers,
-                allow_redirects=True
-            )
+            if self.prefetched is not None:
+                # Descarga ya hecha por el motor asíncrono
+                result = self.prefetched
+                if result.timed_out:
+                    raise requests.Timeout(result.error)
+                result.raise_for_status()
+                status_code, response_headers, content = result.status, result.headers, result.content
+            else:
+                logger.debug(f"[Cámara {self.camera_id}] Realizando petición HTTP...")
+                response = get_http_client().get(
+                    self.image_url,
+                    headers=self.request_headers(),
+                    timeout=config.IMAGE_TIMEOUT
+                )
+                response.raise_for_status()
+                status_code, response_headers, content = response.status_code, response.headers, response.content
             
-            logger.debug(f"[Cámara {self.camera_id}] Status: {response.status_code}")
-            logger.debug(f"[Cámara {self.camera_id}] Content-Type: {response.headers.get('content-type', 'N/A')}")
-            logger.debug(f"[Cámara {self.camera_id}] Content-Length: {response.headers.get('content-length', 'N/A')}")
+            logger.debug(f"[Cámara {self.camera_id}] Status: {status_code}")
+            logger.debug(f"[Cámara {self.camera_id}] Content-Type: {response_headers.get('content-type', 'N/A')}")
+            logger.debug(f"[Cámara {self.camera_id}] Content-Length: {response_headers.get('content-length', 'N/A')}")
             
-            response.raise_for_status()
+            if status_code == 304 and self.validators:
+                logger.debug(f"[Cámara {self.camera_id}] 304 Not Modified, se conserva la imagen actual")
+                self.signals.unchanged.emit(self.camera_id, self.validators)
+                return
             
             # Obtener contenido y verificar tipo
-            content_type = response.headers.get('content-type', '')
+            content_type = response_headers.get('content-type', '')
             logger.debug(f"[Cámara {self.camera_id}] Content-Type recibido: {content_type}")
-            content = response.content
 
             # Si no es una imagen, puede ser HTML (error del servidor)
             if 'text/html' in content_type.lower():
@@ -94,7 +368,7 @@ class ImageLoadTask(QRunnable):
                 logger.error(f"[Cámara {self.camera_id}] {error_msg}")
                 preview = content[:500].decode('utf-8', errors='ignore') if content else ''
                 logger.debug(f"[Cámara {self.camera_id}] Contenido HTML: {preview}")
-                self.signals.error.emit(self.camera_id, "Sin acceso")
+                self.signals.error.emit(self.camera_id, "Sin acceso", False)
                 return
 
             if 'image' not in content_type.lower() and content_type:
@@ -104,39 +378,58 @@ class ImageLoadTask(QRunnable):
             if len(content) == 0:
                 error_msg = "Imagen vacía (0 bytes)"
                 logger.error(f"[Cámara {self.camera_id}] {error_msg}")
-                self.signals.error.emit(self.camera_id, error_msg)
+                self.signals.error.emit(self.camera_id, error_msg, False)
                 return
             
-            # Convertir a QPixmap
+            # Servidores sin validadores: comparar tamaño y hash antes de decodificar
+            validators = ImageValidators.from_response(response_headers, content)
+            if self.validators and self.validators.matches_content(content, validators.content_hash):
+                logger.debug(f"[Cámara {self.camera_id}] Contenido idéntico (hash), se omite la decodificación")
+                self.signals.unchanged.emit(self.camera_id, validators)
+                return
+            
+            # Decodificar y escalar aquí: QPixmap solo puede crearse en el hilo de la interfaz
             image_data = BytesIO(content)
             qimage = QImage()
             
             logger.debug(f"[Cámara {self.camera_id}] Cargando en QImage...")
             if qimage.loadFromData(image_data.getvalue()):
                 logger.debug(f"[Cámara {self.camera_id}] QImage cargada: {qimage.width()}x{qimage.height()}")
-                pixmap = QPixmap.fromImage(qimage)
+                scaled = scale_variants(qimage, self.target_sizes)
                 logger.info(f"[Cámara {self.camera_id}] ✓ Imagen cargada exitosamente")
-                self.signals.finished.emit(self.camera_id, pixmap)
+                if self.disk_cache:
+                    self.disk_cache.put(
+                        self.image_url,
+                        content,
+                        etag=validators.etag,
+                        last_modified=validators.last_modified,
+                        content_hash=validators.content_hash,
+                    )
+                self.signals.finished.emit(self.camera_id, qimage, scaled, validators)
             else:
                 error_msg = "QImage.loadFromData() falló"
                 logger.error(f"[Cámara {self.camera_id}] {error_msg}")
                 logger.debug(f"[Cámara {self.camera_id}] Primeros 100 bytes: {content[:100]}")
-                self.signals.error.emit(self.camera_id, error_msg)
+                self.signals.error.emit(self.camera_id, error_msg, False)
             
         except requests.Timeout as e:
             error_msg = f"Timeout ({config.IMAGE_TIMEOUT}s)"
             logger.warning(f"[Cámara {self.camera_id}] {error_msg}")
-            self.signals.error.emit(self.camera_id, error_msg)
+            self.signals.error.emit(self.camera_id, error_msg, True)
             
-        except requests.RequestException as e:
+        except (requests.RequestException, FetchError) as e:
             error_msg = f"Error HTTP: {str(e)}"
             logger.warning(f"[Cámara {self.camera_id}] {error_msg}")
-            self.signals.error.emit(self.camera_id, error_msg)
+            # Un código HTTP de error es cosa de la cámara; el resto, del servidor
+            http_status = isinstance(e, requests.HTTPError) or (
+                self.prefetched is not None and self.prefetched.error is None
+            )
+            self.signals.error.emit(self.camera_id, error_msg, not http_status)
             
         except Exception as e:
             error_msg = f"Error inesperado: {str(e)}"
             logger.error(f"[Cámara {self.camera_id}] {error_msg}", exc_info=True)
-            self.signals.error.emit(self.camera_id, error_msg)
+            self.signals.error.emit(self.camera_id, error_msg, False)
 
 
 class ImageLoader(QObject):
@@ -146,20 +439,189 @@ class ImageLoader(QObject):
     
     # Señales
     image_loaded = Signal(int, QPixmap)  # camera_id, imagen
+    image_scaled = Signal(int, object, QPixmap)  # camera_id, tamaño, imagen escalada
+    image_unchanged = Signal(int)  # camera_id, la imagen en caché sigue vigente
     image_error = Signal(int, str)  # camera_id, error
     
+    # Interna: descarga terminada en el hilo del motor asíncrono (tarea, FetchResult)
+    _fetch_done = Signal(object, object)
+    
     def __init__(self):
         """
         Inicializa el gestor de imágenes.
         """
         super().__init__()
         self.thread_pool = QThreadPool()
-        self.cache: Dict[int, QPixmap] = {}
-        self.max_cache_size = config.CACHE_MAX_SIZE if config.ENABLE_IMAGE_CACHE else 0
+        max_bytes = config.IMAGE_CACHE_MAX_MB * 1024 * 1024 if config.ENABLE_IMAGE_CACHE else 0
+        self.cache = ImageCache(max_bytes)
+        self.validators: Dict[int, ImageValidators] = {}
+        
+        # Caché en disco para pintar el último fotograma conocido al arrancar
+        self.disk_cache: Optional[SnapshotDiskCache] = None
+        if config.ENABLE_SNAPSHOT_CACHE:
+            try:
+                self.disk_cache = SnapshotDiskCache()
+            except OSError:
+                logger.exception("No fue posible inicializar la caché de snapshots; se desactiva")
+        self.snapshot_pool = QThreadPool()
+        self.snapshot_pool.setMaxThreadCount(2)
+        self._snapshot_requested: Set[int] = set()
+        
+        # Tamaños a los que se escalan las imágenes en los hilos de trabajo:
+        # globales por vista (cuadrícula, lista) o propios de una cámara (detalle, flotante)
+        self._global_sizes: Dict[str, DisplaySize] = {}
+        self._camera_sizes: Dict[int, Dict[str, DisplaySize]] = {}
+        self._frames: Dict[int, int] = {}
+        self._pending_scales: Set[Tuple[int, DisplaySize]] = set()
+        
+        # Las descargas esperan en una cola propia acotada y pasan al pool
+        # solo cuando hay un hilo libre, para poder cancelarlas y medirlas
+        self.task_queue = ImageTaskQueue(config.IMAGE_QUEUE_MAX_SIZE)
+        self._running: Dict[int, ImageLoadTask] = {}
+        self.generation = 0
+        
+        # Presupuesto global de red: si se agota, la cola se reanuda con este timer
+        self.governor = get_rate_governor()
+        self._dispatch_timer = QTimer(self)
+        self._dispatch_timer.setSingleShot(True)
+        self._dispatch_timer.timeout.connect(self._dispatch)
+        
+        # Agrupación de peticiones: una sola descarga por cámara aunque varias
+        # vistas la pidan a la vez; el resultado llega a todas por las señales
+        self._completed_at: Dict[int, float] = {}
+        self.coalesced_requests = 0
+        self.fresh_hits = 0
+        
+        # Ritmo de actualización aprendido de cada cámara (refresco adaptativo)
+        self.cadence = RefreshCadence()
+        
+        # Salud de cámaras y servidores: las caídas se responden sin ir a la red
+        self.health = HealthTracker()
+        
+        # Con FETCH_ENGINE = "asyncio" la red la atiende un bucle asyncio y el
+        # pool solo decodifica; la señal devuelve cada resultado a este hilo
+        self.fetch_engine = get_fetch_engine()
+        self._fetch_done.connect(self._on_fetch_done)
+        
+        logger.info(
+            f"ImageLoader inicializado. Pool threads: {self.thread_pool.maxThreadCount()}, "
+            f"motor de descarga: {'asyncio' if self.fetch_engine else 'threads'}, "
+            f"caché: {config.IMAGE_CACHE_MAX_MB} MB"
+        )
+
+    def get_network_stats(self) -> dict:
+        """
+        Retorna las estadísticas del transporte HTTP compartido.
+        
+        Returns:
+            Diccionario con contadores de peticiones, estado de cada pool y
+            peticiones ahorradas por agrupación
+        """
+        stats = get_http_client().get_stats()
+        stats.update({
+            "in_flight": len(self.task_queue) + len(self._running),
+            "coalesced_requests": self.coalesced_requests,
+            "fresh_hits": self.fresh_hits,
+            "engine": "asyncio" if self.fetch_engine else "threads",
+            "governor": self.governor.get_stats(),
+        })
+        if self.fetch_engine:
+            stats["async"] = self.fetch_engine.get_stats()
+        return stats
+    
+    def get_rate_stats(self) -> dict:
+        """
+        Retorna el uso del presupuesto global de red.
+        
+        Returns:
+            Diccionario con límites, ritmo medido, utilización y peticiones
+            concedidas/aplazadas por clase de tráfico
+        """
+        return self.governor.get_stats()
+    
+    def set_target_size(self, owner: str, size: DisplaySize, camera_id: Optional[int] = None):
+        """
+        Registra el tamaño al que una vista muestra las imágenes.
+        
+        Las siguientes descargas se escalarán a ese tamaño en el hilo de trabajo.
+        
+        Args:
+            owner: Identificador de la vista (ej: "cuadricula", "detalle")
+            size: Tupla (ancho, alto) del área de la imagen
+            camera_id: Cámara concreta, o None si aplica a todas
+        """
+        size = (int(size[0]), int(size[1]))
+        if camera_id is None:
+            self._global_sizes[owner] = size
+        else:
+            self._camera_sizes.setdefault(camera_id, {})[owner] = size
+    
+    def clear_target_size(self, owner: str, camera_id: Optional[int] = None):
+        """
+        Elimina el tamaño registrado por una vista.
+        
+        Args:
+            owner: Identificador de la vista
+            camera_id: Cámara concreta, o None para el tamaño global
+        """
+        if camera_id is None:
+            self._global_sizes.pop(owner, None)
+            return
+        
+        sizes = self._camera_sizes.get(camera_id)
+        if sizes:
+            sizes.pop(owner, None)
+            if not sizes:
+                del self._camera_sizes[camera_id]
+    
+    def get_target_sizes(self, camera_id: int) -> Tuple[DisplaySize, ...]:
+        """
+        Retorna los tamaños a los que se escalan las imágenes de una cámara.
+        
+        Args:
+            camera_id: ID de la cámara
+            
+        Returns:
+            Tupla de tamaños sin repetidos
+        """
+        sizes = set(self._global_sizes.values())
+        sizes.update(self._camera_sizes.get(camera_id, {}).values())
+        return tuple(sizes)
+    
+    def get_scaled_pixmap(self, camera_id: int, size: DisplaySize) -> Optional[QPixmap]:
+        """
+        Obtiene la imagen de una cámara escalada a un tamaño de vista.
+        
+        Si la variante no existe pero la imagen completa está en caché, se
+        encarga su escalado en segundo plano y se emitirá image_scaled.
+        
+        Args:
+            camera_id: ID de la cámara
+            size: Tupla (ancho, alto) del área de la imagen
+            
+        Returns:
+            QPixmap escalado, o None si todavía no está disponible
+        """
+        size = (int(size[0]), int(size[1]))
+        scaled = self.cache.get_scaled(camera_id, size)
+        if scaled is not None:
+            return scaled
         
-        logger.info(f"ImageLoader inicializado. Pool threads: {self.thread_pool.maxThreadCount()}")
+        pixmap = self.cache.peek(camera_id)
+        if pixmap is not None and size[0] > 0 and size[1] > 0 and (camera_id, size) not in self._pending_scales:
+            self._pending_scales.add((camera_id, size))
+            task = ScaleTask(camera_id, self._frames.get(camera_id, 0), pixmap.toImage(), size)
+            task.signals.finished.connect(self._on_image_scaled)
+            self.thread_pool.start(task)
+        return None
     
-    def load_image(self, camera_id: int, image_url: str, force_reload: bool = False):
+    def load_image(
+        self,
+        camera_id: int,
+        image_url: str,
+        force_reload: bool = False,
+        priority: int = PRIORITY_VISIBLE
+    ):
         """
         Carga una imagen de forma asíncrona.
         
@@ -167,6 +629,7 @@ class ImageLoader(QObject):
             camera_id: ID de la cámara
             image_url: URL de la imagen
             force_reload: Si True, ignora la caché y recarga
+            priority: Prioridad en la cola del pool (PRIORITY_*)
         """
         logger.debug(f"load_image() llamado para cámara {camera_id}")
         logger.debug(f"  URL: {image_url}")
@@ -174,51 +637,434 @@ class ImageLoader(QObject):
         logger.debug(f"  En caché: {camera_id in self.cache}")
         
         # Verificar caché si no es recarga forzada
-        if not force_reload and camera_id in self.cache:
+        cached = None if force_reload else self.cache.get(camera_id)
+        if cached is not None:
             logger.debug(f"Imagen {camera_id} obtenida desde caché")
-            self.image_loaded.emit(camera_id, self.cache[camera_id])
+            self.image_loaded.emit(camera_id, cached)
+            return
+        
+        # Ya hay una descarga en curso: su resultado llegará a todas las vistas
+        if camera_id in self._running:
+            self.coalesced_requests += 1
+            logger.debug(f"Imagen {camera_id} ya en descarga, se agrupa la petición")
+            return
+        queued = self.task_queue.get(camera_id)
+        if queued is not None:
+            self.coalesced_requests += 1
+            logger.debug(f"Imagen {camera_id} ya en cola, se agrupa la petición")
+            # Sigue esperando: hereda la mayor prioridad y la generación actual
+            queued.priority = max(queued.priority, priority)
+            queued.generation = self.generation
+            queued.force_reload = queued.force_reload and force_reload
+            return
+        
+        # Recarga demasiado próxima a la anterior: se reutiliza la imagen recién recibida
+        if force_reload and self._is_fresh(camera_id):
+            pixmap = self.cache.peek(camera_id)
+            if pixmap is not None:
+                self.fresh_hits += 1
+                logger.debug(f"Imagen {camera_id} recién descargada, se reutiliza")
+                self.image_loaded.emit(camera_id, pixmap)
+                return
+        
+        # Pintar el último fotograma guardado en disco mientras llega el de red
+        if self.disk_cache and camera_id not in self.cache and camera_id not in self._snapshot_requested:
+            self._snapshot_requested.add(camera_id)
+            snapshot_task = SnapshotLoadTask(
+                camera_id, image_url, self.disk_cache, self.get_target_sizes(camera_id)
+            )
+            snapshot_task.signals.loaded.connect(self._on_snapshot_loaded)
+            self.snapshot_pool.start(snapshot_task)
+        
+        # Cámara o servidor caídos: se responde con el estado sin conexión hasta la siguiente prueba
+        if not self.health.allow(camera_id, image_url):
+            retry_in = self.health.retry_in(camera_id, image_url)
+            logger.debug(f"Cámara {camera_id} sin conexión, siguiente prueba en {retry_in:.0f}s")
+            self.image_error.emit(camera_id, f"Sin conexión (reintento en {retry_in:.0f}s)")
             return
         
+        # Solo se pide de forma condicional si hay una imagen en caché que conservar
+        validators = self.validators.get(camera_id) if camera_id in self.cache else None
+        
         # Crear tarea de carga
-        logger.debug(f"Creando ImageLoadTask para cámara {camera_id}")
-        task = ImageLoadTask(camera_id, image_url)
+        logger.debug(f"Creando ImageLoadTask para cámara {camera_id} (condicional: {validators is not None})")
+        task = ImageLoadTask(
+            camera_id, image_url, validators, self.disk_cache, self.get_target_sizes(camera_id), force_reload
+        )
         task.signals.finished.connect(self._on_image_loaded)
+        task.signals.unchanged.connect(self._on_image_unchanged)
         task.signals.error.connect(self._on_image_error)
+        task.priority = priority
+        task.generation = self.generation
         
-        # Ejecutar en el pool de threads
-        logger.debug(f"Añadiendo tarea al thread pool (active: {self.thread_pool.activeThreadCount()})")
-        self.thread_pool.start(task)
+        # Encolar y pasar al pool si hay hilos libres
+        for dropped in self.task_queue.push(task):
+            logger.debug(f"Descarga de cámara {dropped.camera_id} descartada (cola llena)")
+            self.health.release_probe(dropped.camera_id, dropped.image_url)
+        self._dispatch()
     
-    def _on_image_loaded(self, camera_id: int, pixmap: QPixmap):
+    def _dispatch(self):
         """
-        Callback cuando una imagen se carga correctamente.
+        Pasa tareas de la cola al pool (o al motor asíncrono) mientras haya hueco.
+        """
+        max_running = self.fetch_engine.concurrency if self.fetch_engine else self.thread_pool.maxThreadCount()
+        while len(self._running) < max_running and len(self.task_queue):
+            # Lo visible gasta el presupuesto entero; la precarga deja reserva
+            traffic = TRAFFIC_LIVE if self.task_queue.peek().priority >= PRIORITY_VISIBLE else TRAFFIC_BACKGROUND
+            if not self.governor.try_acquire(traffic):
+                if not self._dispatch_timer.isActive():
+                    self._dispatch_timer.start(max(1, int(self.governor.wait_time(traffic) * 1000)))
+                break
+            task = self.task_queue.pop()
+            self._running[task.camera_id] = task
+            if self.fetch_engine:
+                logger.debug(f"Descarga asíncrona de cámara {task.camera_id} (en curso: {len(self._running)})")
+                self.fetch_engine.submit(
+                    task.image_url,
+                    headers=task.request_headers(),
+                    timeout=config.IMAGE_TIMEOUT,
+                    callback=lambda result, task=task: self._fetch_done.emit(task, result),
+                )
+            else:
+                logger.debug(f"Añadiendo tarea al thread pool (active: {self.thread_pool.activeThreadCount()})")
+                self.thread_pool.start(task, task.priority)
+    
+    def _on_fetch_done(self, task: ImageLoadTask, result: FetchResult):
+        """
+        Callback cuando el motor asíncrono termina una descarga.
+        
+        La decodificación y el escalado siguen haciéndose en el pool.
+        
+        Args:
+            task: Tarea de la descarga
+            result: Respuesta recibida
+        """
+        task.prefetched = result
+        self.thread_pool.start(task, task.priority)
+    
+    def next_generation(self) -> int:
+        """
+        Abre una nueva generación de peticiones y cancela las anteriores en cola.
+        
+        Se usa cuando cambia lo que se muestra (filtro, vista): las descargas
+        que aún no empezaron ya no interesan. Las de prioridad PRIORITY_LIVE
+        (detalle, ventanas flotantes) se conservan.
+        
+        Returns:
+            Número de la nueva generación
+        """
+        self.generation += 1
+        current = self.generation
+        cancelled = self.task_queue.remove_where(
+            lambda task: task.generation < current and task.priority < PRIORITY_LIVE
+        )
+        for task in cancelled:
+            self.health.release_probe(task.camera_id, task.image_url)
+        if cancelled:
+            logger.debug(f"Generación {current}: canceladas {len(cancelled)} descargas en cola")
+        return current
+    
+    def get_queue_stats(self) -> dict:
+        """
+        Retorna las métricas de la cola de descargas.
+        
+        Returns:
+            Diccionario con profundidad, descartes, cancelaciones, esperas y
+            descargas en ejecución
+        """
+        stats = self.task_queue.get_stats()
+        stats["running"] = len(self._running)
+        stats["generation"] = self.generation
+        return stats
+    
+    def cancel(self, camera_id: int, max_priority: int = PRIORITY_VISIBLE) -> bool:
+        """
+        Cancela la descarga de una cámara si todavía no ha empezado.
+        
+        Las descargas que otra vista pidió con más prioridad (ej: detalle)
+        no se cancelan.
+        
+        Args:
+            camera_id: ID de la cámara
+            max_priority: Prioridad máxima de las tareas que se pueden cancelar
+            
+        Returns:
+            True si la tarea se retiró de la cola
+        """
+        task = self.task_queue.get(camera_id)
+        if task is None or task.priority > max_priority:
+            return False
+        
+        self.task_queue.remove(camera_id)
+        self.health.release_probe(camera_id, task.image_url)
+        logger.debug(f"Descarga de cámara {camera_id} cancelada")
+        return True
+    
+    def refresh_delay(self, camera_id: int, interval: float) -> float:
+        """
+        Segundos que faltan para que toque refrescar una cámara.
+        
+        Con ADAPTIVE_REFRESH desactivado solo se respeta el intervalo pedido.
+        
+        Args:
+            camera_id: ID de la cámara
+            interval: Intervalo de refresco elegido por la vista (segundos)
+            
+        Returns:
+            0 si ya toca refrescar, o los segundos restantes
+        """
+        if not config.ADAPTIVE_REFRESH:
+            return 0.0
+        return self.cadence.delay(camera_id, interval)
+    
+    def is_refresh_due(self, camera_id: int, interval: float) -> bool:
+        """
+        Indica si toca refrescar una cámara (cuenta los refrescos ahorrados).
+        
+        Args:
+            camera_id: ID de la cámara
+            interval: Intervalo de refresco elegido por la vista (segundos)
+        """
+        if not config.ADAPTIVE_REFRESH:
+            return True
+        return self.cadence.is_due(camera_id, interval)
+    
+    def get_cadence_stats(self) -> dict:
+        """
+        Retorna lo aprendido sobre el ritmo de actualización de las cámaras.
+        
+        Returns:
+            Diccionario con cámaras seguidas, intervalos estimados y refrescos ahorrados
+        """
+        return self.cadence.get_stats()
+    
+    def get_camera_health(self, camera_id: int, image_url: str = "") -> dict:
+        """
+        Retorna el estado de salud de una cámara.
+        
+        Args:
+            camera_id: ID de la cámara
+            image_url: URL de la imagen, para incluir el estado del servidor
+            
+        Returns:
+            Diccionario con estado del circuito, fallos seguidos, último error y espera restante
+        """
+        return self.health.get_camera_health(camera_id, image_url)
+    
+    def get_health_stats(self) -> dict:
+        """
+        Retorna el resumen de cámaras y servidores caídos.
+        
+        Returns:
+            Diccionario con circuitos abiertos, peticiones evitadas y pruebas
+        """
+        return self.health.get_stats()
+    
+    def is_pending(self, camera_id: int) -> bool:
+        """Indica si hay una descarga en cola o en curso para la cámara."""
+        return camera_id in self._running or camera_id in self.task_queue
+    
+    def _is_fresh(self, camera_id: int) -> bool:
+        """
+        Indica si la última descarga de una cámara terminó dentro de la ventana de frescura.
         
         Args:
             camera_id: ID de la cámara
-            pixmap: Imagen cargada
         """
-        # Añadir a caché
-        if self.max_cache_size > 0:
-            if len(self.cache) >= self.max_cache_size:
-                # Eliminar el primer elemento (FIFO simple)
-                first_key = next(iter(self.cache))
-                del self.cache[first_key]
+        completed_at = self._completed_at.get(camera_id)
+        if completed_at is None:
+            return False
+        return (time.monotonic() - completed_at) * 1000 < config.IMAGE_FRESHNESS_WINDOW_MS
+    
+    def _finish_request(self, camera_id: int):
+        """
+        Marca como terminada con éxito la descarga en curso de una cámara.
+        
+        Args:
+            camera_id: ID de la cámara
+        """
+        task = self._running.pop(camera_id, None)
+        if task is not None:
+            self.health.record_success(camera_id, task.image_url)
+        self._completed_at[camera_id] = time.monotonic()
+        self._dispatch()
+    
+    def _store_frame(
+        self,
+        camera_id: int,
+        qimage: QImage,
+        scaled: Dict[DisplaySize, QImage]
+    ) -> QPixmap:
+        """
+        Guarda en caché un fotograma nuevo junto a sus variantes escaladas.
+        
+        Args:
+            camera_id: ID de la cámara
+            qimage: Imagen a resolución completa
+            scaled: Variantes escaladas en el hilo de trabajo
             
-            self.cache[camera_id] = pixmap
+        Returns:
+            QPixmap de la imagen completa
+        """
+        self._frames[camera_id] = self._frames.get(camera_id, 0) + 1
+        pixmap = QPixmap.fromImage(qimage)
+        
+        # Añadir a caché (la política LRU y el presupuesto los aplica ImageCache)
+        self.cache.put(camera_id, pixmap)
+        for size, image in scaled.items():
+            self.cache.put_scaled(camera_id, size, QPixmap.fromImage(image))
+        return pixmap
+    
+    def _on_image_loaded(
+        self,
+        camera_id: int,
+        qimage: QImage,
+        scaled: Dict[DisplaySize, QImage],
+        validators: ImageValidators
+    ):
+        """
+        Callback cuando una imagen se carga correctamente.
+        
+        Args:
+            camera_id: ID de la cámara
+            qimage: Imagen decodificada
+            scaled: Variantes escaladas a los tamaños de las vistas
+            validators: Validadores HTTP de la imagen recibida
+        """
+        self._finish_request(camera_id)
+        self.cadence.record(camera_id, changed=True)
+        self.validators[camera_id] = validators
+        pixmap = self._store_frame(camera_id, qimage, scaled)
         
         # Emitir señal
         self.image_loaded.emit(camera_id, pixmap)
     
-    def _on_image_error(self, camera_id: int, error_msg: str):
+    def _on_snapshot_loaded(
+        self,
+        camera_id: int,
+        qimage: QImage,
+        scaled: Dict[DisplaySize, QImage],
+        validators: ImageValidators
+    ):
+        """
+        Callback cuando se recupera de disco el último fotograma de una cámara.
+        
+        Args:
+            camera_id: ID de la cámara
+            qimage: Imagen decodificada
+            scaled: Variantes escaladas a los tamaños de las vistas
+            validators: Validadores guardados junto al fotograma
+        """
+        if camera_id in self.cache:
+            # La descarga de red llegó antes: el fotograma de disco ya no aporta nada
+            return
+        
+        pixmap = self._store_frame(camera_id, qimage, scaled)
+        self.validators.setdefault(camera_id, validators)
+        self.image_loaded.emit(camera_id, pixmap)
+    
+    def _on_image_scaled(self, camera_id: int, frame: int, size: DisplaySize, qimage: QImage):
+        """
+        Callback cuando termina un escalado bajo demanda.
+        
+        Args:
+            camera_id: ID de la cámara
+            frame: Fotograma del que se partió
+            size: Tamaño de destino
+            qimage: Imagen escalada
+        """
+        self._pending_scales.discard((camera_id, size))
+        if camera_id not in self.cache:
+            return
+        if frame != self._frames.get(camera_id, 0):
+            # Llegó un fotograma más reciente mientras se escalaba: se escala el nuevo
+            self.get_scaled_pixmap(camera_id, size)
+            return
+        
+        pixmap = QPixmap.fromImage(qimage)
+        self.cache.put_scaled(camera_id, size, pixmap)
+        self.image_scaled.emit(camera_id, size, pixmap)
+    
+    def _on_image_unchanged(self, camera_id: int, validators: ImageValidators):
+        """
+        Callback cuando el servidor confirma que la imagen no ha cambiado.
+        
+        Args:
+            camera_id: ID de la cámara
+            validators: Validadores vigentes de la imagen
+        """
+        self._finish_request(camera_id)
+        self.cadence.record(camera_id, changed=False)
+        self.validators[camera_id] = validators
+        self.image_unchanged.emit(camera_id)
+    
+    def _on_image_error(self, camera_id: int, error_msg: str, connection_error: bool = False):
         """
         Callback cuando falla la carga de una imagen.
         
         Args:
             camera_id: ID de la cámara
             error_msg: Mensaje de error
+            connection_error: True si el fallo fue de red (timeout, conexión)
         """
+        # Los errores no abren ventana de frescura: la siguiente petición
+        # reintenta, salvo que el circuito de la cámara llegue a abrirse
+        task = self._running.pop(camera_id, None)
+        if task is not None:
+            self.health.record_failure(camera_id, task.image_url, error_msg, connection_error)
+        self._dispatch()
         self.image_error.emit(camera_id, error_msg)
     
+    def get_cached_image(self, camera_id: int) -> Optional[QPixmap]:
+        """
+        Retorna la última imagen en caché de una cámara sin lanzar descargas.
+        
+        Args:
+            camera_id: ID de la cámara
+            
+        Returns:
+            QPixmap en caché o None si no existe
+        """
+        return self.cache.peek(camera_id)
+    
+    def pin_image(self, camera_id: int, owner: str):
+        """
+        Fija la imagen de una cámara en caché mientras una vista la necesite.
+        
+        Args:
+            camera_id: ID de la cámara
+            owner: Identificador de la vista (ej: "favoritos", "flotante")
+        """
+        self.cache.pin(camera_id, owner)
+    
+    def unpin_image(self, camera_id: int, owner: str):
+        """
+        Libera el fijado de una vista sobre la imagen de una cámara.
+        
+        Args:
+            camera_id: ID de la cámara
+            owner: Identificador de la vista
+        """
+        self.cache.unpin(camera_id, owner)
+    
+    def unpin_owner(self, owner: str):
+        """
+        Libera todas las imágenes fijadas por una vista.
+        
+        Args:
+            owner: Identificador de la vista
+        """
+        self.cache.unpin_owner(owner)
+    
+    def get_cache_stats(self) -> dict:
+        """
+        Retorna los contadores de la caché en memoria.
+        
+        Returns:
+            Diccionario con aciertos, fallos, expulsiones y bytes ocupados
+        """
+        return self.cache.get_stats()
+    
     def clear_cache(self):
         """
         Limpia la caché de imágenes.
@@ -226,6 +1072,13 @@ class ImageLoader(QObject):
         self.cache.clear()
         logger.info("Caché de imágenes limpiada")
     
+    def shutdown(self):
+        """
+        Persiste el estado pendiente antes de cerrar la aplicación.
+        """
+        if self.disk_cache:
+            self.disk_cache.flush()
+    
     def get_cache_size(self) -> int:
         """
         Retorna el tamaño actual de la caché.
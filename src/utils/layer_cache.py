@@ -0,0 +1,306 @@
+"""Caché en disco de las capas GeoJSON del mapa.
+
+Cada URL de capa se guarda tal cual llega (un fichero por URL) junto con sus
+validadores HTTP (ETag y Last-Modified) en un índice JSON. Mientras la copia
+no supera el TTL de su capa se usa sin tocar la red; al caducar se revalida
+con una petición condicional (304 = se sigue usando la copia) y, si el
+servidor no responde, se usa la última copia buena aunque esté caducada.
+También anota cuánto tardó la última descarga y el parseo de cada capa, y
+la versión de cada copia (su ETag o, si no tiene, un hash del contenido).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import config
+from src.utils.async_fetcher import FetchError, fetch_url
+from src.utils.preferences import app_data_dir
+
+
+logger = logging.getLogger(__name__)
+
+# Origen de los datos devueltos por LayerCache.fetch
+SOURCE_CACHE = "caché"  # Copia vigente, sin petición
+SOURCE_REVALIDATED = "revalidada"  # Copia confirmada por el servidor (304)
+SOURCE_NETWORK = "red"  # Descarga completa
+SOURCE_STALE = "copia sin conexión"  # Copia caducada usada porque la descarga falló
+
+
+@dataclass
+class LayerFetch:
+    """
+    Datos de una capa y cómo se obtuvieron.
+
+    Atributos:
+        url: URL de la capa
+        data: JSON ya parseado
+        source: Origen (SOURCE_CACHE, SOURCE_REVALIDATED, SOURCE_NETWORK o SOURCE_STALE)
+        download_time: Segundos de la petición HTTP (0 si no hubo)
+        parse_time: Segundos de lectura y parseo del JSON
+        size: Bytes del GeoJSON
+        age: Segundos desde que se descargó el contenido
+        version: ETag de la copia o hash de su contenido
+    """
+
+    url: str
+    data: Any
+    source: str
+    download_time: float = 0.0
+    parse_time: float = 0.0
+    size: int = 0
+    age: float = 0.0
+    version: str = ""
+
+
+def content_version(etag: Optional[str], content: bytes) -> str:
+    """
+    Versión de los datos de una capa.
+
+    Args:
+        etag: Cabecera ETag de la respuesta (si la hay)
+        content: Contenido descargado
+
+    Returns:
+        El ETag o, sin él, un hash del contenido
+    """
+    return etag or f"sha1:{hashlib.sha1(content).hexdigest()}"
+
+
+class LayerCache:
+    """Copias en disco de las capas del mapa con TTL por capa y revalidación condicional."""
+
+    INDEX_FILE_NAME = "index.json"
+
+    def __init__(self, base_dir: Path | None = None) -> None:
+        self._base_dir = base_dir or (app_data_dir() / config.MAP_LAYER_CACHE_DIR_NAME)
+        self._index_path = self._base_dir / self.INDEX_FILE_NAME
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict] = {}
+        self._stats: Dict[str, Dict] = {}
+
+        self._base_dir.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    @property
+    def base_dir(self) -> Path:
+        """Directorio raíz de la caché."""
+        return self._base_dir
+
+    def fresh_version(self, url: str, ttl_seconds: float) -> Optional[str]:
+        """Versión de la copia guardada si sigue vigente, sin leerla.
+
+        Args:
+            url: URL del GeoJSON
+            ttl_seconds: Segundos durante los que la copia se usa sin revalidar
+
+        Returns:
+            Versión de la copia o None si no hay copia vigente
+        """
+        with self._lock:
+            entry = self._index.get(url) or {}
+        if (
+            entry.get("version")
+            and time.time() - entry.get("checked_at", 0) < ttl_seconds
+            and self._object_path(url).exists()
+        ):
+            return entry["version"]
+        return None
+
+    def fetch(self, url: str, ttl_seconds: float, timeout: Optional[float] = None) -> LayerFetch:
+        """Obtiene una capa de la caché o de la red.
+
+        Args:
+            url: URL del GeoJSON
+            ttl_seconds: Segundos durante los que la copia se usa sin revalidar
+            timeout: Timeout de la descarga en segundos
+
+        Returns:
+            LayerFetch con el JSON parseado
+
+        Raises:
+            FetchError: Si la descarga falla y no hay copia guardada
+        """
+        with self._lock:
+            entry = dict(self._index.get(url) or {})
+        path = self._object_path(url)
+        if entry and not path.exists():
+            entry = {}
+
+        if entry and time.time() - entry.get("checked_at", 0) < ttl_seconds:
+            try:
+                return self._record(self._read(url, entry, SOURCE_CACHE))
+            except FetchError as e:
+                logger.warning(str(e))
+                entry = {}
+
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = fetch_url(url, headers=headers or None, timeout=timeout)
+
+        if entry and response.status == 304:
+            entry["checked_at"] = time.time()
+            self._update_entry(url, entry)
+            fetched = self._read(url, entry, SOURCE_REVALIDATED)
+            fetched.download_time = response.elapsed
+            return self._record(fetched)
+
+        try:
+            response.raise_for_status()
+            started = time.perf_counter()
+            data = response.json()
+            parse_time = time.perf_counter() - started
+        except (FetchError, ValueError) as e:
+            if not entry:
+                raise FetchError(str(e)) from e
+            logger.warning(f"Capa {url} no disponible ({e}); se usa la última copia guardada")
+            fetched = self._read(url, entry, SOURCE_STALE)
+            fetched.download_time = response.elapsed
+            return self._record(fetched)
+
+        now = time.time()
+        version = content_version(response.headers.get("ETag"), response.content)
+        self._write(path, response.content)
+        self._update_entry(url, {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "version": version,
+            "downloaded_at": now,
+            "checked_at": now,
+            "size": len(response.content),
+        })
+        return self._record(LayerFetch(
+            url=url,
+            data=data,
+            source=SOURCE_NETWORK,
+            download_time=response.elapsed,
+            parse_time=parse_time,
+            size=len(response.content),
+            version=version,
+        ))
+
+    def clear(self) -> None:
+        """Elimina todas las capas guardadas."""
+        with self._lock:
+            urls = list(self._index)
+            self._index.clear()
+            self._stats.clear()
+        for url in urls:
+            self._object_path(url).unlink(missing_ok=True)
+        self._flush()
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Retorna, por URL, el origen, tamaño y tiempos de la última obtención.
+
+        Returns:
+            Diccionario URL -> {source, size, download_time, parse_time, age}
+        """
+        with self._lock:
+            return {url: dict(stats) for url, stats in self._stats.items()}
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+
+    def _object_path(self, url: str) -> Path:
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:20]
+        return self._base_dir / f"{digest}.json"
+
+    def _read(self, url: str, entry: Dict, source: str) -> LayerFetch:
+        """Lee y parsea la copia guardada de una URL."""
+        started = time.perf_counter()
+        try:
+            content = self._object_path(url).read_bytes()
+            data = json.loads(content)
+        except (OSError, ValueError) as e:
+            with self._lock:
+                self._index.pop(url, None)
+            self._flush()
+            raise FetchError(f"Copia local de {url} ilegible: {e}") from e
+        return LayerFetch(
+            url=url,
+            data=data,
+            source=source,
+            parse_time=time.perf_counter() - started,
+            size=len(content),
+            age=time.time() - entry.get("downloaded_at", time.time()),
+            version=entry.get("version") or content_version(entry.get("etag"), content),
+        )
+
+    def _record(self, fetched: LayerFetch) -> LayerFetch:
+        with self._lock:
+            self._stats[fetched.url] = {
+                "source": fetched.source,
+                "size": fetched.size,
+                "download_time": fetched.download_time,
+                "parse_time": fetched.parse_time,
+                "age": fetched.age,
+            }
+        return fetched
+
+    def _write(self, path: Path, content: bytes) -> None:
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            tmp_path.write_bytes(content)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            logger.warning("No se pudo guardar la capa %s: %s", path, exc)
+
+    def _update_entry(self, url: str, entry: Dict) -> None:
+        with self._lock:
+            self._index[url] = entry
+        self._flush()
+
+    def _flush(self) -> None:
+        """Escribe el índice (pequeño: una entrada por capa)."""
+        with self._lock:
+            payload = json.dumps(self._index, ensure_ascii=True)
+            tmp_path = self._index_path.with_suffix(".tmp")
+            try:
+                tmp_path.write_text(payload, encoding="utf-8")
+                os.replace(tmp_path, self._index_path)
+            except OSError as exc:
+                logger.error("No se pudo guardar el índice de capas %s: %s", self._index_path, exc)
+
+    def _load_index(self) -> None:
+        if not self._index_path.exists():
+            return
+        try:
+            data = json.loads(self._index_path.read_text(encoding="utf-8"))
+        except (json.JSONDecodeError, OSError) as exc:
+            logger.warning("Índice de capas corrupto, se reinicia %s: %s", self._index_path, exc)
+            return
+        if isinstance(data, dict):
+            self._index = {url: entry for url, entry in data.items() if isinstance(entry, dict)}
+
+
+# Instancia global de la caché
+_layer_cache: Optional[LayerCache] = None
+_layer_cache_lock = threading.Lock()
+
+
+def get_layer_cache() -> LayerCache:
+    """
+    Obtiene la instancia global de la caché de capas.
+
+    Returns:
+        Instancia de LayerCache
+    """
+    global _layer_cache
+    if _layer_cache is None:
+        with _layer_cache_lock:
+            if _layer_cache is None:
+                _layer_cache = LayerCache()
+    return _layer_cache
@@ -0,0 +1,264 @@
+"""
+Fragmentos del mapa guardados entre generaciones.
+
+El mapa se compone de fragmentos independientes (el cluster de cámaras y
+cada capa superpuesta). Cada uno se renderiza una vez a sus trozos de
+cabecera, HTML y script y se guarda junto a la huella de sus entradas
+(cámaras incluidas, versión de los datos de la capa, opciones). Al
+regenerar el mapa (por ejemplo, tras cambiar el filtro de distrito) solo se
+vuelven a construir los fragmentos cuya huella cambió; el resto se vuelve a
+insertar en la página tal cual.
+
+Para que un fragmento renderizado sirva en otro mapa, todos los mapas usan
+el mismo nombre de variable JavaScript (MAP_ELEMENT_ID).
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+import hashlib
+import json
+import threading
+
+import folium
+from branca.element import Element
+from folium.map import Layer
+
+import config
+from src.models.camera import Camera
+
+
+# Identificador fijo del folium.Map (variable "map_malaga" en la página)
+MAP_ELEMENT_ID = "malaga"
+
+# Origen de una capa en el resumen cuando se reutiliza su fragmento
+SOURCE_FRAGMENT = "sin cambios"
+
+
+@dataclass
+class MapFragment:
+    """
+    Fragmento del mapa ya renderizado.
+
+    Atributos:
+        key: Nombre del fragmento ('cameras' o el nombre de la capa)
+        fingerprint: Huella de las entradas con las que se construyó
+        element_name: Variable JavaScript del elemento
+        layer_name: Nombre en el control de capas
+        overlay: Si es una capa superpuesta
+        control: Si aparece en el control de capas
+        show: Si está visible al abrir el mapa
+        header: Trozos (nombre, texto) de la cabecera de la página
+        html: Trozos (nombre, texto) del cuerpo
+        script: Trozos (nombre, texto) del script
+        input_size: Bytes de los datos de entrada (GeoJSON), 0 si no aplica
+    """
+
+    key: str
+    fingerprint: str
+    element_name: str
+    layer_name: str
+    overlay: bool
+    control: bool
+    show: bool
+    header: List[Tuple[str, str]] = field(default_factory=list)
+    html: List[Tuple[str, str]] = field(default_factory=list)
+    script: List[Tuple[str, str]] = field(default_factory=list)
+    input_size: int = 0
+
+    @property
+    def size(self) -> int:
+        """Bytes que el fragmento ocupa en la página."""
+        return sum(len(text.encode("utf-8")) for _, text in self.header + self.html + self.script)
+
+
+class _RawElement(Element):
+    """Elemento que se renderiza como un texto ya generado."""
+
+    def __init__(self, text: str):
+        super().__init__()
+        self.text = text
+
+    def render(self, **kwargs) -> str:
+        return self.text
+
+
+class CachedFragment(Layer):
+    """
+    Capa que reinserta en la página un fragmento ya renderizado.
+
+    Es una Layer con el mismo nombre de variable y las mismas opciones que
+    el elemento original, de modo que LayerControl la lista igual.
+    """
+
+    def __init__(self, fragment: MapFragment):
+        """
+        Inicializa la capa.
+
+        Args:
+            fragment: Fragmento renderizado
+        """
+        super().__init__(
+            name=fragment.layer_name,
+            overlay=fragment.overlay,
+            control=fragment.control,
+            show=fragment.show,
+        )
+        self.fragment = fragment
+
+    def get_name(self) -> str:
+        return self.fragment.element_name
+
+    def render(self, **kwargs):
+        figure = self.get_root()
+        for section, parts in (
+            (figure.header, self.fragment.header),
+            (figure.html, self.fragment.html),
+            (figure.script, self.fragment.script),
+        ):
+            for name, text in parts:
+                section.add_child(_RawElement(text), name=name)
+
+
+def fingerprint(*parts) -> str:
+    """
+    Calcula la huella de las entradas de un fragmento.
+
+    Args:
+        *parts: Valores serializables a JSON (los demás se convierten con str)
+
+    Returns:
+        Huella hexadecimal
+    """
+    payload = json.dumps(parts, default=str, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def camera_fingerprint(cameras: Iterable[Camera]) -> str:
+    """
+    Huella del subconjunto de cámaras de un mapa.
+
+    Cambia si entra o sale una cámara o si cambia cualquier dato que se
+    muestra de ella.
+
+    Args:
+        cameras: Cámaras del mapa
+
+    Returns:
+        Huella hexadecimal
+    """
+    digest = hashlib.sha1()
+    for camera in cameras:
+        row = (
+            camera.id, camera.nombre, camera.direccion, camera.url_imagen,
+            camera.url, camera.acceso, camera.distrito, camera.latlon,
+        )
+        digest.update(repr(row).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def render_fragment(key: str, fingerprint: str, element: Layer, input_size: int = 0) -> MapFragment:
+    """
+    Renderiza un elemento del mapa a un fragmento reutilizable.
+
+    El elemento se renderiza dentro de un mapa auxiliar con el nombre fijo
+    MAP_ELEMENT_ID y se recogen los trozos que añade a la página.
+
+    Args:
+        key: Nombre del fragmento
+        fingerprint: Huella de sus entradas
+        element: Capa a renderizar (FeatureGroup, MarkerCluster...)
+        input_size: Bytes de los datos de entrada
+
+    Returns:
+        MapFragment con los trozos de cabecera, HTML y script
+    """
+    host = folium.Map(
+        location=[config.MAP_CENTER_LAT, config.MAP_CENTER_LON],
+        zoom_start=config.MAP_DEFAULT_ZOOM,
+        tiles=None,
+    )
+    host._id = MAP_ELEMENT_ID
+    figure = host.get_root()
+    sections = (figure.header, figure.html, figure.script)
+    before = [set(section._children) for section in sections]
+
+    element.add_to(host)
+    element.render()
+
+    header, html, script = (
+        [(name, child.render()) for name, child in section._children.items() if name not in known]
+        for section, known in zip(sections, before)
+    )
+    return MapFragment(
+        key=key,
+        fingerprint=fingerprint,
+        element_name=element.get_name(),
+        layer_name=element.layer_name,
+        overlay=element.overlay,
+        control=element.control,
+        show=element.show,
+        header=header,
+        html=html,
+        script=script,
+        input_size=input_size,
+    )
+
+
+class MapFragmentCache:
+    """Último fragmento renderizado de cada parte del mapa, en memoria."""
+
+    def __init__(self):
+        self._fragments: Dict[str, MapFragment] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, fingerprint: str) -> Optional[MapFragment]:
+        """
+        Obtiene un fragmento si se construyó con las mismas entradas.
+
+        Args:
+            key: Nombre del fragmento
+            fingerprint: Huella de las entradas actuales
+
+        Returns:
+            MapFragment o None si no está o su huella es otra
+        """
+        with self._lock:
+            fragment = self._fragments.get(key)
+        if fragment is not None and fragment.fingerprint == fingerprint:
+            return fragment
+        return None
+
+    def put(self, fragment: MapFragment) -> None:
+        """
+        Guarda un fragmento, sustituyendo al anterior con el mismo nombre.
+
+        Args:
+            fragment: Fragmento renderizado
+        """
+        with self._lock:
+            self._fragments[fragment.key] = fragment
+
+    def clear(self) -> None:
+        """Descarta todos los fragmentos."""
+        with self._lock:
+            self._fragments.clear()
+
+
+# Instancia global de la caché de fragmentos
+_map_fragment_cache: Optional[MapFragmentCache] = None
+_map_fragment_cache_lock = threading.Lock()
+
+
+def get_map_fragment_cache() -> MapFragmentCache:
+    """
+    Obtiene la instancia global de la caché de fragmentos del mapa.
+
+    Returns:
+        Instancia de MapFragmentCache
+    """
+    global _map_fragment_cache
+    if _map_fragment_cache is None:
+        with _map_fragment_cache_lock:
+            if _map_fragment_cache is None:
+                _map_fragment_cache = MapFragmentCache()
+    return _map_fragment_cache
@@ -0,0 +1,174 @@
+"""
+Marcadores de folium generados en el navegador.
+
+Con folium cada marcador es un objeto Python que se serializa a su propio
+bloque de JavaScript, con su icono y el HTML completo de su popup. Para
+cientos o miles de puntos el HTML resultante ocupa varios megabytes y
+m.save() tarda segundos. TemplateMarkers emite en su lugar un único array
+JSON con los datos de cada punto y una sola plantilla de popup; el
+navegador crea los marcadores al cargar la página (como FastMarkerCluster)
+y rellena la plantilla solo cuando se abre un popup.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+import json
+
+from branca.element import MacroElement
+from jinja2 import Template
+
+
+class TemplateMarkers(MacroElement):
+    """
+    Marcadores creados en el navegador a partir de un array JSON y una plantilla.
+
+    Se añade como hijo de un MarkerCluster o FeatureGroup: los marcadores se
+    insertan en él de una vez (addLayers en los clusters).
+
+    La plantilla de popup admite {{campo}} (el valor, escapado como HTML) y
+    {{#campo}}...{{/campo}} (el bloque solo se incluye si el campo tiene valor).
+    """
+
+    _template = Template(r"""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var fields = {{ this.fields|tojson }};
+            var rows = {{ this.rows_json }};
+            var popupTemplate = {{ this.popup_template_json }};
+            var tooltipTemplate = {{ this.tooltip_template_json }};
+            var icons = {};
+            {%- for key, options in this.icons.items() %}
+            icons[{{ key|tojson }}] = L.AwesomeMarkers.icon({{ options|tojson }});
+            {%- endfor %}
+
+            function escapeHtml(value) {
+                return String(value === null || value === undefined ? "" : value)
+                    .replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;")
+                    .replace(/"/g, "&quot;").replace(/'/g, "&#39;");
+            }
+            function render(template, row) {
+                return template
+                    .replace(/\{\{[#](\w+)\}\}([\s\S]*?)\{\{\/\1\}\}/g, function(_, key, inner) {
+                        return row[key] ? inner : "";
+                    })
+                    .replace(/\{\{(\w+)\}\}/g, function(_, key) { return escapeHtml(row[key]); });
+            }
+            function toObject(values) {
+                var row = {};
+                for (var i = 0; i < fields.length; i++) { row[fields[i]] = values[i]; }
+                return row;
+            }
+
+            var markers = new Array(rows.length);
+            for (var i = 0; i < rows.length; i++) {
+                var values = rows[i];
+                var row = toObject(values);
+                var marker = L.marker([row.lat, row.lon], {icon: icons[row.{{ this.icon_field }}]});
+                if (tooltipTemplate) { marker.bindTooltip(render(tooltipTemplate, row)); }
+                marker.bindPopup(
+                    (function(values) { return function() { return render(popupTemplate, toObject(values)); }; })(values),
+                    {maxWidth: {{ this.popup_max_width }}}
+                );
+                markers[i] = marker;
+            }
+
+            var parent = {{ this._parent.get_name() }};
+            if (parent.addLayers) {
+                parent.addLayers(markers);
+            } else {
+                for (var j = 0; j < markers.length; j++) { parent.addLayer(markers[j]); }
+            }
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(
+        self,
+        rows: Sequence[Sequence],
+        fields: Sequence[str],
+        popup_template: str,
+        icons: Dict[str, Dict],
+        icon_field: str = "icon",
+        tooltip_template: Optional[str] = None,
+        popup_max_width: int = 300,
+    ):
+        """
+        Inicializa los marcadores.
+
+        Args:
+            rows: Una lista de valores por marcador, en el orden de fields
+            fields: Nombres de los valores; deben incluir 'lat', 'lon' e icon_field
+            popup_template: HTML del popup con marcadores {{campo}}
+            icons: Opciones de L.AwesomeMarkers.icon por clave de icono
+            icon_field: Campo con la clave del icono de cada marcador
+            tooltip_template: Texto al pasar el ratón, con la misma sintaxis (None = sin tooltip)
+            popup_max_width: Ancho máximo del popup en píxeles
+        """
+        super().__init__()
+        self._name = "TemplateMarkers"
+        self.rows: List[List] = [list(row) for row in rows]
+        self.fields = list(fields)
+        self.popup_template = popup_template
+        self.icons = icons
+        self.icon_field = icon_field
+        self.tooltip_template = tooltip_template
+        self.popup_max_width = popup_max_width
+
+    @property
+    def rows_json(self) -> str:
+        """Filas como literal JSON para el script."""
+        return _script_json(self.rows)
+
+    @property
+    def popup_template_json(self) -> str:
+        """Plantilla del popup como literal JSON para el script."""
+        return _script_json(self.popup_template)
+
+    @property
+    def tooltip_template_json(self) -> str:
+        """Plantilla del tooltip como literal JSON para el script (null si no hay)."""
+        return _script_json(self.tooltip_template)
+
+
+def _script_json(value: Any) -> str:
+    """
+    Serializa un valor para incrustarlo en el script de la página.
+
+    branca vuelve a pasar el script generado por jinja2, así que las llaves
+    (solo aparecen dentro de cadenas: filas de escalares y plantillas) se
+    escapan para que {{campo}} no se interprete como una expresión; '<' se
+    escapa para que un valor no pueda cerrar la etiqueta <script>.
+
+    Args:
+        value: Filas o plantilla
+
+    Returns:
+        Literal JSON válido en JavaScript
+    """
+    return (
+        json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        .replace("{", "\\u007b")
+        .replace("}", "\\u007d")
+        .replace("<", "\\u003c")
+    )
+
+
+def awesome_icon(icon: str, color: str, prefix: str = "fa", icon_color: str = "white") -> Dict:
+    """
+    Opciones de icono equivalentes a folium.Icon.
+
+    Args:
+        icon: Nombre del icono (Font Awesome)
+        color: Color del marcador
+        prefix: Prefijo de la familia de iconos
+        icon_color: Color del icono
+
+    Returns:
+        Diccionario para L.AwesomeMarkers.icon
+    """
+    return {
+        "icon": icon,
+        "prefix": prefix,
+        "markerColor": color,
+        "iconColor": icon_color,
+        "extraClasses": "fa-rotate-0",
+    }
@@ -21,6 +21,22 @@ import config
 logger = logging.getLogger(__name__)
 
 
+def app_data_dir() -> Path:
+    """Calcula el directorio de datos de la aplicación según el sistema operativo."""
+    system = platform.system()
+
+    if system == "Windows":
+        appdata = os.getenv("APPDATA")
+        base = Path(appdata) if appdata else Path.home() / "AppData" / "Roaming"
+    elif system == "Darwin":
+        base = Path.home() / "Library" / "Application Support"
+    else:
+        xdg_config = os.getenv("XDG_CONFIG_HOME")
+        base = Path(xdg_config) if xdg_config else Path.home() / ".config"
+
+    return base / config.APP_DATA_DIR_NAME
+
+
 class FavoritesManager:
     """Gestiona la persistencia de cámaras favoritas."""
 
@@ -38,18 +54,7 @@ class FavoritesManager:
     @staticmethod
     def _default_base_dir() -> Path:
         """Calcula un directorio adecuado según el sistema operativo."""
-        system = platform.system()
-
-        if system == "Windows":
-            appdata = os.getenv("APPDATA")
-            base = Path(appdata) if appdata else Path.home() / "AppData" / "Roaming"
-        elif system == "Darwin":
-            base = Path.home() / "Library" / "Application Support"
-        else:
-            xdg_config = os.getenv("XDG_CONFIG_HOME")
-            base = Path(xdg_config) if xdg_config else Path.home() / ".config"
-
-        return base / config.APP_DATA_DIR_NAME
+        return app_data_dir()
 
     @property
     def storage_path(self) -> Path:
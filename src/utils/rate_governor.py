@@ -0,0 +1,275 @@
+"""
+Límite global de peticiones y de ancho de banda para todas las descargas.
+
+Con cientos de cámaras refrescándose y varios timelapses grabando, el
+servidor municipal acababa respondiendo con páginas de error. Este módulo
+reparte un presupuesto común (peticiones por segundo y bytes por segundo)
+entre todas las rutas de descarga mediante cubos de fichas. Cada clase de
+tráfico solo puede vaciar el cubo hasta un suelo propio: las vistas en
+directo pueden gastarlo entero, la grabación deja una reserva para ellas y
+la precarga en segundo plano deja una reserva mayor.
+"""
+
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+import logging
+import threading
+import time
+
+import config
+
+
+logger = logging.getLogger(__name__)
+
+# Clases de tráfico (mayor se atiende antes)
+TRAFFIC_LIVE = 2  # Cámaras en pantalla, detalle y ventanas flotantes
+TRAFFIC_RECORDING = 1  # Capturas de timelapse
+TRAFFIC_BACKGROUND = 0  # Precarga, refresco completo y capas del mapa
+
+TRAFFIC_NAMES = {
+    TRAFFIC_LIVE: "live",
+    TRAFFIC_RECORDING: "recording",
+    TRAFFIC_BACKGROUND: "background",
+}
+
+
+class TokenBucket:
+    """
+    Cubo de fichas que se rellena a ritmo constante.
+
+    Un ritmo de 0 desactiva el límite. El saldo puede quedar negativo
+    cuando se cobra después de conocer el coste (bytes de una respuesta).
+    """
+
+    def __init__(self, rate: float, burst_seconds: float):
+        """
+        Inicializa el cubo lleno.
+
+        Args:
+            rate: Fichas por segundo (0 = sin límite)
+            burst_seconds: Segundos de ritmo que caben en el cubo (ráfaga máxima)
+        """
+        self.rate = rate
+        self.capacity = max(rate * burst_seconds, 1.0) if rate > 0 else 0.0
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def refill(self, now: float):
+        """Suma las fichas generadas desde la última actualización."""
+        if self.enabled:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_for(self, level: float) -> float:
+        """
+        Segundos que faltan para que el saldo alcance un nivel.
+
+        Args:
+            level: Saldo necesario
+
+        Returns:
+            0 si ya se alcanza o el cubo está desactivado
+        """
+        if not self.enabled or self.tokens >= level:
+            return 0.0
+        return (level - self.tokens) / self.rate
+
+
+class RateGovernor:
+    """
+    Presupuesto compartido de peticiones/s y bytes/s con prioridad por clase de tráfico.
+    """
+
+    WINDOW = 5.0  # Segundos de historial para medir el ritmo real
+
+    def __init__(
+        self,
+        requests_per_second: Optional[float] = None,
+        bytes_per_second: Optional[float] = None,
+        burst_seconds: Optional[float] = None,
+        reserves: Optional[Dict[int, float]] = None
+    ):
+        """
+        Inicializa el gobernador.
+
+        Args:
+            requests_per_second: Peticiones por segundo (0 = sin límite)
+            bytes_per_second: Bytes por segundo (0 = sin límite)
+            burst_seconds: Segundos de presupuesto acumulable para ráfagas
+            reserves: Fracción del cubo que cada clase de tráfico no puede gastar
+        """
+        if requests_per_second is None:
+            requests_per_second = config.RATE_LIMIT_REQUESTS_PER_SECOND
+        if bytes_per_second is None:
+            bytes_per_second = config.RATE_LIMIT_KB_PER_SECOND * 1024
+        burst_seconds = burst_seconds or config.RATE_LIMIT_BURST_SECONDS
+        self.reserves = reserves or {
+            TRAFFIC_LIVE: 0.0,
+            TRAFFIC_RECORDING: config.RATE_LIMIT_RECORDING_RESERVE,
+            TRAFFIC_BACKGROUND: config.RATE_LIMIT_BACKGROUND_RESERVE,
+        }
+
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._requests = TokenBucket(requests_per_second, burst_seconds)
+        self._bytes = TokenBucket(bytes_per_second, burst_seconds)
+        self._recent_requests: Deque[float] = deque()
+        self._recent_bytes: Deque[Tuple[float, int]] = deque()
+        self._granted = {traffic: 0 for traffic in TRAFFIC_NAMES}
+        self._deferred = {traffic: 0 for traffic in TRAFFIC_NAMES}
+
+    def try_acquire(self, traffic: int) -> bool:
+        """
+        Reserva una petición sin bloquear.
+
+        Args:
+            traffic: Clase de tráfico (TRAFFIC_*)
+
+        Returns:
+            True si la petición puede hacerse ya; si no, se cuenta como aplazada
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._wait_locked(traffic, now) > 0:
+                self._deferred[traffic] += 1
+                return False
+            self._grant_locked(traffic, now)
+            return True
+
+    def acquire(self, traffic: int, timeout: Optional[float] = None) -> bool:
+        """
+        Reserva una petición esperando lo necesario (solo hilos de trabajo).
+
+        Args:
+            traffic: Clase de tráfico (TRAFFIC_*)
+            timeout: Espera máxima en segundos, o None para esperar sin límite
+
+        Returns:
+            True si se concedió, False si venció el timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            deferred = False
+            while True:
+                now = time.monotonic()
+                wait = self._wait_locked(traffic, now)
+                if wait <= 0:
+                    self._grant_locked(traffic, now)
+                    return True
+                if not deferred:
+                    self._deferred[traffic] += 1
+                    deferred = True
+                if deadline is not None:
+                    if now >= deadline:
+                        return False
+                    wait = min(wait, deadline - now)
+                self._condition.wait(wait)
+
+    def wait_time(self, traffic: int) -> float:
+        """
+        Segundos que faltan para que una clase de tráfico pueda hacer una petición.
+
+        Args:
+            traffic: Clase de tráfico (TRAFFIC_*)
+        """
+        with self._lock:
+            return self._wait_locked(traffic, time.monotonic())
+
+    def record_bytes(self, count: int):
+        """
+        Cobra los bytes recibidos en una respuesta.
+
+        Args:
+            count: Bytes del cuerpo descargado
+        """
+        if count <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._bytes.refill(now)
+            self._bytes.tokens -= count
+            self._recent_bytes.append((now, count))
+            self._trim_locked(now)
+
+    def get_stats(self) -> dict:
+        """
+        Retorna el uso actual del presupuesto.
+
+        Returns:
+            Diccionario con límites, ritmo medido, utilización (0-1), fichas
+            disponibles y peticiones concedidas/aplazadas por clase
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._requests.refill(now)
+            self._bytes.refill(now)
+            self._trim_locked(now)
+            request_rate = len(self._recent_requests) / self.WINDOW
+            byte_rate = sum(count for _, count in self._recent_bytes) / self.WINDOW
+            return {
+                "requests_per_second_limit": self._requests.rate,
+                "bytes_per_second_limit": self._bytes.rate,
+                "requests_per_second": request_rate,
+                "bytes_per_second": byte_rate,
+                "request_utilization": request_rate / self._requests.rate if self._requests.enabled else 0.0,
+                "bandwidth_utilization": byte_rate / self._bytes.rate if self._bytes.enabled else 0.0,
+                "request_tokens": self._requests.tokens,
+                "byte_tokens": self._bytes.tokens,
+                "granted": {TRAFFIC_NAMES[t]: n for t, n in self._granted.items()},
+                "deferred": {TRAFFIC_NAMES[t]: n for t, n in self._deferred.items()},
+            }
+
+    def _wait_locked(self, traffic: int, now: float) -> float:
+        """
+        Segundos de espera para una clase de tráfico (con el lock tomado).
+
+        La clase debe dejar en cada cubo su fracción de reserva: necesita una
+        ficha de petición por encima del suelo y un saldo de bytes no inferior a él.
+        """
+        reserve = self.reserves.get(traffic, 0.0)
+        self._requests.refill(now)
+        self._bytes.refill(now)
+        return max(
+            self._requests.wait_for(self._requests.capacity * reserve + 1),
+            self._bytes.wait_for(self._bytes.capacity * reserve),
+        )
+
+    def _grant_locked(self, traffic: int, now: float):
+        """Consume la ficha de una petición concedida (con el lock tomado)."""
+        if self._requests.enabled:
+            self._requests.tokens -= 1
+        self._granted[traffic] += 1
+        self._recent_requests.append(now)
+        self._trim_locked(now)
+
+    def _trim_locked(self, now: float):
+        """Descarta del historial lo anterior a la ventana de medida."""
+        limit = now - self.WINDOW
+        while self._recent_requests and self._recent_requests[0] < limit:
+            self._recent_requests.popleft()
+        while self._recent_bytes and self._recent_bytes[0][0] < limit:
+            self._recent_bytes.popleft()
+
+
+# Instancia global del gobernador
+_governor: Optional[RateGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_rate_governor() -> RateGovernor:
+    """
+    Obtiene la instancia global del gobernador.
+
+    Returns:
+        Instancia de RateGovernor compartida por todas las rutas de descarga
+    """
+    global _governor
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                _governor = RateGovernor()
+    return _governor
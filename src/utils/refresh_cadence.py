@@ -0,0 +1,207 @@
+"""
+Estimación del ritmo real de actualización de cada cámara.
+
+Muchas cámaras publican una imagen nueva cada minuto o más, pero se
+consultaban con el mismo intervalo fijo que las rápidas. Este módulo
+aprende, a partir de las respuestas (imagen nueva frente a 304 o hash
+idéntico), cada cuánto cambia la imagen de cada cámara y calcula cuándo
+conviene volver a pedirla: poco antes del siguiente cambio esperado y, desde
+ahí, al intervalo mínimo hasta que llega, dentro de un mínimo y un máximo
+configurables.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional
+import logging
+import time
+
+import config
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CameraCadence:
+    """
+    Estado aprendido de una cámara.
+
+    Atributos:
+        last_check: Instante (monotonic) de la última respuesta recibida
+        last_change: Instante estimado del último cambio de imagen
+        interval: Intervalo estimado entre cambios en segundos (None si aún no se conoce)
+        lower_bound: Mínimo conocido del intervalo actual cuando el cambio previsto
+            no llegó a tiempo (None mientras no se haya pasado de la previsión)
+        changes: Cambios observados
+        checks: Respuestas observadas
+    """
+
+    last_check: float = 0.0
+    last_change: Optional[float] = None
+    interval: Optional[float] = None
+    lower_bound: Optional[float] = None
+    changes: int = 0
+    checks: int = 0
+
+
+class RefreshCadence:
+    """
+    Aprende el intervalo de actualización de cada cámara y decide cuándo refrescarla.
+    """
+
+    SMOOTHING = 0.3  # Peso de cada observación nueva en la media exponencial
+    SLACK = 0.5  # Segundos de tolerancia al comparar con el intervalo pedido por la vista
+
+    def __init__(
+        self,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        margin: Optional[float] = None
+    ):
+        """
+        Inicializa el estimador.
+
+        Args:
+            min_interval: Intervalo mínimo entre peticiones a una cámara (segundos)
+            max_interval: Intervalo máximo sin pedir una cámara (segundos)
+            margin: Segundos que se añaden al cambio previsto al calcular la próxima petición
+        """
+        self.min_interval = min_interval if min_interval is not None else config.ADAPTIVE_REFRESH_MIN_INTERVAL
+        self.max_interval = max_interval if max_interval is not None else config.ADAPTIVE_REFRESH_MAX_INTERVAL
+        self.margin = margin if margin is not None else config.ADAPTIVE_REFRESH_MARGIN
+        self._cameras: Dict[int, CameraCadence] = {}
+        self.skipped = 0
+
+    def record(self, camera_id: int, changed: bool, now: Optional[float] = None):
+        """
+        Registra una respuesta de red de una cámara.
+
+        Args:
+            camera_id: ID de la cámara
+            changed: True si llegó una imagen nueva, False si seguía igual
+            now: Instante de la respuesta (monotonic); por defecto, ahora
+        """
+        now = time.monotonic() if now is None else now
+        state = self._cameras.setdefault(camera_id, CameraCadence())
+        previous_check = state.last_check if state.checks else None
+        state.checks += 1
+        state.last_check = now
+
+        if changed:
+            # La imagen cambió entre la respuesta anterior y esta: se toma el
+            # punto medio, no el instante en que se detectó el cambio
+            changed_at = now if previous_check is None else (previous_check + now) / 2
+            if state.last_change is not None:
+                sample = changed_at - state.last_change
+                if state.lower_bound is not None:
+                    sample = max(sample, state.lower_bound)
+                self._observe(state, sample)
+            state.last_change = changed_at
+            state.lower_bound = None
+            state.changes += 1
+        elif state.last_change is not None and state.interval is not None and state.lower_bound is None:
+            # Pasado el cambio previsto, la respuesta sin cambios solo dice que
+            # el intervalo es al menos el transcurrido; se anota una vez, sin
+            # entrar en la media, y delay() sigue pidiendo al mínimo hasta que llegue
+            elapsed = now - state.last_change
+            if elapsed > state.interval:
+                state.lower_bound = elapsed
+
+    def delay(self, camera_id: int, interval: float, now: Optional[float] = None) -> float:
+        """
+        Segundos que faltan para que merezca la pena refrescar una cámara.
+
+        Nunca se refresca antes del intervalo pedido por la vista; si ya se
+        conoce el ritmo de la cámara, se espera además hasta un intervalo
+        mínimo antes del siguiente cambio previsto (y después se pide al
+        mínimo hasta que llega), sin superar el máximo configurado.
+
+        Args:
+            camera_id: ID de la cámara
+            interval: Intervalo de refresco configurado por la vista (segundos)
+            now: Instante actual (monotonic); por defecto, ahora
+
+        Returns:
+            0 si ya toca refrescar, o los segundos restantes
+        """
+        state = self._cameras.get(camera_id)
+        if state is None or not state.checks:
+            return 0.0
+        now = time.monotonic() if now is None else now
+
+        due = state.last_check + interval - self.SLACK
+        if state.interval is not None and state.last_change is not None:
+            # Se pide un intervalo mínimo antes del cambio previsto y luego al
+            # mínimo, para que cada cambio quede acotado entre dos respuestas
+            # cercanas y la estimación no derive hacia arriba
+            expected = state.last_change + state.interval + self.margin - self.min_interval
+            if state.lower_bound is not None or expected <= state.last_check:
+                # El cambio previsto ya debería haber llegado: reintentar al mínimo
+                expected = state.last_check + self.min_interval
+            expected = min(max(expected, state.last_check + self.min_interval), state.last_check + self.max_interval)
+            due = max(due, expected)
+
+        return max(0.0, due - now)
+
+    def is_due(self, camera_id: int, interval: float, now: Optional[float] = None) -> bool:
+        """
+        Indica si toca refrescar una cámara y cuenta las peticiones ahorradas.
+
+        Args:
+            camera_id: ID de la cámara
+            interval: Intervalo de refresco configurado por la vista (segundos)
+            now: Instante actual (monotonic); por defecto, ahora
+        """
+        if self.delay(camera_id, interval, now) > 0:
+            self.skipped += 1
+            return False
+        return True
+
+    def get_interval(self, camera_id: int) -> Optional[float]:
+        """
+        Retorna el intervalo estimado entre cambios de una cámara.
+
+        Args:
+            camera_id: ID de la cámara
+
+        Returns:
+            Segundos entre imágenes nuevas, o None si aún no se conoce
+        """
+        state = self._cameras.get(camera_id)
+        return state.interval if state else None
+
+    def forget(self, camera_id: int):
+        """Descarta lo aprendido de una cámara."""
+        self._cameras.pop(camera_id, None)
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Retorna el resumen de lo aprendido.
+
+        Returns:
+            Diccionario con cámaras seguidas, cámaras con ritmo conocido,
+            intervalo medio y refrescos ahorrados
+        """
+        intervals = [state.interval for state in self._cameras.values() if state.interval is not None]
+        return {
+            "tracked": len(self._cameras),
+            "learned": len(intervals),
+            "avg_interval_s": sum(intervals) / len(intervals) if intervals else 0.0,
+            "min_interval_s": min(intervals) if intervals else 0.0,
+            "max_interval_s": max(intervals) if intervals else 0.0,
+            "skipped_refreshes": self.skipped,
+        }
+
+    def _observe(self, state: CameraCadence, sample: float):
+        """
+        Incorpora una muestra de intervalo a la media exponencial.
+
+        Args:
+            state: Estado de la cámara
+            sample: Segundos observados entre cambios
+        """
+        sample = min(max(sample, self.min_interval), self.max_interval)
+        if state.interval is None:
+            state.interval = sample
+        else:
+            state.interval += self.SMOOTHING * (sample - state.interval)
@@ -0,0 +1,230 @@
+"""Caché persistente en disco de las últimas imágenes de cada cámara.
+
+Guarda el último fotograma descargado de cada cámara para poder pintarlo
+al instante en el siguiente arranque, mientras la descarga real está en
+curso. Los ficheros se almacenan por contenido (nombre = hash) y un índice
+JSON pequeño relaciona cada URL de imagen con su fichero, validadores HTTP
+y fecha de captura. Solo usa biblioteca estándar.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import config
+from src.utils.preferences import app_data_dir
+
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotDiskCache:
+    """Caché de imágenes direccionada por contenido con límite de tamaño y TTL."""
+
+    INDEX_FILE_NAME = "index.json"
+
+    def __init__(
+        self,
+        base_dir: Path | None = None,
+        max_bytes: int | None = None,
+        ttl_seconds: int | None = None,
+    ) -> None:
+        self._base_dir = base_dir or (app_data_dir() / config.SNAPSHOT_CACHE_DIR_NAME)
+        self._objects_dir = self._base_dir / "objects"
+        self._index_path = self._base_dir / self.INDEX_FILE_NAME
+        self.max_bytes = max_bytes if max_bytes is not None else config.SNAPSHOT_CACHE_MAX_MB * 1024 * 1024
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else config.SNAPSHOT_CACHE_TTL_HOURS * 3600
+
+        self._lock = threading.Lock()
+        # Serializa las escrituras del índice (hilo de fondo, clear, cierre)
+        self._flush_lock = threading.Lock()
+        self._index: Dict[str, Dict] = {}
+        self._dirty = False
+        self._last_flush = 0.0
+
+        self._objects_dir.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+        self._purge_expired()
+
+    @property
+    def base_dir(self) -> Path:
+        """Directorio raíz de la caché."""
+        return self._base_dir
+
+    def get(self, url: str) -> Optional[Tuple[bytes, Dict]]:
+        """Obtiene la última imagen guardada para una URL si no ha caducado.
+
+        Returns:
+            Tupla (bytes, metadatos) o None si no existe, caducó o falta el fichero
+        """
+        with self._lock:
+            entry = self._index.get(url)
+            if not entry or self._is_expired(entry):
+                return None
+            path = self._object_path(entry["hash"])
+
+        try:
+            return path.read_bytes(), dict(entry)
+        except OSError:
+            logger.debug("Fichero de snapshot ausente para %s, se elimina del índice", url)
+            with self._lock:
+                self._remove_entry(url)
+            return None
+
+    def put(
+        self,
+        url: str,
+        content: bytes,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        content_hash: str | None = None,
+    ) -> None:
+        """Guarda el último fotograma de una URL y aplica el límite de tamaño."""
+        if not content or len(content) > self.max_bytes:
+            return
+
+        digest = content_hash or hashlib.blake2b(content, digest_size=16).hexdigest()
+        path = self._object_path(digest)
+
+        with self._lock:
+            previous = self._index.get(url)
+            if previous and previous["hash"] == digest:
+                previous["stored_at"] = time.time()
+                previous["etag"] = etag
+                previous["last_modified"] = last_modified
+                self._mark_dirty()
+                return
+
+            try:
+                if not path.exists():
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    tmp_path = path.with_suffix(".tmp")
+                    tmp_path.write_bytes(content)
+                    os.replace(tmp_path, path)
+            except OSError as exc:
+                logger.warning("No se pudo escribir snapshot %s: %s", path, exc)
+                return
+
+            self._remove_entry(url)
+            self._index[url] = {
+                "hash": digest,
+                "size": len(content),
+                "stored_at": time.time(),
+                "etag": etag,
+                "last_modified": last_modified,
+            }
+            self._enforce_size_limit()
+            self._mark_dirty()
+
+    def flush(self) -> None:
+        """Escribe el índice en disco si hay cambios pendientes.
+
+        Las escrituras van en orden: la copia del índice se toma con el lock
+        de escritura ya adquirido, de modo que nunca sustituye una versión
+        antigua a otra más reciente.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                payload = json.dumps(self._index, ensure_ascii=True)
+                self._dirty = False
+                self._last_flush = time.time()
+
+            tmp_path = self._index_path.with_suffix(f".{threading.get_ident()}.tmp")
+            try:
+                tmp_path.write_text(payload, encoding="utf-8")
+                os.replace(tmp_path, self._index_path)
+            except OSError as exc:
+                logger.error("No se pudo guardar el índice de snapshots %s: %s", self._index_path, exc)
+                with self._lock:
+                    self._dirty = True
+
+    def clear(self) -> None:
+        """Elimina todos los snapshots guardados."""
+        with self._lock:
+            for url in list(self._index.keys()):
+                self._remove_entry(url)
+            self._mark_dirty()
+        self.flush()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Retorna el número de entradas y bytes ocupados."""
+        with self._lock:
+            return {
+                "entries": len(self._index),
+                "bytes": self._total_bytes(),
+                "max_bytes": self.max_bytes,
+            }
+
+    # ------------------------------------------------------------------
+    # Internos (requieren tener el lock salvo en la inicialización)
+    # ------------------------------------------------------------------
+
+    def _object_path(self, digest: str) -> Path:
+        return self._objects_dir / digest[:2] / f"{digest}.img"
+
+    def _is_expired(self, entry: Dict) -> bool:
+        return self.ttl_seconds > 0 and time.time() - entry.get("stored_at", 0) > self.ttl_seconds
+
+    def _total_bytes(self) -> int:
+        # Los objetos compartidos entre URLs solo ocupan disco una vez
+        sizes = {entry["hash"]: entry["size"] for entry in self._index.values()}
+        return sum(sizes.values())
+
+    def _remove_entry(self, url: str) -> None:
+        entry = self._index.pop(url, None)
+        if not entry:
+            return
+        still_used = any(other["hash"] == entry["hash"] for other in self._index.values())
+        if not still_used:
+            try:
+                self._object_path(entry["hash"]).unlink(missing_ok=True)
+            except OSError as exc:
+                logger.debug("No se pudo borrar snapshot %s: %s", entry["hash"], exc)
+
+    def _enforce_size_limit(self) -> None:
+        if self._total_bytes() <= self.max_bytes:
+            return
+        for url, _entry in sorted(self._index.items(), key=lambda item: item[1]["stored_at"]):
+            self._remove_entry(url)
+            if self._total_bytes() <= self.max_bytes:
+                break
+
+    def _purge_expired(self) -> None:
+        expired = [url for url, entry in self._index.items() if self._is_expired(entry)]
+        for url in expired:
+            self._remove_entry(url)
+        if expired:
+            logger.info("Eliminados %d snapshots caducados", len(expired))
+            self._dirty = True
+            self.flush()
+
+    def _mark_dirty(self) -> None:
+        self._dirty = True
+        now = time.time()
+        if now - self._last_flush >= config.SNAPSHOT_CACHE_FLUSH_INTERVAL:
+            # La escritura se hace fuera del lock, en un hilo aparte
+            self._last_flush = now
+            threading.Thread(target=self.flush, daemon=True).start()
+
+    def _load_index(self) -> None:
+        if not self._index_path.exists():
+            return
+        try:
+            data = json.loads(self._index_path.read_text(encoding="utf-8"))
+        except (json.JSONDecodeError, OSError) as exc:
+            logger.warning("Índice de snapshots corrupto, se reinicia %s: %s", self._index_path, exc)
+            return
+        if isinstance(data, dict):
+            self._index = {
+                url: entry for url, entry in data.items()
+                if isinstance(entry, dict) and "hash" in entry and "size" in entry
+            }
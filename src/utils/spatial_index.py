@@ -0,0 +1,229 @@
+"""
+Índice espacial por rejilla para consultas de proximidad.
+
+Trabaja sobre coordenadas proyectadas en metros (UTM EPSG:25830, las del
+CSV oficial), así que las distancias son euclídeas. Los puntos se reparten
+en celdas cuadradas de tamaño fijo; una consulta solo mira las celdas que
+toca y después calcula la distancia exacta de esos candidatos.
+"""
+
+from typing import Dict, Tuple
+import math
+
+import numpy as np
+
+import config
+
+
+class SpatialIndex:
+    """
+    Rejilla uniforme sobre puntos (x, y) con consultas k-vecinos, radio y rectángulo.
+    """
+
+    def __init__(self, xs, ys, cell_size: float = config.SPATIAL_INDEX_CELL_SIZE):
+        """
+        Construye el índice.
+
+        Args:
+            xs: Coordenadas X en metros (NaN = punto sin coordenadas, se ignora)
+            ys: Coordenadas Y en metros
+            cell_size: Lado de cada celda en metros
+        """
+        self.x = np.asarray(xs, dtype=float)
+        self.y = np.asarray(ys, dtype=float)
+        self.cell_size = float(cell_size)
+
+        valid = np.flatnonzero(np.isfinite(self.x) & np.isfinite(self.y))
+        self._size = len(valid)
+        self._cells: Dict[Tuple[int, int], np.ndarray] = {}
+        if not self._size:
+            self._origin = (0.0, 0.0)
+            self._extent = 0.0
+            return
+
+        min_x, min_y = self.x[valid].min(), self.y[valid].min()
+        self._origin = (float(min_x), float(min_y))
+        self._extent = math.hypot(self.x[valid].max() - min_x, self.y[valid].max() - min_y)
+
+        # Agrupar las posiciones por celda ordenando por la clave (columna, fila)
+        cols = np.floor((self.x[valid] - min_x) / self.cell_size).astype(np.int64)
+        rows = np.floor((self.y[valid] - min_y) / self.cell_size).astype(np.int64)
+        order = np.lexsort((rows, cols))
+        cols, rows, positions = cols[order], rows[order], valid[order]
+        starts = np.flatnonzero(np.r_[True, (cols[1:] != cols[:-1]) | (rows[1:] != rows[:-1])])
+        ends = np.r_[starts[1:], len(positions)]
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            self._cells[(int(cols[start]), int(rows[start]))] = np.sort(positions[start:end])
+
+    def __len__(self) -> int:
+        return self._size
+
+    def within_bbox(self, min_x: float, min_y: float, max_x: float, max_y: float) -> np.ndarray:
+        """
+        Puntos dentro de un rectángulo.
+
+        Args:
+            min_x: X mínima
+            min_y: Y mínima
+            max_x: X máxima
+            max_y: Y máxima
+
+        Returns:
+            Array de posiciones en orden creciente
+        """
+        candidates = self._candidates(min_x, min_y, max_x, max_y)
+        x, y = self.x[candidates], self.y[candidates]
+        inside = (x >= min_x) & (x <= max_x) & (y >= min_y) & (y <= max_y)
+        return np.sort(candidates[inside])
+
+    def within_radius(self, x: float, y: float, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Puntos a una distancia máxima de un punto.
+
+        Args:
+            x: X del centro
+            y: Y del centro
+            radius: Radio en metros
+
+        Returns:
+            Tupla (posiciones, distancias) ordenada de más cercano a más lejano
+        """
+        candidates = self._candidates(x - radius, y - radius, x + radius, y + radius)
+        distances = np.hypot(self.x[candidates] - x, self.y[candidates] - y)
+        inside = distances <= radius
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return candidates[order], distances[order]
+
+    def nearest(self, x: float, y: float, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Los k puntos más cercanos a un punto.
+
+        Busca en un radio que se duplica hasta reunir k puntos: todo lo que
+        queda fuera del radio está más lejos que lo encontrado dentro.
+
+        Args:
+            x: X del punto
+            y: Y del punto
+            k: Número de vecinos
+
+        Returns:
+            Tupla (posiciones, distancias) ordenada de más cercano a más lejano
+        """
+        k = min(k, self._size)
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+
+        # Distancia desde el punto hasta la zona indexada, para no empezar vacío
+        origin_x, origin_y = self._origin
+        gap = math.hypot(
+            max(origin_x - x, 0.0, x - (origin_x + self._extent)),
+            max(origin_y - y, 0.0, y - (origin_y + self._extent)),
+        )
+        radius = gap + self.cell_size
+        while True:
+            positions, distances = self.within_radius(x, y, radius)
+            if len(positions) >= k or radius > gap + 2 * self._extent:
+                return positions[:k], distances[:k]
+            radius *= 2
+
+    def near_any(self, xs, ys, radius: float) -> np.ndarray:
+        """
+        Indica qué puntos de consulta tienen algún punto indexado a menos de un radio.
+
+        Args:
+            xs: Coordenadas X de los puntos de consulta
+            ys: Coordenadas Y de los puntos de consulta
+            radius: Radio en metros
+
+        Returns:
+            Array booleano, uno por punto de consulta
+        """
+        xs = np.asarray(xs, dtype=float)
+        ys = np.asarray(ys, dtype=float)
+        result = np.zeros(xs.shape, dtype=bool)
+        if not self._size:
+            return result
+
+        # Las consultas que caen en la misma celda comparten candidatos
+        origin_x, origin_y = self._origin
+        finite = np.isfinite(xs) & np.isfinite(ys)
+        cols = np.full(xs.shape, -1, dtype=np.int64)
+        rows = np.full(xs.shape, -1, dtype=np.int64)
+        cols[finite] = np.floor((xs[finite] - origin_x) / self.cell_size)
+        rows[finite] = np.floor((ys[finite] - origin_y) / self.cell_size)
+        reach = int(math.ceil(radius / self.cell_size))
+        groups: Dict[Tuple[int, int], list] = {}
+        for index in np.flatnonzero(finite).tolist():
+            groups.setdefault((int(cols[index]), int(rows[index])), []).append(index)
+
+        for (col, row), indices in groups.items():
+            candidates = self._cell_range(col - reach, row - reach, col + reach, row + reach)
+            if not len(candidates):
+                continue
+            indices = np.asarray(indices)
+            dx = xs[indices, None] - self.x[candidates][None, :]
+            dy = ys[indices, None] - self.y[candidates][None, :]
+            result[indices] = (dx * dx + dy * dy <= radius * radius).any(axis=1)
+        return result
+
+    def _candidates(self, min_x: float, min_y: float, max_x: float, max_y: float) -> np.ndarray:
+        """Posiciones de las celdas que tocan un rectángulo."""
+        if not self._size:
+            return np.empty(0, dtype=np.intp)
+        origin_x, origin_y = self._origin
+        return self._cell_range(
+            int(math.floor((min_x - origin_x) / self.cell_size)),
+            int(math.floor((min_y - origin_y) / self.cell_size)),
+            int(math.floor((max_x - origin_x) / self.cell_size)),
+            int(math.floor((max_y - origin_y) / self.cell_size)),
+        )
+
+    def _cell_range(self, col_min: int, row_min: int, col_max: int, row_max: int) -> np.ndarray:
+        """Posiciones de las celdas de un rango de columnas y filas."""
+        if (col_max - col_min + 1) * (row_max - row_min + 1) > len(self._cells):
+            # Rango mayor que la rejilla ocupada: recorrer las celdas existentes
+            chunks = [
+                positions for (col, row), positions in self._cells.items()
+                if col_min <= col <= col_max and row_min <= row <= row_max
+            ]
+        else:
+            chunks = []
+            for col in range(col_min, col_max + 1):
+                for row in range(row_min, row_max + 1):
+                    positions = self._cells.get((col, row))
+                    if positions is not None:
+                        chunks.append(positions)
+        if not chunks:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(chunks)
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Retorna el tamaño del índice.
+
+        Returns:
+            Diccionario con puntos, celdas ocupadas y tamaño de celda
+        """
+        return {
+            "points": self._size,
+            "cells": len(self._cells),
+            "cell_size": self.cell_size,
+        }
+
+
+def build_camera_index(cameras) -> Tuple[SpatialIndex, list]:
+    """
+    Construye un índice espacial sobre las coordenadas UTM de unas cámaras.
+
+    Args:
+        cameras: Secuencia de objetos Camera
+
+    Returns:
+        Tupla (índice, lista de cámaras): las posiciones del índice se refieren a esa lista
+    """
+    cameras = list(cameras)
+    nan = float("nan")
+    xs = [camera.coordenadas[0] if camera.coordenadas else nan for camera in cameras]
+    ys = [camera.coordenadas[1] if camera.coordenadas else nan for camera in cameras]
+    return SpatialIndex(xs, ys), cameras
@@ -0,0 +1,198 @@
+"""
+Cola acotada de descargas de imágenes con prioridades y métricas.
+
+ImageLoader no entrega las tareas directamente al QThreadPool (cuya cola
+interna no tiene límite ni permite inspeccionarla): las guarda aquí y solo
+las pasa al pool cuando hay un hilo libre. Así se pueden cancelar por
+cámara o por generación, descartar los refrescos más antiguos cuando la
+red no da abasto y medir cuánto esperan las tareas.
+"""
+
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional
+import logging
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class ImageTaskQueue:
+    """
+    Cola de tareas por cámara, ordenada por prioridad y antigüedad.
+
+    Las tareas deben exponer los atributos camera_id, priority, generation,
+    force_reload y enqueued_at (este último lo fija la cola).
+    """
+
+    WAIT_SAMPLES = 200  # Esperas recientes que se conservan para percentiles
+
+    def __init__(self, max_size: int):
+        """
+        Inicializa la cola.
+
+        Args:
+            max_size: Número máximo de tareas en espera
+        """
+        self.max_size = max_size
+        self._tasks: "OrderedDict[int, object]" = OrderedDict()
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.cancelled = 0
+        self.max_depth = 0
+        self._waits: Deque[float] = deque(maxlen=self.WAIT_SAMPLES)
+        self._total_wait = 0.0
+        self._dispatched = 0
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __contains__(self, camera_id: int) -> bool:
+        return camera_id in self._tasks
+
+    def get(self, camera_id: int):
+        """
+        Obtiene la tarea en espera de una cámara.
+
+        Args:
+            camera_id: ID de la cámara
+
+        Returns:
+            Tarea en cola o None
+        """
+        return self._tasks.get(camera_id)
+
+    def push(self, task) -> List:
+        """
+        Encola una tarea aplicando el límite de tamaño.
+
+        Con la cola llena se descarta el refresco más antiguo de prioridad
+        igual o menor; si no hay ninguno, la tarea en espera más antigua de
+        prioridad menor; y si tampoco, la tarea nueva.
+
+        Args:
+            task: Tarea a encolar
+
+        Returns:
+            Lista de tareas descartadas (vacía si no hubo que descartar)
+        """
+        task.enqueued_at = time.monotonic()
+        dropped = []
+
+        if len(self._tasks) >= self.max_size:
+            victim = self._find_victim(task.priority)
+            if victim is None:
+                self.dropped += 1
+                logger.debug(f"Cola de imágenes llena, se descarta la petición de cámara {task.camera_id}")
+                return [task]
+            del self._tasks[victim.camera_id]
+            self.dropped += 1
+            dropped.append(victim)
+            logger.debug(f"Cola de imágenes llena, se descarta el refresco de cámara {victim.camera_id}")
+
+        self._tasks[task.camera_id] = task
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, len(self._tasks))
+        return dropped
+
+    def peek(self):
+        """
+        Obtiene sin extraerla la tarea que devolvería pop().
+
+        Returns:
+            Tarea de mayor prioridad o None si la cola está vacía
+        """
+        if not self._tasks:
+            return None
+        return max(self._tasks.values(), key=lambda queued: queued.priority)
+
+    def pop(self):
+        """
+        Extrae la tarea de mayor prioridad (la más antigua si hay empate).
+
+        Returns:
+            Tarea extraída o None si la cola está vacía
+        """
+        if not self._tasks:
+            return None
+
+        # max() devuelve el primer máximo: el orden de inserción desempata por antigüedad
+        task = max(self._tasks.values(), key=lambda queued: queued.priority)
+        del self._tasks[task.camera_id]
+
+        wait = time.monotonic() - task.enqueued_at
+        self._waits.append(wait)
+        self._total_wait += wait
+        self._dispatched += 1
+        return task
+
+    def remove(self, camera_id: int):
+        """
+        Retira la tarea en espera de una cámara.
+
+        Args:
+            camera_id: ID de la cámara
+
+        Returns:
+            Tarea retirada o None si no estaba en cola
+        """
+        task = self._tasks.pop(camera_id, None)
+        if task is not None:
+            self.cancelled += 1
+        return task
+
+    def remove_where(self, predicate: Callable[[object], bool]) -> List:
+        """
+        Retira todas las tareas en espera que cumplan una condición.
+
+        Args:
+            predicate: Función que recibe la tarea y decide si se cancela
+
+        Returns:
+            Lista de tareas retiradas
+        """
+        removed = [task for task in self._tasks.values() if predicate(task)]
+        for task in removed:
+            del self._tasks[task.camera_id]
+        self.cancelled += len(removed)
+        return removed
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Retorna las métricas de la cola.
+
+        Returns:
+            Diccionario con profundidad, descartes, cancelaciones y esperas en ms
+        """
+        waits = sorted(self._waits)
+        p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0
+        return {
+            "depth": len(self._tasks),
+            "max_depth": self.max_depth,
+            "max_size": self.max_size,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "cancelled": self.cancelled,
+            "avg_wait_ms": (self._total_wait / self._dispatched * 1000) if self._dispatched else 0.0,
+            "p95_wait_ms": p95 * 1000,
+            "max_wait_ms": (waits[-1] * 1000) if waits else 0.0,
+        }
+
+    def _find_victim(self, priority: int) -> Optional[object]:
+        """
+        Elige la tarea a descartar cuando la cola está llena.
+
+        Args:
+            priority: Prioridad de la tarea que se quiere encolar
+
+        Returns:
+            Tarea a descartar o None si ninguna es prescindible
+        """
+        for task in self._tasks.values():
+            if task.force_reload and task.priority <= priority:
+                return task
+        for task in self._tasks.values():
+            if task.priority < priority:
+                return task
+        return None
@@ -15,6 +15,7 @@ from PySide6.QtGui import QPixmap, QPainter, QColor
 import logging
 
 from src.models.camera import Camera
+from src.utils.image_loader import PRIORITY_LIVE
 import config
 
 from typing import TYPE_CHECKING, Optional
@@ -141,22 +142,33 @@ class CameraWidget(QWidget):
             }
         """)
     
-    def set_image(self, pixmap: QPixmap):
+    def set_camera(self, camera: Camera):
+        """
+        Actualiza los datos mostrados tras un cambio del inventario.
+        
+        Args:
+            camera: Nueva versión de la cámara (mismo ID)
+        """
+        self.camera = camera
+        self.name_label.setText(camera.nombre)
+        self.address_label.setText(camera.direccion)
+        self.zone_label.setText(f"📍 {camera.get_zona_from_direccion()}")
+    
+    def set_image(self, pixmap: QPixmap, scaled: Optional[QPixmap] = None):
         """
         Establece la imagen de la cámara.
         
         Args:
             pixmap: Imagen a mostrar
+            scaled: Imagen ya escalada al tamaño de la miniatura, si está disponible
         """
         if pixmap and not pixmap.isNull():
             self.current_pixmap = pixmap
-            # Escalar manteniendo aspecto
-            scaled_pixmap = pixmap.scaled(
-                self.image_label.size(),
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation
-            )
-            self.image_label.setPixmap(scaled_pixmap)
+            if scaled is None:
+                # Escalado rápido provisional hasta recibir el escalado del hilo de trabajo
+                width, height = self.thumbnail_size
+                scaled = pixmap.scaled(QSize(width, height), Qt.KeepAspectRatio, Qt.FastTransformation)
+            self.image_label.setPixmap(scaled)
         else:
             self.image_label.setText("❌ Error cargando imagen")
     
@@ -196,22 +208,6 @@ class CameraWidget(QWidget):
         """
         self.undock_requested.emit(self.camera.id)
 
-    
-    def resizeEvent(self, event):
-        """
-        Maneja el redimensionamiento del widget.
-        """
-        super().resizeEvent(event)
-        
-        # Reescalar imagen si existe
-        if self.current_pixmap:
-            scaled_pixmap = self.current_pixmap.scaled(
-                self.image_label.size(),
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation
-            )
-            self.image_label.setPixmap(scaled_pixmap)
-
 
 class CameraListItem(QWidget):
     """
@@ -233,6 +229,7 @@ class CameraListItem(QWidget):
         """
         super().__init__(parent)
         self.camera = camera
+        self.has_thumbnail = False
         
         self._setup_ui()
     
@@ -245,7 +242,7 @@ class CameraListItem(QWidget):
         
         # Thumbnail pequeño
         self.thumbnail_label = QLabel()
-        self.thumbnail_label.setFixedSize(80, 60)
+        self.thumbnail_label.setFixedSize(*config.LIST_THUMBNAIL_SIZE)
         self.thumbnail_label.setAlignment(Qt.AlignCenter)
         self.thumbnail_label.setStyleSheet("""
             QLabel {
@@ -285,20 +282,34 @@ class CameraListItem(QWidget):
         # Hacer clickeable
         self.setCursor(Qt.PointingHandCursor)
     
-    def set_thumbnail(self, pixmap: QPixmap):
+    def set_camera(self, camera: Camera):
+        """
+        Actualiza los datos mostrados tras un cambio del inventario.
+        
+        Args:
+            camera: Nueva versión de la cámara (mismo ID)
+        """
+        self.camera = camera
+        self.name_label.setText(camera.nombre)
+        self.address_label.setText(camera.direccion)
+    
+    def set_thumbnail(self, pixmap: QPixmap, scaled: Optional[QPixmap] = None):
         """
         Establece la miniatura.
         
         Args:
             pixmap: Imagen miniatura
+            scaled: Imagen ya escalada al tamaño de la miniatura, si está disponible
         """
         if pixmap and not pixmap.isNull():
-            scaled = pixmap.scaled(
-                self.thumbnail_label.size(),
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation
-            )
+            if scaled is None:
+                scaled = pixmap.scaled(
+                    self.thumbnail_label.size(),
+                    Qt.KeepAspectRatio,
+                    Qt.FastTransformation
+                )
             self.thumbnail_label.setPixmap(scaled)
+            self.has_thumbnail = True
     
     def mousePressEvent(self, event):
         """
@@ -342,6 +353,10 @@ class CameraDetailDialog(QDialog):
         self.current_pixmap = None
         self.is_paused = False
         self.auto_refresh_timer = QTimer()
+        self.rescale_timer = QTimer(self)
+        self.rescale_timer.setSingleShot(True)
+        self.rescale_timer.setInterval(config.IMAGE_RESCALE_DELAY_MS)
+        self.rescale_timer.timeout.connect(self._request_scaled_image)
         self.current_refresh_interval = config.IMAGE_REFRESH_INTERVAL  # Guardar intervalo actual
         self.is_favorite = self.controller.is_favorite(self.camera.id)
         self.favorite_btn: Optional[QPushButton] = None
@@ -508,6 +523,8 @@ class CameraDetailDialog(QDialog):
         Conecta las señales del image loader.
         """
         self.image_loader.image_loaded.connect(self._on_image_loaded)
+        self.image_loader.image_unchanged.connect(self._on_image_unchanged)
+        self.image_loader.image_scaled.connect(self._on_image_scaled)
         self.image_loader.image_error.connect(self._on_image_error)
         self.controller.favorite_toggled.connect(self._on_favorite_toggled)
 
@@ -562,7 +579,7 @@ class CameraDetailDialog(QDialog):
         """
         if self.camera.url_imagen:
             self.status_label.setText("Estado: Cargando...")
-            self.image_loader.load_image(self.camera.id, self.camera.url_imagen, force_reload)
+            self.image_loader.load_image(self.camera.id, self.camera.url_imagen, force_reload, PRIORITY_LIVE)
     
     def _manual_refresh(self):
         """
@@ -577,8 +594,14 @@ class CameraDetailDialog(QDialog):
         Actualización automática por timer.
         """
         if not self.is_paused:
+            delay = self.image_loader.refresh_delay(self.camera.id, self.current_refresh_interval)
+            if delay > 0:
+                # Aún no se espera imagen nueva: se revisa justo después del cambio previsto
+                self.auto_refresh_timer.start(int(delay * 1000))
+                return
             logger.debug(f"Auto-refresh de cámara {self.camera.id}")
             self._load_image(force_reload=True)
+            self.auto_refresh_timer.start(self.current_refresh_interval * 1000)
     
     def _toggle_pause(self, checked):
         """
@@ -693,14 +716,7 @@ class CameraDetailDialog(QDialog):
         if camera_id == self.camera.id:
             if pixmap and not pixmap.isNull():
                 self.current_pixmap = pixmap
-                
-                # Escalar manteniendo aspecto
-                scaled_pixmap = pixmap.scaled(
-                    self.image_label.size(),
-                    Qt.KeepAspectRatio,
-                    Qt.SmoothTransformation
-                )
-                self.image_label.setPixmap(scaled_pixmap)
+                self._show_image()
                 
                 from datetime import datetime
                 timestamp = datetime.now().strftime("%H:%M:%S")
@@ -714,6 +730,68 @@ class CameraDetailDialog(QDialog):
                 self.save_btn.setEnabled(True)
                 logger.debug(f"Imagen cargada para cámara {camera_id}")
     
+    def _on_image_unchanged(self, camera_id: int):
+        """
+        Callback cuando la imagen no ha cambiado desde la última descarga.
+        
+        Args:
+            camera_id: ID de la cámara
+        """
+        if camera_id != self.camera.id:
+            return
+        
+        if self.current_pixmap is None:
+            pixmap = self.image_loader.get_cached_image(camera_id)
+            if pixmap:
+                self._on_image_loaded(camera_id, pixmap)
+            return
+        
+        from datetime import datetime
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        self.status_label.setText(f"Estado: Sin cambios | Última comprobación: {timestamp}")
+    
+    def _display_size(self) -> tuple:
+        """Tamaño (ancho, alto) del área donde se muestra la imagen."""
+        return (self.image_label.width(), self.image_label.height())
+    
+    def _show_image(self):
+        """
+        Muestra la imagen actual escalada al área disponible.
+        
+        Usa la variante escalada en segundo plano si existe; si no, pinta un
+        escalado rápido provisional y espera a la señal image_scaled.
+        """
+        if not self.current_pixmap:
+            return
+        
+        scaled = self.image_loader.get_scaled_pixmap(self.camera.id, self._display_size())
+        if scaled is None:
+            scaled = self.current_pixmap.scaled(
+                self.image_label.size(),
+                Qt.KeepAspectRatio,
+                Qt.FastTransformation
+            )
+        self.image_label.setPixmap(scaled)
+    
+    def _request_scaled_image(self):
+        """
+        Registra el tamaño actual para las próximas descargas y pide su escalado.
+        """
+        self.image_loader.set_target_size("detalle", self._display_size(), self.camera.id)
+        self._show_image()
+    
+    def _on_image_scaled(self, camera_id: int, size: tuple, pixmap: QPixmap):
+        """
+        Callback cuando está lista una variante escalada de la imagen.
+        
+        Args:
+            camera_id: ID de la cámara
+            size: Tamaño al que se escaló
+            pixmap: Imagen escalada
+        """
+        if camera_id == self.camera.id and self.current_pixmap and size == self._display_size():
+            self.image_label.setPixmap(pixmap)
+    
     def _on_image_error(self, camera_id: int, error_msg: str):
         """
         Callback cuando falla la carga.
@@ -734,14 +812,15 @@ class CameraDetailDialog(QDialog):
         """
         super().resizeEvent(event)
         
-        # Reescalar imagen si existe
+        # Escalado rápido mientras se redimensiona; el fino se pide al terminar
         if self.current_pixmap:
             scaled_pixmap = self.current_pixmap.scaled(
                 self.image_label.size(),
                 Qt.KeepAspectRatio,
-                Qt.SmoothTransformation
+                Qt.FastTransformation
             )
             self.image_label.setPixmap(scaled_pixmap)
+        self.rescale_timer.start()
     
     def closeEvent(self, event):
         """
@@ -749,9 +828,17 @@ class CameraDetailDialog(QDialog):
         """
         # Detener el timer al cerrar
         self.auto_refresh_timer.stop()
+        self.rescale_timer.stop()
+        self.image_loader.clear_target_size("detalle", self.camera.id)
+        # El image loader es compartido: sin desconectar, el diálogo cerrado
+        # seguiría recibiendo (y procesando) las imágenes de todas las cámaras
         try:
+            self.image_loader.image_loaded.disconnect(self._on_image_loaded)
+            self.image_loader.image_unchanged.disconnect(self._on_image_unchanged)
+            self.image_loader.image_scaled.disconnect(self._on_image_scaled)
+            self.image_loader.image_error.disconnect(self._on_image_error)
             self.controller.favorite_toggled.disconnect(self._on_favorite_toggled)
-        except TypeError:
+        except (TypeError, RuntimeError):
             pass
         logger.info(f"Cerrando vista detalle de cámara {self.camera.id}")
         event.accept()
@@ -12,6 +12,7 @@ import logging
 from datetime import datetime
 
 from src.models.camera import Camera
+from src.utils.image_loader import PRIORITY_LIVE
 import config
 
 logger = logging.getLogger(__name__)
@@ -29,11 +30,17 @@ class FloatingCameraWindow(QMainWindow):
         self.image_loader = image_loader
         self.current_pixmap = None
         self.refresh_timer = QTimer(self)
+        self.rescale_timer = QTimer(self)
+        self.rescale_timer.setSingleShot(True)
+        self.rescale_timer.setInterval(config.IMAGE_RESCALE_DELAY_MS)
+        self.rescale_timer.timeout.connect(self._request_scaled_image)
         self.current_interval = config.IMAGE_REFRESH_INTERVAL
         
         self.setAttribute(Qt.WA_DeleteOnClose)
         self._setup_ui()
         self._connect_signals()
+        # Mantener la imagen en caché mientras la ventana esté abierta
+        self.image_loader.pin_image(self.camera.id, "flotante")
         
         # Cargar imagen inicial e iniciar timer
         self._load_image(force_reload=True)
@@ -78,33 +85,70 @@ class FloatingCameraWindow(QMainWindow):
         
         self.setCentralWidget(central_widget)
         
+    def set_camera(self, camera: Camera):
+        """Actualiza la cámara tras un cambio del inventario y recarga su imagen."""
+        url_changed = camera.url_imagen != self.camera.url_imagen
+        self.camera = camera
+        self.setWindowTitle(f"📷 {camera.nombre}")
+        self.info_label.setText(camera.nombre)
+        if url_changed:
+            self._load_image(force_reload=True)
+        
     def _connect_signals(self):
         self.image_loader.image_loaded.connect(self._on_image_loaded)
+        self.image_loader.image_unchanged.connect(self._on_image_unchanged)
+        self.image_loader.image_scaled.connect(self._on_image_scaled)
         self.image_loader.image_error.connect(self._on_image_error)
         
     def _load_image(self, force_reload=False):
         if self.camera.url_imagen:
-            self.image_loader.load_image(self.camera.id, self.camera.url_imagen, force_reload)
+            self.image_loader.load_image(self.camera.id, self.camera.url_imagen, force_reload, PRIORITY_LIVE)
             
     def _auto_refresh(self):
+        delay = self.image_loader.refresh_delay(self.camera.id, self.current_interval)
+        if delay > 0:
+            # Aún no se espera imagen nueva: se revisa justo después del cambio previsto
+            self.refresh_timer.start(int(delay * 1000))
+            return
         self._load_image(force_reload=True)
+        self.refresh_timer.start(self.current_interval * 1000)
         
     def _on_image_loaded(self, camera_id: int, pixmap: QPixmap):
         if camera_id == self.camera.id:
             self.current_pixmap = pixmap
             self._update_display()
             
+    def _on_image_unchanged(self, camera_id: int):
+        if camera_id == self.camera.id and self.current_pixmap is None:
+            self.current_pixmap = self.image_loader.get_cached_image(camera_id)
+            self._update_display()
+            
+    def _on_image_scaled(self, camera_id: int, size: tuple, pixmap: QPixmap):
+        if camera_id == self.camera.id and self.current_pixmap and size == self._display_size():
+            self.image_label.setPixmap(pixmap)
+            
     def _on_image_error(self, camera_id: int, error_msg: str):
         if camera_id == self.camera.id:
             self.image_label.setText(f"❌ Error\n{error_msg}")
             
-    def _update_display(self):
+    def _display_size(self) -> tuple:
+        return (self.image_label.width(), self.image_label.height())
+        
+    def _request_scaled_image(self):
+        """Registra el tamaño de la ventana y pide el escalado fino en segundo plano."""
+        self.image_loader.set_target_size("flotante", self._display_size(), self.camera.id)
+        self._update_display()
+            
+    def _update_display(self, fast: bool = False):
         if self.current_pixmap:
-            scaled = self.current_pixmap.scaled(
-                self.image_label.size(),
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation
-            )
+            scaled = None if fast else self.image_loader.get_scaled_pixmap(self.camera.id, self._display_size())
+            if scaled is None:
+                # Provisional hasta que llegue la variante escalada del hilo de trabajo
+                scaled = self.current_pixmap.scaled(
+                    self.image_label.size(),
+                    Qt.KeepAspectRatio,
+                    Qt.FastTransformation
+                )
             self.image_label.setPixmap(scaled)
             
             # Actualizar tooltip con hora de actualización
@@ -113,7 +157,8 @@ class FloatingCameraWindow(QMainWindow):
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
-        self._update_display()
+        self._update_display(fast=True)
+        self.rescale_timer.start()
         
     def contextMenuEvent(self, event: QContextMenuEvent):
         """Menú contextual para cambiar el intervalo."""
@@ -162,8 +207,13 @@ class FloatingCameraWindow(QMainWindow):
 
     def closeEvent(self, event):
         self.refresh_timer.stop()
+        self.rescale_timer.stop()
+        self.image_loader.unpin_image(self.camera.id, "flotante")
+        self.image_loader.clear_target_size("flotante", self.camera.id)
         try:
             self.image_loader.image_loaded.disconnect(self._on_image_loaded)
+            self.image_loader.image_unchanged.disconnect(self._on_image_unchanged)
+            self.image_loader.image_scaled.disconnect(self._on_image_scaled)
             self.image_loader.image_error.disconnect(self._on_image_error)
         except (TypeError, RuntimeError):
             pass
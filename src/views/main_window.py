@@ -12,7 +12,7 @@ from PySide6.QtWidgets import (
     QSystemTrayIcon, QMenu
 )
 
-from PySide6.QtCore import Qt, QUrl
+from PySide6.QtCore import Qt, QUrl, QTimer, QPoint, QRect
 from PySide6.QtGui import QDesktopServices
 import logging
 from typing import Optional
@@ -60,9 +60,23 @@ class MainWindow(QMainWindow):
         self.floating_cameras = {}  # camera_id -> FloatingCameraWindow
         self.tray_icon = None
         
+        # Recalcular las cámaras visibles tras scroll o redimensionado (con espera)
+        self.visibility_timer = QTimer(self)
+        self.visibility_timer.setSingleShot(True)
+        self.visibility_timer.setInterval(config.VISIBILITY_UPDATE_DELAY_MS)
+        self.visibility_timer.timeout.connect(self._update_visible_cameras)
+        self.visibility_retries = 0  # Recálculos seguidos con widgets aún sin layout
+        
+        # Búsqueda con espera: se filtra al dejar de teclear, no en cada tecla
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(config.SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self._apply_search)
+        
         self._setup_ui()
         self._setup_tray_icon()
         self._connect_signals()
+        self._register_thumbnail_sizes()
 
         self._apply_theme()
         self._update_timelapse_indicator(self.controller.get_timelapse_sessions())
@@ -406,8 +420,8 @@ class MainWindow(QMainWindow):
         layout.addWidget(zone_label)
         
         self.zone_combo = QComboBox()
-        self.zone_combo.addItem("Todas")
-        self.zone_combo.currentTextChanged.connect(self._on_zone_filter_changed)
+        self.zone_combo.addItem("Todas", None)
+        self.zone_combo.currentIndexChanged.connect(self._on_zone_filter_changed)
         layout.addWidget(self.zone_combo, stretch=1)
         
         layout.addSpacing(20)
@@ -515,6 +529,7 @@ class MainWindow(QMainWindow):
         self.list_container.setLayout(self.list_layout)
         
         scroll.setWidget(self.list_container)
+        scroll.verticalScrollBar().valueChanged.connect(self._schedule_visibility_update)
         
         return scroll
     
@@ -539,6 +554,7 @@ class MainWindow(QMainWindow):
         self.grid_container.setLayout(self.grid_layout)
         
         scroll.setWidget(self.grid_container)
+        scroll.verticalScrollBar().valueChanged.connect(self._schedule_visibility_update)
         
         return scroll
 
@@ -572,6 +588,7 @@ class MainWindow(QMainWindow):
 
         self.favorites_container.setLayout(container_layout)
         scroll.setWidget(self.favorites_container)
+        scroll.verticalScrollBar().valueChanged.connect(self._schedule_visibility_update)
 
         self.favorites_grid_widget.hide()
 
@@ -582,10 +599,13 @@ class MainWindow(QMainWindow):
         Conecta las señales del controlador.
         """
         self.controller.data_loaded.connect(self._on_data_loaded)
+        self.controller.dataset_changed.connect(self._on_dataset_changed)
         self.controller.cameras_updated.connect(self._update_camera_display)
         self.controller.loading_progress.connect(self._update_status)
         self.controller.refresh_progress.connect(self._on_refresh_progress)
         self.controller.image_loader.image_loaded.connect(self._on_image_loaded)
+        self.controller.image_loader.image_unchanged.connect(self._on_image_unchanged)
+        self.controller.image_loader.image_scaled.connect(self._on_image_scaled)
         self.controller.image_loader.image_error.connect(self._on_image_error)
         self.controller.favorites_updated.connect(self._on_favorites_updated)
         self.controller.favorite_toggled.connect(self._on_favorite_toggled)
@@ -667,11 +687,7 @@ class MainWindow(QMainWindow):
             success: True si la carga fue exitosa
         """
         if success:
-            # Poblar combo de zonas
-            zonas = ["Todas"] + self.controller.get_zonas()
-            self.zone_combo.clear()
-            self.zone_combo.addItems(zonas)
-            
+            self._populate_zone_combo()
             self.status_bar.showMessage("Datos cargados correctamente", 3000)
         else:
             QMessageBox.critical(
@@ -682,6 +698,111 @@ class MainWindow(QMainWindow):
             )
             self.status_bar.showMessage("Error al cargar datos")
     
+    def _on_dataset_changed(self, diff):
+        """
+        Callback cuando la revalidación en segundo plano trae datos distintos.
+        
+        Las vistas se actualizan en el sitio: se quitan los widgets de las
+        cámaras eliminadas, se crean los de las nuevas y se refrescan los de
+        las modificadas, sin reconstruir el resto.
+        
+        Args:
+            diff: DatasetDiff con las cámaras añadidas, eliminadas y modificadas
+        """
+        self._populate_zone_combo()
+        changed = {camera.id: camera for camera in self.controller.store.select_ids(diff.changed)}
+        
+        for camera_id in diff.removed:
+            window = self.floating_cameras.get(camera_id)
+            if window:
+                window.close()
+        for camera_id, window in list(self.floating_cameras.items()):
+            if camera_id in changed:
+                window.set_camera(changed[camera_id])
+        
+        for widgets in self.camera_widgets_by_view.values():
+            for camera_id, camera in changed.items():
+                widget = widgets.get(camera_id)
+                if widget:
+                    url_changed = widget.camera.url_imagen != camera.url_imagen
+                    widget.set_camera(camera)
+                    if url_changed:
+                        self.controller.load_camera_image(camera, force_reload=True)
+        
+        if self.current_view_mode in ("lista", "cuadricula"):
+            self._apply_dataset_diff(diff)
+        elif self.current_view_mode == "mapa":
+            cameras = self.controller.get_filtered_cameras()
+            self.map_view.set_cameras(cameras)
+            self.camera_count_label.setText(f"{len(cameras)} cámaras en el mapa")
+        
+        self.status_bar.showMessage(f"Datos de cámaras actualizados: {diff.summary()}", 5000)
+    
+    def _apply_dataset_diff(self, diff):
+        """
+        Aplica un DatasetDiff a la vista de lista o cuadrícula actual.
+        
+        Se quitan los widgets de las cámaras eliminadas y se crean solo los de
+        las añadidas que pasan el filtro, insertados en su posición. La vista
+        solo se reconstruye si cambió el orden de las cámaras que ya estaban.
+        
+        Args:
+            diff: DatasetDiff con las cámaras añadidas, eliminadas y modificadas
+        """
+        view_key = self.current_view_mode
+        widgets = self.camera_widgets_by_view[view_key]
+        cameras = self.controller.get_filtered_cameras()
+        removed = set(diff.removed)
+        added = set(diff.added)
+        remaining = [camera_id for camera_id in widgets if camera_id not in removed]
+        if remaining != [camera_id for camera_id in cameras.ids().tolist() if camera_id not in added]:
+            self._update_camera_display(cameras)
+            return
+        
+        layout = self.list_layout if view_key == "lista" else self.grid_layout
+        for camera_id in removed.intersection(widgets):
+            widget = widgets.pop(camera_id)
+            layout.removeWidget(widget)
+            widget.deleteLater()
+        
+        # Widgets nuevos en su posición; el diccionario sigue el orden de la vista
+        ordered = {}
+        thumbnail_size = config.THUMBNAIL_SIZES[self.thumbnail_zoom_level]
+        for position, camera in enumerate(cameras):
+            widget = widgets.get(camera.id)
+            if widget is None:
+                if view_key == "lista":
+                    widget = self._create_list_item(camera)
+                    self.list_layout.insertWidget(position, widget)
+                else:
+                    widget = self._create_grid_widget(camera, thumbnail_size)
+            ordered[camera.id] = widget
+        widgets.clear()
+        widgets.update(ordered)
+        
+        if view_key == "cuadricula":
+            self._relayout_grid("cuadricula", self.grid_layout, self.grid_view)
+        else:
+            self._schedule_visibility_update()
+        self.camera_count_label.setText(f"{len(cameras)} cámaras")
+    
+    def _populate_zone_combo(self):
+        """
+        Puebla el combo de zonas (con su número de cámaras) sin disparar filtros.
+        """
+        current_zona = self.zone_combo.currentData()
+        self.zone_combo.blockSignals(True)
+        self.zone_combo.clear()
+        self.zone_combo.addItem("Todas", None)
+        for zona, count in self.controller.get_zona_counts().items():
+            self.zone_combo.addItem(f"{zona} ({count})", zona)
+        index = self.zone_combo.findData(current_zona) if current_zona is not None else 0
+        self.zone_combo.setCurrentIndex(max(index, 0))
+        self.zone_combo.blockSignals(False)
+        if index < 0:
+            # La zona elegida ya no existe en los datos nuevos
+            self.controller.filter_by_zona(None)
+    
     def _update_camera_display(self, cameras: list):
         """
         Actualiza la visualización de cámaras.
@@ -708,8 +829,62 @@ class MainWindow(QMainWindow):
         else:
             self._populate_grid_view(cameras)
 
-        for camera in cameras[:20]:  # Limitar inicial para rendimiento
-            self.controller.load_camera_image(camera)
+        # Las imágenes se piden según lo que quede en pantalla tras el layout
+        self._schedule_visibility_update()
+    
+    def _schedule_visibility_update(self, *_args):
+        """Programa el recálculo de las cámaras visibles."""
+        self.visibility_retries = 0
+        self.visibility_timer.start()
+    
+    def _update_visible_cameras(self):
+        """
+        Calcula qué cámaras de la vista actual están en pantalla o cerca.
+        
+        Se informa al controlador para que cargue primero las visibles y
+        cancele las descargas en cola de las que han salido de pantalla.
+        """
+        scroll_areas = {
+            "lista": self.list_view,
+            "cuadricula": self.grid_view,
+            "favoritos": self.favorites_view,
+        }
+        scroll_area = scroll_areas.get(self.current_view_mode)
+        if scroll_area is None:
+            # Vista de mapa: no hay miniaturas en pantalla
+            self.controller.set_visible_cameras([])
+            return
+        if not scroll_area.isVisible():
+            # Ventana minimizada u oculta en la bandeja: se conserva lo último conocido
+            return
+        
+        viewport = scroll_area.viewport()
+        visible_rect = viewport.rect()
+        margin = int(visible_rect.height() * config.VISIBILITY_PREFETCH_SCREENS)
+        nearby_rect = visible_rect.adjusted(0, -margin, 0, margin)
+        
+        visible: list[Camera] = []
+        nearby: list[Camera] = []
+        pending_layout = False
+        for widget in self.camera_widgets_by_view.get(self.current_view_mode, {}).values():
+            if widget.height() == 0:
+                # Widget aún sin layout (recién creado u oculto): se omite
+                pending_layout = True
+                continue
+            widget_rect = QRect(widget.mapTo(viewport, QPoint(0, 0)), widget.size())
+            if widget_rect.intersects(visible_rect):
+                visible.append(widget.camera)
+            elif widget_rect.intersects(nearby_rect):
+                nearby.append(widget.camera)
+        
+        logger.debug(f"Cámaras visibles: {len(visible)}, cercanas: {len(nearby)}")
+        self.controller.set_visible_cameras(visible, nearby)
+        
+        # Se vuelve a mirar unas pocas veces por si los widgets nuevos reciben
+        # su tamaño; uno que nunca lo recibe no mantiene el timer vivo
+        if pending_layout and self.visibility_retries < config.VISIBILITY_LAYOUT_RETRIES:
+            self.visibility_retries += 1
+            self.visibility_timer.start()
     
     def _populate_list_view(self, cameras: list):
         """
@@ -719,15 +894,20 @@ class MainWindow(QMainWindow):
             cameras: Lista de cámaras
         """
         for camera in cameras:
-            item_widget = CameraListItem(camera)
-            item_widget.camera_clicked.connect(self._show_camera_details)
-            item_widget.undock_requested.connect(self._handle_undock_request)
+            item_widget = self._create_list_item(camera)
             self.list_layout.addWidget(item_widget)
 
             self.camera_widgets_by_view["lista"][camera.id] = item_widget
 
         self.list_layout.addStretch()
     
+    def _create_list_item(self, camera: Camera) -> CameraListItem:
+        """Crea el elemento de la vista de lista de una cámara."""
+        item_widget = CameraListItem(camera)
+        item_widget.camera_clicked.connect(self._show_camera_details)
+        item_widget.undock_requested.connect(self._handle_undock_request)
+        return item_widget
+    
     def _populate_grid_view(self, cameras: list):
         """
         Puebla la vista de cuadrícula con cámaras.
@@ -742,15 +922,18 @@ class MainWindow(QMainWindow):
             row = idx // cols
             col = idx % cols
 
-            camera_widget = CameraWidget(camera, thumbnail_size=thumbnail_size)
-            camera_widget.camera_clicked.connect(self._show_camera_details)
-            camera_widget.image_reload_requested.connect(self._request_image_reload)
-            camera_widget.undock_requested.connect(self._handle_undock_request)
-
-
+            camera_widget = self._create_grid_widget(camera, thumbnail_size)
             self.grid_layout.addWidget(camera_widget, row, col)
             self.camera_widgets_by_view["cuadricula"][camera.id] = camera_widget
 
+    def _create_grid_widget(self, camera: Camera, thumbnail_size) -> CameraWidget:
+        """Crea la miniatura de la vista de cuadrícula de una cámara."""
+        camera_widget = CameraWidget(camera, thumbnail_size=thumbnail_size)
+        camera_widget.camera_clicked.connect(self._show_camera_details)
+        camera_widget.image_reload_requested.connect(self._request_image_reload)
+        camera_widget.undock_requested.connect(self._handle_undock_request)
+        return camera_widget
+
     def _populate_favorites_view(self, cameras: list[Camera]):
         """Genera la cuadrícula de cámaras favoritas."""
         self._clear_camera_widgets("favoritos")
@@ -781,6 +964,8 @@ class MainWindow(QMainWindow):
             self.camera_widgets_by_view["favoritos"][camera.id] = camera_widget
             # Cargar imagen siempre: pocas cámaras y asegura miniaturas frescas
             self.controller.load_camera_image(camera)
+
+        self._schedule_visibility_update()
     
     def _request_image_reload(self, camera_id: int):
         """Solicita recargar la imagen de una cámara concreta."""
@@ -812,6 +997,8 @@ class MainWindow(QMainWindow):
             col = idx % columns
             layout.addWidget(widget, row, col)
 
+        self._schedule_visibility_update()
+
     def _clear_camera_widgets(self, view: str | None = None):
         """Limpia los widgets asociados a la vista indicada."""
         targets = [view] if view else ["lista", "cuadricula", "favoritos"]
@@ -894,12 +1081,62 @@ class MainWindow(QMainWindow):
             camera_id: ID de la cámara
             pixmap: Imagen cargada
         """
+        image_loader = self.controller.image_loader
         for widgets in self.camera_widgets_by_view.values():
             widget = widgets.get(camera_id)
             if isinstance(widget, CameraWidget):
-                widget.set_image(pixmap)
+                widget.set_image(pixmap, image_loader.get_scaled_pixmap(camera_id, widget.thumbnail_size))
             elif isinstance(widget, CameraListItem):
-                widget.set_thumbnail(pixmap)
+                widget.set_thumbnail(pixmap, image_loader.get_scaled_pixmap(camera_id, config.LIST_THUMBNAIL_SIZE))
+    
+    def _on_image_scaled(self, camera_id: int, size: tuple, scaled):
+        """
+        Callback cuando termina en segundo plano el escalado de una miniatura.
+        
+        Args:
+            camera_id: ID de la cámara
+            size: Tamaño al que se escaló
+            scaled: Imagen escalada
+        """
+        for widgets in self.camera_widgets_by_view.values():
+            widget = widgets.get(camera_id)
+            if isinstance(widget, CameraWidget) and widget.current_pixmap and tuple(widget.thumbnail_size) == size:
+                widget.set_image(widget.current_pixmap, scaled)
+            elif isinstance(widget, CameraListItem) and widget.has_thumbnail and config.LIST_THUMBNAIL_SIZE == size:
+                widget.set_thumbnail(scaled, scaled)
+    
+    def _register_thumbnail_sizes(self):
+        """Indica al cargador los tamaños de miniatura a generar en segundo plano."""
+        image_loader = self.controller.image_loader
+        image_loader.set_target_size("cuadricula", config.THUMBNAIL_SIZES[self.thumbnail_zoom_level])
+        image_loader.set_target_size("lista", config.LIST_THUMBNAIL_SIZE)
+    
+    def _on_image_unchanged(self, camera_id: int):
+        """
+        Callback cuando la imagen de una cámara no ha cambiado en el servidor.
+        
+        Solo se repinta en los widgets que todavía no muestran ninguna imagen.
+        
+        Args:
+            camera_id: ID de la cámara
+        """
+        pixmap = None
+        for widgets in self.camera_widgets_by_view.values():
+            widget = widgets.get(camera_id)
+            if isinstance(widget, CameraWidget) and widget.current_pixmap is None:
+                pixmap = pixmap or self.controller.image_loader.get_cached_image(camera_id)
+                if pixmap:
+                    widget.set_image(
+                        pixmap,
+                        self.controller.image_loader.get_scaled_pixmap(camera_id, widget.thumbnail_size)
+                    )
+            elif isinstance(widget, CameraListItem) and not widget.has_thumbnail:
+                pixmap = pixmap or self.controller.image_loader.get_cached_image(camera_id)
+                if pixmap:
+                    widget.set_thumbnail(
+                        pixmap,
+                        self.controller.image_loader.get_scaled_pixmap(camera_id, config.LIST_THUMBNAIL_SIZE)
+                    )
     
     def _on_image_error(self, camera_id: int, error_msg: str):
         """
@@ -975,6 +1212,7 @@ class MainWindow(QMainWindow):
             self.camera_count_label.setText(f"{count} {label}")
         elif view_mode == "mapa":
             self.stacked_widget.setCurrentIndex(3)
+            self._schedule_visibility_update()
             self.zoom_controls.setVisible(False)
             # Actualizar cámaras en la vista de mapa
             cameras = self.controller.get_filtered_cameras()
@@ -993,27 +1231,34 @@ class MainWindow(QMainWindow):
         Args:
             text: Texto de búsqueda
         """
-        self.controller.search_cameras(text)
+        self.search_timer.start()
+    
+    def _apply_search(self):
+        """Aplica la búsqueda cuando el usuario deja de escribir."""
+        self.controller.search_cameras(self.search_input.text())
     
-    def _on_zone_filter_changed(self, zone: str):
+    def _on_zone_filter_changed(self, index: int):
         """
         Callback cuando cambia el filtro de zona.
         
         Args:
-            zone: Zona seleccionada
+            index: Índice seleccionado en el combo (el dato es la zona, None = todas)
         """
-        if zone == "Todas":
-            self.controller.filter_by_zona(None)
-        else:
-            self.controller.filter_by_zona(zone)
+        self.controller.filter_by_zona(self.zone_combo.itemData(index))
     
     def _clear_filters(self):
         """
         Limpia todos los filtros.
         """
+        # Se limpian los controles sin disparar sus filtros y se quita todo de una vez
+        for widget in (self.search_input, self.zone_combo):
+            widget.blockSignals(True)
         self.search_input.clear()
         self.zone_combo.setCurrentIndex(0)
-        self.controller.filter_by_zona(None)
+        for widget in (self.search_input, self.zone_combo):
+            widget.blockSignals(False)
+        self.search_timer.stop()
+        self.controller.clear_filters()
     
     def _zoom_in(self):
         """
@@ -1037,6 +1282,8 @@ class MainWindow(QMainWindow):
         """
         Actualiza el zoom de las miniaturas y reorganiza la cuadrícula.
         """
+        self._register_thumbnail_sizes()
+        
         # Actualizar indicador
         self.zoom_indicator.setText(f"{self.thumbnail_zoom_level}/5")
         
@@ -1359,10 +1606,7 @@ class MainWindow(QMainWindow):
         Returns:
             Objeto Camera o None
         """
-        for camera in self.controller.get_all_cameras():
-            if camera.id == camera_id:
-                return camera
-        return None
+        return self.controller.get_camera(camera_id)
     
     def closeEvent(self, event):
         """
@@ -1384,7 +1628,7 @@ class MainWindow(QMainWindow):
 
     def _exit_app(self):
         """Cierre definitivo de la aplicación."""
-        self.controller.stop_auto_refresh()
+        self.controller.shutdown()
         # Cerrar todas las cámaras flotantes
         for window in list(self.floating_cameras.values()):
             window.close()
@@ -1467,3 +1711,5 @@ class MainWindow(QMainWindow):
             self._relayout_grid("cuadricula", self.grid_layout, self.grid_view)
         elif self.current_view_mode == "favoritos":
             self._relayout_grid("favoritos", self.favorites_layout, self.favorites_view)
+        else:
+            self._schedule_visibility_update()
@@ -23,6 +23,7 @@ import folium
 import folium
 
 from src.models.camera import Camera
+from src.models.camera_store import CameraView
 from src.utils.coordinate_converter import get_converter
 import config
 
@@ -196,6 +197,9 @@ class MapView(QWidget):
         if district_id is None:
             # Mostrar todas
             self.filtered_cameras = self.cameras.copy()
+        elif isinstance(self.cameras, CameraView):
+            # Índice de distritos precalculado del almacén
+            self.filtered_cameras = self.cameras & self.cameras.store.filter_distrito(district_id)
         else:
             # Filtrar por distrito
             self.filtered_cameras = [
@@ -6,19 +6,32 @@ y evitar congelar la interfaz de usuario durante operaciones bloqueantes.
 """
 
 import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Any, Callable, List, Optional, Tuple
 import tempfile
 import json
-import requests
+import time
 import folium
 from folium import plugins
 
 from PySide6.QtCore import QObject, Signal
 
 from src.models.camera import Camera
+from src.utils.async_fetcher import fetch_url
 from src.utils.data_loader import DataLoader
-from src.utils.coordinate_converter import get_converter
+from src.utils.layer_cache import SOURCE_NETWORK, LayerFetch, content_version, get_layer_cache
+from src.utils.coordinate_converter import assign_latlon, get_converter
+from src.utils.spatial_index import build_camera_index
+from src.utils.geometry_simplify import (
+    has_only_lines_or_polygons, simplify_geojson, to_topojson, tolerance_for_zoom, topojson_size,
+)
+from src.utils.map_markers import TemplateMarkers, awesome_icon
+from src.utils.map_fragments import (
+    MAP_ELEMENT_ID, SOURCE_FRAGMENT, CachedFragment, camera_fingerprint, fingerprint,
+    get_map_fragment_cache, render_fragment,
+)
 import config
 
 TRAFFIC_CUTS_URL = "https://datosabiertos.malaga.eu/recursos/transporte/trafico/da_cortesTrafico-4326.geojson"
@@ -33,6 +46,50 @@ WIFI_URL = "https://datosabiertos.malaga.eu/recursos/urbanismoEInfraestructura/s
 DOG_PARKS_URL = "https://datosabiertos.malaga.eu/recursos/ambiente/parquesCaninos/da_parquesCaninos-4326.geojson"
 # TAXIS_URL = "https://datosabiertos.malaga.eu/recursos/transporte/trafico/da_paradasTaxi-4326.geojson" # Currently failing
 
+# Capas genéricas (marcador + popup con campos del GeoJSON)
+BULK_LAYERS = [
+    {
+        'name': "🅿️ Aparcamientos",
+        'url': PARKING_URL,
+        'icon': 'parking',
+        'color': 'darkblue',
+        'fields': ['name', 'address', 'description', 'availabilitydefault'],
+        'aliases': ['Nombre', 'Dirección', 'Info', 'Plazas']
+    },
+    {
+        'name': "🏥 Desfibriladores",
+        'url': DEFIBR_URL,
+        'icon': 'heartbeat',
+        'color': 'red',
+        'fields': ['nombre', 'direccion', 'horarios', 'descripcion'],
+        'aliases': ['Ubicación', 'Dirección', 'Horario', 'Info']
+    },
+    {
+        'name': "🚰 Fuentes",
+        'url': FOUNTAINS_URL,
+        'icon': 'tint',
+        'color': 'cadetblue',
+        'fields': ['nombre'],
+        'aliases': ['Fuente']
+    },
+    {
+        'name': "📡 Wifi",
+        'url': WIFI_URL,
+        'icon': 'wifi',
+        'color': 'purple',
+        'fields': ['TOOLTIP', 'FINALIDAD'],
+        'aliases': ['Punto Wifi', 'Ubicación']
+    },
+    {
+        'name': "🐕 Parques Caninos",
+        'url': DOG_PARKS_URL,
+        'icon': 'paw',
+        'color': 'darkgreen',
+        'fields': ['NOMBRE', 'DIRECCION', 'HORARIOS'],
+        'aliases': ['Parque', 'Dirección', 'Horario']
+    }
+]
+
 # Mapping for flags (Name fragment -> ISO code)
 COUNTRY_FLAGS = {
     'Costa Rica': 'cr', 'Ecuador': 'ec', 'Mónaco': 'mc', 'Turquía': 'tr', 
@@ -44,14 +101,123 @@ COUNTRY_FLAGS = {
     'Albania': 'al', 'Reino Unido': 'gb', 'Polonia': 'pl', 'Italia': 'it'
 }
 
+# Renderizado por plantilla (config.MAP_RENDERER = "template"): cada marcador
+# es una fila de valores y el popup se rellena en el navegador al abrirlo
+CAMERA_MARKER_FIELDS = [
+    'lat', 'lon', 'icon', 'id', 'nombre', 'direccion', 'distrito',
+    'acceso', 'url_imagen', 'url', 'color', 'coords',
+]
+CAMERA_POPUP_TEMPLATE = """
+<div style="width: 300px; font-family: Arial, sans-serif;">
+    <h4 style="margin: 0 0 10px 0; color: {{color}};">📹 {{nombre}}</h4>
+    <div class="camera-player" style="margin-bottom: 10px;">
+        <img src="{{url_imagen}}" class="camera-live-feed" data-url="{{url_imagen}}"
+             style="width: 100%; border-radius: 4px; border: 1px solid #ddd; min-height: 150px; background: #f0f0f0;">
+        <div style="margin-top: 8px; display: flex; align-items: center; justify-content: space-between; background: #f1f2f6; padding: 6px 10px; border-radius: 4px;">
+            <span style="font-size: 12px; font-weight: bold; color: #2c3e50;">⏱️ Actualizar:</span>
+            <select class="camera-interval-select" style="font-size: 12px; padding: 2px 5px; border: 1px solid #bdc3c7; border-radius: 3px;">
+                <option value="1">1 s</option>
+                <option value="3">3 s</option>
+                <option value="5" selected>5 s</option>
+                <option value="10">10 s</option>
+                <option value="15">15 s</option>
+                <option value="20">20 s</option>
+            </select>
+        </div>
+    </div>
+    <p style="margin: 5px 0;"><strong>Ubicación:</strong><br>{{direccion}}</p>
+    <p style="margin: 5px 0;"><strong>Distrito:</strong> {{distrito}}</p>
+    {{#acceso}}<p style="margin: 5px 0;"><strong>Acceso:</strong> {{acceso}}</p>{{/acceso}}
+    <p style="margin: 10px 0 5px 0;">
+        <a href="{{url}}" target="_blank" style="color: #3498db;">🔗 Ver en web oficial</a>
+    </p>
+    <p style="margin: 5px 0;">
+        <a href="STREET_VIEW_URL" target="_blank" style="color: #e67e22; font-weight: bold;">
+            🚶 Ver en Street View
+        </a>
+    </p>
+    <p style="margin-top: 10px; font-size: 10px; color: #7f8c8d;">
+        ID: {{id}} | Coords: {{coords}}
+    </p>
+</div>
+""".replace("STREET_VIEW_URL", config.STREET_VIEW_URL_TEMPLATE.format(lat="{{lat}}", lon="{{lon}}"))
+CAMERA_ICONS = {
+    'distrito': awesome_icon('video-camera', 'red'),
+    'sin_distrito': awesome_icon('video-camera', 'blue'),
+}
+
+EMT_MARKER_FIELDS = ['lat', 'lon', 'icon', 'id', 'name', 'address', 'lines']
+EMT_POPUP_TEMPLATE = """
+<div style="font-family: Arial; min-width: 200px;">
+    <b>🚏 {{name}}</b><br>
+    <span style="font-size: 12px; color: #666;">ID: {{id}}</span><br>
+    <hr style="margin: 5px 0;">
+    📍 {{address}}<br>
+    <div style="margin-top:5px;">
+        <b>Autobuses:</b><br>
+        <span style="color: blue; font-weight: bold;">{{lines}}</span>
+    </div>
+</div>
+"""
+EMT_ICONS = {'bus': awesome_icon('bus', 'blue')}
+
 logger = logging.getLogger(__name__)
 
 
+def _geometry_vertices(geometry):
+    """
+    Recorre los vértices (lon, lat) de una geometría GeoJSON de cualquier tipo.
+    
+    Args:
+        geometry: Diccionario de geometría (puede ser None)
+        
+    Returns:
+        Generador de tuplas (lon, lat)
+    """
+    if not geometry:
+        return
+    if geometry.get('type') == 'GeometryCollection':
+        for child in geometry.get('geometries', []):
+            yield from _geometry_vertices(child)
+        return
+    
+    stack = [geometry.get('coordinates')]
+    while stack:
+        coords = stack.pop()
+        if not isinstance(coords, (list, tuple)) or not coords:
+            continue
+        if isinstance(coords[0], (int, float)):
+            if len(coords) >= 2:
+                yield coords[0], coords[1]
+        else:
+            stack.extend(coords)
+
+
+@dataclass(frozen=True)
+class LayerSource:
+    """
+    Capa superpuesta del mapa: de dónde se descarga y cómo se construye.
+    
+    Atributos:
+        name: Nombre de la capa (para logs)
+        url: URL del GeoJSON/JSON
+        timeout: Timeout de la descarga en segundos
+        build: Función que recibe el JSON y devuelve el FeatureGroup (o None)
+        ttl_hours: Horas que la copia en disco se usa sin revalidar
+    """
+    name: str
+    url: str
+    timeout: float
+    build: Callable[[Any], Any]
+    ttl_hours: float = config.MAP_LAYER_CACHE_TTL_HOURS
+
+
 class DataLoadWorker(QObject):
     """
     Worker para cargar datos en segundo plano.
     """
-    finished = Signal(bool, list)  # success, cameras
+    snapshot_loaded = Signal(object)  # cameras (CameraView) de la copia local
+    finished = Signal(bool, object, object)  # success, cameras (CameraView), diff (DatasetDiff o None si no cambió)
     progress = Signal(str)
     
     def __init__(self):
@@ -61,19 +227,38 @@ class DataLoadWorker(QObject):
     def run(self):
         """
         Ejecuta la carga de datos.
+        
+        Si hay copia local se emite primero (snapshot_loaded) y la descarga
+        pasa a ser una revalidación: finished lleva las cámaras añadidas,
+        eliminadas y modificadas, o None si los datos no cambiaron.
         """
         logger.info("Iniciando carga de datos en segundo plano...")
-        self.progress.emit("Conectando con servidor de datos...")
+        
+        if self.data_loader.load_snapshot():
+            self.data_loader.store.build_search_index()
+            self.snapshot_loaded.emit(self.data_loader.get_cameras())
+            self.progress.emit("Comprobando si hay datos nuevos...")
+        else:
+            self.progress.emit("Conectando con servidor de datos...")
         
         success = self.data_loader.load_data()
         
         if success:
+            changed = self.data_loader.changed
+            if changed:
+                # El índice de búsqueda se construye aquí para no bloquear la UI
+                self.progress.emit("Indexando cámaras para la búsqueda...")
+                self.data_loader.store.build_search_index()
             cameras = self.data_loader.get_cameras()
-            logger.info(f"Carga en segundo plano completada: {len(cameras)} cámaras")
-            self.finished.emit(True, cameras)
+            diff = self.data_loader.diff if changed else None
+            logger.info(
+                f"Carga en segundo plano completada: {len(cameras)} cámaras "
+                f"(cambios: {diff.summary() if diff is not None else 'ninguno'})"
+            )
+            self.finished.emit(True, cameras, diff)
         else:
             logger.error("Fallo en carga de datos en segundo plano")
-            self.finished.emit(False, [])
+            self.finished.emit(False, [], None)
 
 
 class MapGenerationWorker(QObject):
@@ -83,11 +268,22 @@ class MapGenerationWorker(QObject):
     finished = Signal(Path, str)  # path_to_html, summary_html
     error = Signal(str)
     
-    def __init__(self, cameras: List[Camera], show_districts: bool):
+    def __init__(
+        self,
+        cameras: List[Camera],
+        show_districts: bool,
+        layer_radius: float = config.MAP_LAYER_RADIUS_M,
+        renderer: str = config.MAP_RENDERER,
+    ):
         super().__init__()
         self.cameras = cameras
         self.show_districts = show_districts
-        self.converter = get_converter()
+        self.layer_radius = layer_radius  # metros alrededor de las cámaras (0 = capas completas)
+        self.renderer = renderer  # "template" o "folium"
+        self.camera_index = None
+        self.cameras_fingerprint = ""
+        self.reused_fragments = 0  # fragmentos reutilizados de la generación anterior
+        self.geometry_reports = {}  # URL -> SimplifyReport de las capas simplificadas
         
     def run(self):
         """
@@ -105,89 +301,29 @@ class MapGenerationWorker(QObject):
                 zoom_start=config.MAP_DEFAULT_ZOOM,
                 tiles=config.MAP_TILE_LAYER
             )
+            # Nombre de variable fijo: los fragmentos guardados hacen referencia a él
+            m._id = MAP_ELEMENT_ID
             
-            # Añadir capa de clustering para mejor performance
-            marker_cluster = plugins.MarkerCluster(
-                name="Cámaras de Tráfico",
-                overlay=True,
-                control=True,
-                icon_create_function=None
-            ).add_to(m)
-            
-            # Contadores
-            cameras_with_coords = 0
-            cameras_without_coords = 0
-            
-            # Añadir marcadores
-            for camera in self.cameras:
-                if not camera.coordenadas:
-                    cameras_without_coords += 1
-                    continue
-                
-                x, y = camera.coordenadas
-                
-                # Convertir coordenadas
-                coords = self.converter.convert(x, y)
-                if not coords:
-                    cameras_without_coords += 1
-                    continue
-                
-                lon, lat = coords
-                cameras_with_coords += 1
-                
-                # Determinar color según distrito
-                color = config.DISTRICT_COLORS.get(
-                    camera.distrito if camera.distrito else "0",
-                    "#95a5a6"  # Gris por defecto
-                )
-                
-                # Popup HTML
-                popup_html = self._create_popup_html(camera, lat, lon, color)
-                
-                # Crear marcador
-                folium.Marker(
-                    location=[lat, lon],
-                    popup=folium.Popup(popup_html, max_width=320),
-                    tooltip=f"{camera.nombre}",
-                    icon=folium.Icon(
-                        color='blue' if not camera.distrito else 'red',
-                        icon='video-camera',
-                        prefix='fa'
-                    )
-                ).add_to(marker_cluster)
+            # Las coordenadas WGS84 se calculan al cargar los datos; solo se
+            # convierten aquí (en bloque) las cámaras creadas sin ellas
+            assign_latlon(self.cameras)
             
-            # --- Añadir capa de Cortes de Tráfico ---
-            try:
-                self._add_traffic_cuts_layer(m)
-            except Exception as e:
-                logger.error(f"Error añadiendo capa de cortes de tráfico: {e}")
-
-            # --- Añadir capa de Contenedores de Ropa ---
-            try:
-                self._add_clothing_containers_layer(m)
-            except Exception as e:
-                logger.error(f"Error añadiendo capa de contenedores de ropa: {e}")
-
-            # --- Añadir capa de Consulados ---
-            try:
-                self._add_consulates_layer(m)
-            except Exception as e:
-                logger.error(f"Error añadiendo capa de consulados: {e}")
-
-            # --- Añadir capa de Carriles Bici ---
-            try:
-                self._add_bike_lanes_layer(m)
-            except Exception as e:
-                logger.error(f"Error añadiendo capa de carriles bici: {e}")
-
-            # --- Capas Bulk (Aparcamientos, Wifi, etc.) ---
-            self._add_bulk_layers(m)
-
-            # --- Capa EMT (Custom) ---
-            try:
-                self._add_emt_layer(m)
-            except Exception as e:
-                logger.error(f"Error añadiendo capa EMT: {e}")
+            # Índice espacial para limitar las capas al entorno de las cámaras
+            if self.layer_radius > 0:
+                self.camera_index, _ = build_camera_index(self.cameras)
+            
+            cameras_with_coords = sum(1 for camera in self.cameras if camera.latlon)
+            cameras_without_coords = len(self.cameras) - cameras_with_coords
+            
+            # Añadir marcadores (fragmento reutilizable si no cambiaron las cámaras)
+            if config.ENABLE_MAP_FRAGMENT_CACHE:
+                self.cameras_fingerprint = camera_fingerprint(self.cameras)
+            self._add_fragment(
+                m, "cameras", fingerprint(self.cameras_fingerprint, self.renderer), self._build_camera_cluster
+            )
+            
+            # --- Capas superpuestas (descargadas en paralelo) ---
+            layer_report = self._add_overlay_layers(m)
 
             # Añadir controles y scripts
             folium.LayerControl().add_to(m)
@@ -204,7 +340,7 @@ class MapGenerationWorker(QObject):
             m.save(str(map_path))
             
             # Generar resumen
-            summary = self._create_summary_html(cameras_with_coords, cameras_without_coords, map_path)
+            summary = self._create_summary_html(cameras_with_coords, cameras_without_coords, map_path, layer_report)
             
             logger.info(f"Mapa generado exitosamente en segundo plano: {map_path}")
             self.finished.emit(map_path, summary)
@@ -213,12 +349,116 @@ class MapGenerationWorker(QObject):
             logger.error(f"Error generando mapa en thread: {e}", exc_info=True)
             self.error.emit(str(e))
 
-    def _add_traffic_cuts_layer(self, m):
-        """Descarga y añade la capa de cortes de tráfico."""
-        logger.info("Descargando datos de cortes de tráfico...")
-        response = requests.get(TRAFFIC_CUTS_URL, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+    def _build_camera_cluster(self):
+        """Construye el cluster con los marcadores de las cámaras."""
+        # Añadir capa de clustering para mejor performance
+        marker_cluster = plugins.MarkerCluster(
+            name="Cámaras de Tráfico",
+            overlay=True,
+            control=True,
+            icon_create_function=None
+        )
+        self._add_camera_markers(marker_cluster)
+        return marker_cluster
+
+    def _add_fragment(self, m, key: str, fragment_fingerprint: str, build: Callable[[], Any]) -> bool:
+        """
+        Añade al mapa un fragmento guardado o lo construye si cambiaron sus entradas.
+        
+        Args:
+            m: Mapa de destino
+            key: Nombre del fragmento
+            fragment_fingerprint: Huella de sus entradas
+            build: Función que construye la capa
+            
+        Returns:
+            True si se reutilizó el fragmento de una generación anterior
+        """
+        if not config.ENABLE_MAP_FRAGMENT_CACHE:
+            build().add_to(m)
+            return False
+        
+        cache = get_map_fragment_cache()
+        fragment = cache.get(key, fragment_fingerprint)
+        reused = fragment is not None
+        if reused:
+            self.reused_fragments += 1
+            logger.info(f"Fragmento {key} sin cambios, se reutiliza")
+        else:
+            fragment = render_fragment(key, fragment_fingerprint, build())
+            cache.put(fragment)
+        CachedFragment(fragment).add_to(m)
+        return reused
+
+    def _add_camera_markers(self, marker_cluster) -> Tuple[int, int]:
+        """
+        Añade los marcadores de las cámaras al cluster.
+
+        Args:
+            marker_cluster: MarkerCluster de destino
+
+        Returns:
+            Tupla (cámaras con coordenadas, cámaras sin coordenadas)
+        """
+        rows = []
+        cameras_without_coords = 0
+        for camera in self.cameras:
+            if not camera.latlon:
+                cameras_without_coords += 1
+                continue
+            
+            lat, lon = camera.latlon
+            
+            # Determinar color según distrito
+            color = config.DISTRICT_COLORS.get(
+                camera.distrito if camera.distrito else "0",
+                "#95a5a6"  # Gris por defecto
+            )
+            
+            if self.renderer == "template":
+                rows.append([
+                    round(lat, 6), round(lon, 6),
+                    'distrito' if camera.distrito else 'sin_distrito',
+                    camera.id, camera.nombre, camera.direccion, camera.get_distrito_display(),
+                    camera.acceso or "", camera.url_imagen, camera.url, color,
+                    f"{lat:.5f}, {lon:.5f}",
+                ])
+                continue
+            
+            # Popup HTML
+            popup_html = self._create_popup_html(camera, lat, lon, color)
+            
+            # Crear marcador
+            folium.Marker(
+                location=[lat, lon],
+                popup=folium.Popup(popup_html, max_width=320),
+                tooltip=f"{camera.nombre}",
+                icon=folium.Icon(
+                    color='blue' if not camera.distrito else 'red',
+                    icon='video-camera',
+                    prefix='fa'
+                )
+            ).add_to(marker_cluster)
+        
+        if rows:
+            TemplateMarkers(
+                rows,
+                CAMERA_MARKER_FIELDS,
+                CAMERA_POPUP_TEMPLATE,
+                CAMERA_ICONS,
+                tooltip_template="{{nombre}}",
+                popup_max_width=320,
+            ).add_to(marker_cluster)
+        
+        return len(self.cameras) - cameras_without_coords, cameras_without_coords
+
+    def _build_traffic_cuts_layer(self, data):
+        """Construye la capa de cortes de tráfico."""
+        data = self._filter_to_cameras(data, "Cortes de tráfico")
+        if data is None:
+            return None
+        # Mezcla polígonos y puntos con marcador propio: siempre GeoJSON
+        data, _ = self._simplify_layer(TRAFFIC_CUTS_URL, data)
         
         # Grupo para cortes de tráfico
         cuts_group = folium.FeatureGroup(name="⚠️ Cortes de Tráfico", show=True)
@@ -260,15 +500,13 @@ class MapGenerationWorker(QObject):
             marker=folium.Marker(icon=folium.Icon(icon='exclamation-triangle', prefix='fa', color='red'))
         ).add_to(cuts_group)
         
-        cuts_group.add_to(m)
-        logger.info("Capa de cortes de tráfico añadida.")
+        return cuts_group
 
-    def _add_clothing_containers_layer(self, m):
-        """Descarga y añade la capa de contenedores de ropa."""
-        logger.info("Descargando datos de contenedores de ropa...")
-        response = requests.get(CLOTHING_CONTAINERS_URL, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+    def _build_clothing_containers_layer(self, data):
+        """Construye la capa de contenedores de ropa."""
+        data = self._filter_to_cameras(data, "Contenedores de ropa")
+        if data is None:
+            return None
         
         # Grupo para contenedores
         containers_group = folium.FeatureGroup(name="👕 Contenedores de Ropa", show=False)
@@ -290,15 +528,13 @@ class MapGenerationWorker(QObject):
             marker=folium.Marker(icon=folium.Icon(icon='recycle', prefix='fa', color='green'))
         ).add_to(containers_group)
         
-        containers_group.add_to(m)
-        logger.info("Capa de contenedores de ropa añadida.")
+        return containers_group
 
-    def _add_consulates_layer(self, m):
-        """Descarga y añade la capa de consulados con banderas."""
-        logger.info("Descargando datos de consulados...")
-        response = requests.get(CONSULATES_URL, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+    def _build_consulates_layer(self, data):
+        """Construye la capa de consulados con banderas."""
+        data = self._filter_to_cameras(data, "Consulados")
+        if data is None:
+            return None
         
         # Grupo para consulados
         consulates_group = folium.FeatureGroup(name="🏳️ Consulados", show=False)
@@ -348,32 +584,47 @@ class MapGenerationWorker(QObject):
                 logger.warning(f"Error procesando consulado: {e}")
                 continue
         
-        consulates_group.add_to(m)
-        logger.info("Capa de consulados añadida.")
+        return consulates_group
 
-    def _add_bike_lanes_layer(self, m):
-        """Descarga y añade la capa de carriles bici."""
-        logger.info("Descargando datos de carriles bici...")
-        response = requests.get(BIKE_LANES_URL, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+    def _build_bike_lanes_layer(self, data):
+        """Construye la capa de carriles bici."""
+        data = self._filter_to_cameras(data, "Carriles bici")
+        if data is None:
+            return None
+        data, topology = self._simplify_layer(BIKE_LANES_URL, data, topojson=config.MAP_LAYERS_TOPOJSON)
         
         # Grupo para carriles bici
         bike_group = folium.FeatureGroup(name="🚲 Carriles Bici", show=False)
         
-        folium.GeoJson(
-            data,
-            name="Carriles Bici",
-            style_function=lambda feature: {
+        def style_function(feature):
+            return {
                 'color': '#3498db',
                 'weight': 3,
                 'opacity': 0.8
-            },
-            tooltip=folium.GeoJsonTooltip(
-                fields=['NOMBRE', 'DESCRIPCION'],
-                aliases=['Tramo:', 'Info:'],
-                localize=True
-            ),
+            }
+        
+        tooltip = folium.GeoJsonTooltip(
+            fields=['NOMBRE', 'DESCRIPCION'],
+            aliases=['Tramo:', 'Info:'],
+            localize=True
+        )
+        
+        if topology is not None:
+            # TopoJson de folium no admite popup: solo tooltip
+            folium.TopoJson(
+                topology,
+                "objects.layer",
+                name="Carriles Bici",
+                style_function=style_function,
+                tooltip=tooltip
+            ).add_to(bike_group)
+            return bike_group
+        
+        folium.GeoJson(
+            data,
+            name="Carriles Bici",
+            style_function=style_function,
+            tooltip=tooltip,
             popup=folium.GeoJsonPopup(
                 fields=['NOMBRE', 'DESCRIPCION', 'LONGITUDTOTAL'],
                 aliases=['Tramo', 'Descripción', 'Longitud (m)'],
@@ -382,175 +633,422 @@ class MapGenerationWorker(QObject):
             )
         ).add_to(bike_group)
         
-        bike_group.add_to(m)
-        logger.info("Capa de carriles bici añadida.")
+        return bike_group
 
-    def _add_emt_layer(self, m):
-        """Descarga e implementa la capa de paradas de la EMT (Estructura compleja)."""
-        logger.info("Descargando datos EMT...")
-        try:
-            response = requests.get(EMT_STOPS_URL, timeout=15)
-            response.raise_for_status()
-            data = response.json()
-            
-            # La EMT devuelve una lista de líneas, cada una con 'paradas'
-            if not isinstance(data, list):
-                logger.warning("Formato EMT inesperado (no es lista).")
-                return
+    def _build_emt_layer(self, data):
+        """Construye la capa de paradas de la EMT (Estructura compleja)."""
+        # La EMT devuelve una lista de líneas, cada una con 'paradas'
+        if not isinstance(data, list):
+            logger.warning("Formato EMT inesperado (no es lista).")
+            return None
 
-            emt_group = folium.FeatureGroup(name="🚌 EMT (Bus)", show=False)
+        emt_group = folium.FeatureGroup(name="🚌 EMT (Bus)", show=False)
+        
+        # Diccionario para agregar líneas por parada
+        stops_data = {}
+        
+        for linea in data:
+            # Obtener código de línea limpio (sin puntos)
+            raw_cod = str(linea.get('userCodLinea', linea.get('codLinea', '?')))
+            linea_cod = raw_cod.replace('.', '')
             
-            # Diccionario para agregar líneas por parada
-            stops_data = {}
+            paradas = linea.get('paradas', [])
             
-            for linea in data:
-                # Obtener código de línea limpio (sin puntos)
-                raw_cod = str(linea.get('userCodLinea', linea.get('codLinea', '?')))
-                linea_cod = raw_cod.replace('.', '')
-                
-                paradas = linea.get('paradas', [])
-                
-                for item in paradas:
-                    parada_info = item.get('parada', {})
-                    if not parada_info:
-                        continue
+            for item in paradas:
+                parada_info = item.get('parada', {})
+                if not parada_info:
+                    continue
 
-                    stop_cod = parada_info.get('codParada')
-                    
-                    if stop_cod not in stops_data:
-                        lat = parada_info.get('latitud')
-                        lon = parada_info.get('longitud')
-                        
-                        if lat is None or lon is None:
-                            continue
-
-                        stops_data[stop_cod] = {
-                            'name': parada_info.get('nombreParada', 'Parada'),
-                            'address': parada_info.get('direccion', ''),
-                            'lat': lat,
-                            'lon': lon,
-                            'lines': set()
-                        }
+                stop_cod = parada_info.get('codParada')
+                
+                if stop_cod not in stops_data:
+                    lat = parada_info.get('latitud')
+                    lon = parada_info.get('longitud')
                     
-                    stops_data[stop_cod]['lines'].add(linea_cod)
+                    if lat is None or lon is None:
+                        continue
 
-            # Crear marcadores para cada parada única
-            for stop_cod, info in stops_data.items():
-                lines_str = ", ".join(sorted(info['lines'], key=lambda x: (len(x), x)))
+                    stops_data[stop_cod] = {
+                        'name': parada_info.get('nombreParada', 'Parada'),
+                        'address': parada_info.get('direccion', ''),
+                        'lat': lat,
+                        'lon': lon,
+                        'lines': set()
+                    }
                 
-                popup_html = f"""
-                <div style="font-family: Arial; min-width: 200px;">
-                    <b>🚏 {info['name']}</b><br>
-                    <span style="font-size: 12px; color: #666;">ID: {stop_cod}</span><br>
-                    <hr style="margin: 5px 0;">
-                    📍 {info['address']}<br>
-                    <div style="margin-top:5px;">
-                        <b>Autobuses:</b><br>
-                        <span style="color: blue; font-weight: bold;">{lines_str}</span>
-                    </div>
-                </div>
-                """
-                
-                folium.Marker(
-                    location=[info['lat'], info['lon']],
-                    icon=folium.Icon(icon='bus', prefix='fa', color='blue'),
-                    popup=folium.Popup(popup_html, max_width=250),
-                    tooltip=f"Parada {info['name']}"
-                ).add_to(emt_group)
+                stops_data[stop_cod]['lines'].add(linea_cod)
 
-            emt_group.add_to(m)
-            logger.info(f"Capa EMT añadida ({len(added_stops)} paradas únicas).")
-            
-        except Exception as e:
-            logger.error(f"Error procesando EMT: {e}")
-
-    def _add_bulk_layers(self, m):
-        """Añade capas genéricas definidas en configuración."""
-        layers_config = [
-            {
-                'name': "🅿️ Aparcamientos",
-                'url': PARKING_URL,
-                'icon': 'parking',
-                'color': 'darkblue',
-                'fields': ['name', 'address', 'description', 'availabilitydefault'],
-                'aliases': ['Nombre', 'Dirección', 'Info', 'Plazas']
-            },
-            {
-                'name': "🏥 Desfibriladores",
-                'url': DEFIBR_URL,
-                'icon': 'heartbeat',
-                'color': 'red',
-                'fields': ['nombre', 'direccion', 'horarios', 'descripcion'],
-                'aliases': ['Ubicación', 'Dirección', 'Horario', 'Info']
-            },
-            {
-                'name': "🚰 Fuentes",
-                'url': FOUNTAINS_URL,
-                'icon': 'tint',
-                'color': 'cadetblue',
-                'fields': ['nombre'],
-                'aliases': ['Fuente']
-            },
-            {
-                'name': "📡 Wifi",
-                'url': WIFI_URL,
-                'icon': 'wifi',
-                'color': 'purple',
-                'fields': ['TOOLTIP', 'FINALIDAD'],
-                'aliases': ['Punto Wifi', 'Ubicación']
-            },
-            {
-                'name': "🐕 Parques Caninos",
-                'url': DOG_PARKS_URL,
-                'icon': 'paw',
-                'color': 'darkgreen',
-                'fields': ['NOMBRE', 'DIRECCION', 'HORARIOS'],
-                'aliases': ['Parque', 'Dirección', 'Horario']
+        if self.camera_index is not None and stops_data:
+            near = self._near_cameras(
+                [info['lon'] for info in stops_data.values()],
+                [info['lat'] for info in stops_data.values()],
+            )
+            stops_data = {
+                stop_cod: info for (stop_cod, info), keep in zip(stops_data.items(), near) if keep
             }
-        ]
 
-        for config in layers_config:
-            try:
-                self._add_generic_layer(m, config)
-            except Exception as e:
-                logger.error(f"Error capa {config['name']}: {e}")
+        if not stops_data:
+            logger.info("Capa EMT: 0 paradas cerca de las cámaras, se omite")
+            return None
 
-    def _add_generic_layer(self, m, config):
-        logger.info(f"Descargando {config['name']}...")
-        response = requests.get(config['url'], timeout=10)
-        # Handle HTML responses or empty
-        if not response.ok:
-            logger.warning(f"Error HTTP {response.status_code} para {config['name']}")
-            return
+        # Crear marcadores para cada parada única
+        rows = []
+        for stop_cod, info in stops_data.items():
+            lines_str = ", ".join(sorted(info['lines'], key=lambda x: (len(x), x)))
+            
+            if self.renderer == "template":
+                rows.append([info['lat'], info['lon'], 'bus', stop_cod, info['name'], info['address'], lines_str])
+                continue
+            
+            popup_html = f"""
+            <div style="font-family: Arial; min-width: 200px;">
+                <b>🚏 {info['name']}</b><br>
+                <span style="font-size: 12px; color: #666;">ID: {stop_cod}</span><br>
+                <hr style="margin: 5px 0;">
+                📍 {info['address']}<br>
+                <div style="margin-top:5px;">
+                    <b>Autobuses:</b><br>
+                    <span style="color: blue; font-weight: bold;">{lines_str}</span>
+                </div>
+            </div>
+            """
+            
+            folium.Marker(
+                location=[info['lat'], info['lon']],
+                icon=folium.Icon(icon='bus', prefix='fa', color='blue'),
+                popup=folium.Popup(popup_html, max_width=250),
+                tooltip=f"Parada {info['name']}"
+            ).add_to(emt_group)
 
-        try:
-            data = response.json()
-        except:
-            logger.warning(f"Respuesta no válida para {config['name']}")
-            return
+        if rows:
+            TemplateMarkers(
+                rows,
+                EMT_MARKER_FIELDS,
+                EMT_POPUP_TEMPLATE,
+                EMT_ICONS,
+                tooltip_template="Parada {{name}}",
+                popup_max_width=250,
+            ).add_to(emt_group)
+
+        logger.info(f"Capa EMT: {len(stops_data)} paradas únicas.")
+        return emt_group
 
-        group = folium.FeatureGroup(name=config['name'], show=False)
+    def _build_generic_layer(self, layer, data):
+        """Construye una capa genérica de BULK_LAYERS."""
+        data = self._filter_to_cameras(data, layer['name'])
+        if data is None:
+            return None
+
+        group = folium.FeatureGroup(name=layer['name'], show=False)
         
         folium.GeoJson(
             data,
-            name=config['name'],
+            name=layer['name'],
             marker=folium.Marker(
-                icon=folium.Icon(icon=config['icon'], prefix='fa', color=config['color'])
+                icon=folium.Icon(icon=layer['icon'], prefix='fa', color=layer['color'])
             ),
              popup=folium.GeoJsonPopup(
-                fields=config['fields'],
-                aliases=config['aliases'],
+                fields=layer['fields'],
+                aliases=layer['aliases'],
                 localize=True,
                 max_width=300
-            ) if 'fields' in config else None,
+            ) if 'fields' in layer else None,
             tooltip=folium.GeoJsonTooltip(
-                fields=[config['fields'][0]],
+                fields=[layer['fields'][0]],
                 localize=True
-            ) if 'fields' in config else None
+            ) if 'fields' in layer else None
         ).add_to(group)
         
-        group.add_to(m)
-        logger.info(f"Capa {config['name']} añadida.")
+        return group
+
+    def _layer_sources(self) -> List[LayerSource]:
+        """
+        Capas superpuestas del mapa, en el orden en que aparecen en el control de capas.
+        
+        Returns:
+            Lista de LayerSource
+        """
+        sources = [
+            LayerSource(
+                "Cortes de tráfico", TRAFFIC_CUTS_URL, 10, self._build_traffic_cuts_layer,
+                ttl_hours=config.MAP_LAYER_CACHE_TTL_TRAFFIC_HOURS,
+            ),
+            LayerSource("Contenedores de ropa", CLOTHING_CONTAINERS_URL, 10, self._build_clothing_containers_layer),
+            LayerSource("Consulados", CONSULATES_URL, 10, self._build_consulates_layer),
+            LayerSource("Carriles bici", BIKE_LANES_URL, 10, self._build_bike_lanes_layer),
+        ]
+        for layer in BULK_LAYERS:
+            sources.append(LayerSource(
+                layer['name'], layer['url'], 10,
+                lambda data, layer=layer: self._build_generic_layer(layer, data),
+            ))
+        sources.append(LayerSource(
+            "EMT", EMT_STOPS_URL, 15, self._build_emt_layer,
+            ttl_hours=config.MAP_LAYER_CACHE_TTL_EMT_HOURS,
+        ))
+        return sources
+
+    def _add_overlay_layers(self, m):
+        """
+        Descarga todas las capas a la vez y añade al mapa las que llegan a tiempo.
+        
+        Cada capa se construye en cuanto llega su descarga. El plazo
+        MAP_LAYERS_DEADLINE es común a todas: las que fallan o no terminan
+        antes se omiten sin retrasar al resto. Las capas se añaden al mapa
+        en el orden de _layer_sources() para que el control de capas no
+        dependa de cuál terminó antes.
+        
+        Con ENABLE_MAP_FRAGMENT_CACHE, una capa cuya copia en disco sigue
+        vigente y cuyo fragmento se construyó con esa misma versión de los
+        datos se reutiliza sin leerla; las demás solo se reconstruyen si su
+        huella cambió.
+        
+        Returns:
+            Lista de tuplas (capa, LayerFetch, segundos de construcción) de las capas añadidas
+        """
+        sources = self._layer_sources()
+        deadline = config.MAP_LAYERS_DEADLINE
+        started = time.monotonic()
+        layers = {}
+        report = {}
+        
+        to_fetch = []
+        for source in sources:
+            fragment = self._fresh_layer_fragment(source)
+            if fragment is None:
+                to_fetch.append(source)
+                continue
+            self.reused_fragments += 1
+            layers[source.name] = CachedFragment(fragment)
+            report[source.name] = (
+                source,
+                LayerFetch(url=source.url, data=None, source=SOURCE_FRAGMENT, size=fragment.input_size),
+                0.0,
+            )
+        if len(to_fetch) < len(sources):
+            logger.info(f"{len(sources) - len(to_fetch)} capas sin cambios se reutilizan sin leerlas")
+        
+        if to_fetch:
+            logger.info(f"Obteniendo {len(to_fetch)} capas en paralelo (plazo {deadline}s)...")
+            executor = ThreadPoolExecutor(max_workers=len(to_fetch), thread_name_prefix="MapLayer")
+            futures = {
+                executor.submit(self._fetch_layer, source, min(source.timeout, deadline)): source
+                for source in to_fetch
+            }
+            try:
+                for future in as_completed(futures, timeout=deadline):
+                    source = futures[future]
+                    try:
+                        fetched = future.result()
+                        build_started = time.perf_counter()
+                        layer = self._build_layer(source, fetched)
+                        build_time = time.perf_counter() - build_started
+                    except Exception as e:
+                        logger.error(f"Error añadiendo capa {source.name}: {e}")
+                        continue
+                    if layer is not None:
+                        layers[source.name] = layer
+                        report[source.name] = (source, fetched, build_time)
+                        logger.info(
+                            f"Capa {source.name} lista ({fetched.source}): {fetched.size / 1024:.0f} KB, "
+                            f"descarga {fetched.download_time:.2f}s, parseo {fetched.parse_time:.2f}s, "
+                            f"construcción {build_time:.2f}s"
+                        )
+            except FuturesTimeout:
+                pending = [source.name for future, source in futures.items() if not future.done()]
+                logger.warning(f"Capas omitidas por superar el plazo de {deadline}s: {', '.join(pending)}")
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+        
+        for source in sources:
+            layer = layers.get(source.name)
+            if layer is not None:
+                layer.add_to(m)
+        logger.info(
+            f"{len(layers)}/{len(sources)} capas añadidas en {time.monotonic() - started:.1f}s"
+        )
+        return [report[source.name] for source in sources if source.name in report]
+
+    def _layer_fingerprint(self, source: LayerSource, version: str) -> str:
+        """
+        Huella de las entradas del fragmento de una capa.
+        
+        Args:
+            source: Capa
+            version: Versión de sus datos (ETag o hash del contenido)
+            
+        Returns:
+            Huella hexadecimal
+        """
+        return fingerprint(
+            source.url, version, self.renderer, self.layer_radius,
+            # Con radio, la capa depende de las cámaras del mapa
+            self.cameras_fingerprint if self.layer_radius > 0 else None,
+            config.MAP_SIMPLIFY_GEOMETRY, config.MAP_SIMPLIFY_ZOOM, config.MAP_SIMPLIFY_PIXELS,
+            config.MAP_COORDINATE_PRECISION, config.MAP_LAYERS_TOPOJSON,
+        )
+
+    def _fresh_layer_fragment(self, source: LayerSource):
+        """
+        Fragmento guardado de una capa si su copia en disco sigue vigente y no cambió.
+        
+        Args:
+            source: Capa
+            
+        Returns:
+            MapFragment o None si hay que obtener la capa
+        """
+        if not (config.ENABLE_MAP_FRAGMENT_CACHE and config.ENABLE_MAP_LAYER_CACHE):
+            return None
+        version = get_layer_cache().fresh_version(source.url, source.ttl_hours * 3600)
+        if not version:
+            return None
+        return get_map_fragment_cache().get(source.name, self._layer_fingerprint(source, version))
+
+    def _build_layer(self, source: LayerSource, fetched: LayerFetch):
+        """
+        Construye una capa descargada, o reutiliza su fragmento si sus datos no cambiaron.
+        
+        Args:
+            source: Capa
+            fetched: Datos obtenidos
+            
+        Returns:
+            Elemento a añadir al mapa o None si la capa no tiene contenido
+        """
+        if not config.ENABLE_MAP_FRAGMENT_CACHE:
+            return source.build(fetched.data)
+        
+        cache = get_map_fragment_cache()
+        layer_fingerprint = self._layer_fingerprint(source, fetched.version)
+        fragment = cache.get(source.name, layer_fingerprint)
+        if fragment is not None:
+            self.reused_fragments += 1
+        else:
+            group = source.build(fetched.data)
+            if group is None:
+                return None
+            fragment = render_fragment(source.name, layer_fingerprint, group, fetched.size)
+            cache.put(fragment)
+        return CachedFragment(fragment)
+
+    @staticmethod
+    def _fetch_layer(source: LayerSource, timeout: float) -> LayerFetch:
+        """
+        Obtiene el JSON de una capa, de la caché en disco o de la red.
+        
+        Args:
+            source: Capa a obtener
+            timeout: Timeout de la descarga en segundos
+            
+        Returns:
+            LayerFetch con los datos y los tiempos de descarga y parseo
+        """
+        if config.ENABLE_MAP_LAYER_CACHE:
+            return get_layer_cache().fetch(source.url, source.ttl_hours * 3600, timeout)
+        
+        response = fetch_url(source.url, timeout=timeout)
+        response.raise_for_status()
+        started = time.perf_counter()
+        data = response.json()
+        return LayerFetch(
+            url=source.url,
+            data=data,
+            source=SOURCE_NETWORK,
+            download_time=response.elapsed,
+            parse_time=time.perf_counter() - started,
+            size=len(response.content),
+            version=content_version(response.headers.get("ETag"), response.content),
+        )
+
+    def _simplify_layer(self, url: str, data, topojson: bool = False):
+        """
+        Simplifica y cuantiza las líneas y polígonos de una capa.
+        
+        La tolerancia equivale a MAP_SIMPLIFY_PIXELS píxeles a
+        MAP_SIMPLIFY_ZOOM y las coordenadas se redondean a
+        MAP_COORDINATE_PRECISION decimales. La reducción se anota en
+        geometry_reports para el resumen.
+        
+        Args:
+            url: URL de la capa (clave del informe)
+            data: FeatureCollection
+            topojson: Generar también TopoJSON si la capa solo tiene líneas y polígonos
+            
+        Returns:
+            Tupla (FeatureCollection simplificada, Topology o None)
+        """
+        if not config.MAP_SIMPLIFY_GEOMETRY or not isinstance(data, dict) or not data.get('features'):
+            return data, None
+        
+        started = time.perf_counter()
+        tolerance = tolerance_for_zoom(config.MAP_SIMPLIFY_ZOOM)
+        simplified, report = simplify_geojson(data, tolerance, config.MAP_COORDINATE_PRECISION)
+        topology = None
+        if topojson and has_only_lines_or_polygons(simplified):
+            topology = to_topojson(simplified)
+            report.topojson_size = topojson_size(topology)
+        
+        self.geometry_reports[url] = report
+        logger.info(f"Geometría simplificada en {time.perf_counter() - started:.2f}s: {report.summary()}")
+        return simplified, topology
+
+    def _near_cameras(self, lons, lats):
+        """
+        Indica qué puntos WGS84 están a menos de layer_radius metros de alguna cámara.
+        
+        Args:
+            lons: Longitudes
+            lats: Latitudes
+            
+        Returns:
+            Array booleano, uno por punto
+        """
+        xs, ys = get_converter().reverse_many(lons, lats)
+        return self.camera_index.near_any(xs, ys, self.layer_radius)
+
+    def _filter_to_cameras(self, data, layer_name: str):
+        """
+        Deja en una FeatureCollection solo los elementos con algún vértice cerca de una cámara.
+        
+        Una capa sin elementos (vacía o sin ninguno cerca de las cámaras) no
+        se dibuja: GeoJsonTooltip y GeoJsonPopup no admiten datos vacíos.
+        
+        Args:
+            data: GeoJSON descargado
+            layer_name: Nombre de la capa (para logs)
+            
+        Returns:
+            El mismo GeoJSON si no hay filtro, una copia con los elementos
+            cercanos, o None si no queda ningún elemento
+        """
+        if not isinstance(data, dict):
+            return data
+        features = data.get('features')
+        if not features:
+            logger.info(f"Capa {layer_name}: sin elementos, se omite")
+            return None
+        if self.camera_index is None:
+            return data
+        
+        # Todos los vértices en un único array, con el elemento al que pertenecen
+        lons, lats, owners = [], [], []
+        for index, feature in enumerate(features):
+            for lon, lat in _geometry_vertices((feature or {}).get('geometry')):
+                lons.append(lon)
+                lats.append(lat)
+                owners.append(index)
+        keep = set()
+        if owners:
+            near = self._near_cameras(lons, lats)
+            keep = {owners[i] for i in near.nonzero()[0].tolist()}
+        
+        filtered = [feature for index, feature in enumerate(features) if index in keep]
+        if not filtered:
+            logger.info(f"Capa {layer_name}: 0 elementos cerca de las cámaras, se omite")
+            return None
+        logger.info(f"Capa {layer_name} filtrada al entorno de las cámaras: {len(filtered)}/{len(features)} elementos")
+        return {**data, 'features': filtered}
 
     def _create_popup_html(self, camera: Camera, lat: float, lon: float, color: str) -> str:
         """Helper para crear el HTML del popup."""
@@ -695,13 +1193,41 @@ class MapGenerationWorker(QObject):
         """
         m.get_root().html.add_child(folium.Element(js_script))
         
-    def _create_summary_html(self, with_coords, without_coords, path):
+    def _create_summary_html(self, with_coords, without_coords, path, layer_report=()):
         """Helper para el resumen HTML."""
+        def geometry_cell(url):
+            report = self.geometry_reports.get(url)
+            if report is None:
+                return ""
+            return f"-{report.reduction * 100:.0f}% ({report.output_size / 1024:.0f} KB)"
+        
+        layer_rows = "".join(
+            f"<tr><td>{source.name}</td><td>{fetched.source}</td>"
+            f"<td align='right'>{fetched.size / 1024:.0f} KB</td>"
+            f"<td align='right'>{fetched.download_time:.2f}s</td>"
+            f"<td align='right'>{fetched.parse_time:.2f}s</td>"
+            f"<td align='right'>{build_time:.2f}s</td>"
+            f"<td align='right'>{geometry_cell(source.url)}</td></tr>"
+            for source, fetched, build_time in layer_report
+        )
+        layers_html = f"""
+            <table style="font-size: 11px; margin-top: 10px;" cellspacing="0" cellpadding="2">
+                <tr><th align="left">Capa</th><th align="left">Origen</th><th>Tamaño</th>
+                    <th>Descarga</th><th>Parseo</th><th>Construcción</th><th>Geometría</th></tr>
+                {layer_rows}
+            </table>
+        """ if layer_rows else ""
+        reused_html = (
+            f"<p><strong>Fragmentos sin cambios reutilizados:</strong> {self.reused_fragments}</p>"
+            if config.ENABLE_MAP_FRAGMENT_CACHE else ""
+        )
         return f"""
         <div style="padding: 20px; font-family: Arial, sans-serif;">
             <h3 style="color: #27ae60;">✓ Mapa generado exitosamente</h3>
             <p><strong>Cámaras procesadas:</strong> {with_coords}</p>
             <p><strong>Cámaras sin coordenadas:</strong> {without_coords}</p>
+            {reused_html}
+            {layers_html}
             <p style="margin-top: 15px;">
                 El mapa ha sido generado correctamente. 
                 Haz click en <strong>"Abrir en Navegador"</strong> para verlo.